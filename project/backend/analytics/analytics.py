@@ -1,10 +1,16 @@
 import pandas as pd
 import matplotlib.pyplot as plt
-from textblob import TextBlob
 import os
+import sys
 import json
 import datetime
 
+# Add the backend directory to Python path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from app.utils.sentiment import polarity
+
 # Directory to save analytics data
 analytics_dir = "analytics_data"
 if not os.path.exists(analytics_dir):
@@ -39,8 +45,7 @@ def log_user_response(user_id, question, response, category, sentiment_score, re
 
 # Function to calculate sentiment of user responses
 def analyze_sentiment(response):
-    blob = TextBlob(response)
-    sentiment_score = blob.sentiment.polarity
+    sentiment_score = polarity(response)
     sentiment = "Positive" if sentiment_score > 0 else "Negative" if sentiment_score < 0 else "Neutral"
     return sentiment, sentiment_score
 
@@ -1,19 +1,30 @@
 import os
 import sys
-from flask import Flask, session, request
+from flask import Flask, session, request, jsonify
 from flask_cors import CORS
 from flask_login import LoginManager
 from app.routes.interview_routes import interview_bp
 from app.routes.auth_routes import auth_bp
 from app.utils.email import mail
+from app.utils.audio_storage import start_audio_sweeper
+from app.utils.audio_transcode import start_audio_transcoder
+from app.utils.audio_jobs import ensure_requeued_at_column, start_audio_job_recovery
+from app.utils.model_registry import ensure_model_version_column, start_model_registry
+from app.utils.incremental_training import start_incremental_training
 
 # Add the backend directory to Python path
 BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(BACKEND_DIR)
 
 from config import Config
+from app.utils.warmup import configure_numba_cache, start_warmup, readiness
+from app.utils.audio_decode import decoder_available
+
+# librosa is imported lazily, so this still runs before numba is loaded
+configure_numba_cache(Config.NUMBA_CACHE_DIR)
 from app.models.interview import db
 from app.models.user import User
+from app.models.audio import AudioJob, AudioAsset, AudioStream, AudioFeatureVector
 
 app = Flask(__name__)
 app.config.from_object(Config)
@@ -31,9 +42,9 @@ CORS(app,
      resources={r"/*": {
          "origins": ["http://localhost:8000", "http://127.0.0.1:8000"],
          "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-         "allow_headers": ["Content-Type", "Authorization", "Accept", "X-Requested-With"],
+         "allow_headers": ["Content-Type", "Authorization", "Accept", "X-Requested-With", "Idempotency-Key"],
          "supports_credentials": True,
-         "expose_headers": ["Set-Cookie", "Authorization"],
+         "expose_headers": ["Set-Cookie", "Authorization", "Retry-After", "Idempotent-Replayed"],
          "max_age": 600
      }},
      supports_credentials=True)
@@ -51,7 +62,8 @@ def after_request(response):
         response.headers['Access-Control-Allow-Origin'] = origin
         response.headers['Access-Control-Allow-Credentials'] = 'true'
         response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
-        response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, X-Requested-With'
+        response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, X-Requested-With, Idempotency-Key'
+        response.headers['Access-Control-Expose-Headers'] = 'Set-Cookie, Authorization, Retry-After, Idempotent-Replayed'
     return response
 
 # Initialize Login Manager
@@ -68,6 +80,44 @@ def load_user(user_id):
 with app.app_context():
     db.create_all()
     db.session.commit()
+    conn = db.engine.raw_connection()
+    try:
+        ensure_model_version_column(conn)
+        ensure_requeued_at_column(conn)
+    finally:
+        conn.close()
+
+# Load and compile the audio pipeline before the first answer needs it; this
+# also starts the analysis pool, before any other background thread runs
+start_warmup(app)
+
+# Analyze again the audio answers whose jobs a restart left queued
+start_audio_job_recovery(app)
+
+if not decoder_available():
+    print("ffmpeg not found: WebM and MP4 audio answers will be refused with 503")
+
+# Reconcile stored audio files with the audio_asset table in the background
+start_audio_sweeper(app)
+
+# Compress stored answers into content-addressed FLAC/Opus objects
+start_audio_transcoder(app)
+
+# Serve the newest text classifier artifact and swap in new ones as they appear
+start_model_registry(app)
+
+# Keep training the text classifier on stored answers, publishing new artifacts
+start_incremental_training(app)
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Readiness probe: 503 until the audio pipeline has warmed up.
+
+    webm_decoder reports whether ffmpeg is there to decode WebM and MP4
+    answers; without it only those uploads are refused.
+    """
+    state = dict(readiness(), webm_decoder=decoder_available())
+    return jsonify(state), (200 if state['ready'] else 503)
 
 # Register blueprints
 app.register_blueprint(auth_bp, url_prefix='/auth')
@@ -0,0 +1,75 @@
+from datetime import datetime
+from app.models.interview import db
+
+class AudioJob(db.Model):
+    """Background analysis of one stored audio response."""
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('interview_session.id'), nullable=False, index=True)
+    response_id = db.Column(db.Integer, db.ForeignKey('response.id'), index=True)
+    audio_path = db.Column(db.String(500), nullable=False)
+    question = db.Column(db.String(500))
+    status = db.Column(db.String(20), default='queued')  # queued, done or failed
+    score = db.Column(db.Float)
+    sentiment = db.Column(db.String(20))
+    category = db.Column(db.String(50))
+    error = db.Column(db.Text)
+    # Speech statistics from voice activity detection, in seconds
+    speaking_time = db.Column(db.Float)
+    speech_ratio = db.Column(db.Float)
+    pause_count = db.Column(db.Integer)
+    mean_pause = db.Column(db.Float)
+    longest_pause = db.Column(db.Float)
+    # Comma-separated features the score was computed from (see SCORED_FEATURES)
+    features_used = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    # Set when a job lost by a restart was submitted again (see recover_audio_jobs)
+    requeued_at = db.Column(db.DateTime)
+
+class AudioAsset(db.Model):
+    """A stored audio file, so it can be found without scanning the uploads directory."""
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('interview_session.id'), nullable=False, index=True)
+    response_id = db.Column(db.Integer, db.ForeignKey('response.id'), index=True)
+    path = db.Column(db.String(500), unique=True, nullable=False)  # relative to UPLOAD_FOLDER
+    size = db.Column(db.Integer)
+    checksum = db.Column(db.String(64))  # SHA-256 hex digest of the WAV
+    # Compressed, content-addressed copy (relative to UPLOAD_FOLDER) that replaces
+    # the WAV once transcoded; shared by every asset with the same checksum
+    object_path = db.Column(db.String(500), index=True)
+    stored_size = db.Column(db.Integer)
+    duration = db.Column(db.Float)  # seconds
+    peaks = db.Column(db.LargeBinary)  # int8 min/max pairs for drawing the waveform (app.utils.waveform)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class AudioStream(db.Model):
+    """A chunked audio upload in progress, shared by every worker and node.
+
+    The chunks themselves are kept in the blob store (see
+    app.utils.audio_stream) until the upload is finished.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    upload_id = db.Column(db.String(64), unique=True, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    session_id = db.Column(db.Integer, db.ForeignKey('interview_session.id'), nullable=False, index=True)
+    question_number = db.Column(db.Integer, nullable=False)
+    question = db.Column(db.String(500))
+    source_rate = db.Column(db.Integer, nullable=False)  # Hz of the 16-bit mono PCM chunks
+    next_seq = db.Column(db.Integer, default=0, nullable=False)
+    samples = db.Column(db.Integer, default=0, nullable=False)  # PCM samples received so far
+    stages = db.Column(db.String(100))  # comma-separated ANALYSIS_STAGES to compute
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_seen = db.Column(db.DateTime, default=datetime.utcnow)
+
+class AudioFeatureVector(db.Model):
+    """The audio features one response was scored from, as packed float32 values.
+
+    The layout of vector is FEATURE_LAYOUT in app.utils.feature_store, at
+    layout_version; features that were not computed are stored as NaN.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('interview_session.id'), nullable=False, index=True)
+    response_id = db.Column(db.Integer, db.ForeignKey('response.id'), unique=True, nullable=False)
+    layout_version = db.Column(db.Integer, nullable=False)
+    vector = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -2,10 +2,9 @@ import os
 import pandas as pd
 from flask_sqlalchemy import SQLAlchemy
 import pickle
-from textblob import TextBlob
 import re
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.naive_bayes import MultinomialNB
+from app.utils.model_artifact import ArtifactError, ClassifierArtifact
+from app.utils.sentiment import polarity
 from datetime import datetime
 import random
 
@@ -17,17 +16,31 @@ BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__
 # Load pre-trained model and vectorizer
 MODEL_PATH = os.path.join(BACKEND_DIR, 'ml_model', 'interview_classifier.pkl')
 VECTORIZER_PATH = os.path.join(BACKEND_DIR, 'ml_model', 'tfidf_vectorizer.pkl')
+CLASSIFIER_ARTIFACT_PATH = os.path.join(BACKEND_DIR, 'ml_model', 'interview_classifier.npz')
 QUESTIONS_PATH = os.path.join(BACKEND_DIR, 'data', 'questions.csv')
 
-# Initialize model and vectorizer
+# Prefer the NumPy export of the classifier (ml_model/export_model.py): its
+# arrays are memory-mapped, so worker processes share them. The pickled
+# scikit-learn objects are only loaded when there is no export.
+classifier = None
+model = None
+vectorizer = None
 try:
-    with open(MODEL_PATH, 'rb') as f:
-        model = pickle.load(f)
-    with open(VECTORIZER_PATH, 'rb') as f:
-        vectorizer = pickle.load(f)
+    classifier = ClassifierArtifact(CLASSIFIER_ARTIFACT_PATH)
 except FileNotFoundError:
-    model = None
-    vectorizer = None
+    pass
+except ArtifactError as e:
+    print(f"Ignoring classifier artifact: {str(e)}")
+
+if classifier is None:
+    try:
+        with open(MODEL_PATH, 'rb') as f:
+            model = pickle.load(f)
+        with open(VECTORIZER_PATH, 'rb') as f:
+            vectorizer = pickle.load(f)
+    except FileNotFoundError:
+        model = None
+        vectorizer = None
 
 class InterviewSession(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -49,10 +62,23 @@ class Response(db.Model):
     category = db.Column(db.String(50))
     score = db.Column(db.Float, default=0.0)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    model_version = db.Column(db.String(50))  # classifier artifact that set the category
 
     # Relationship with interview session
     session = db.relationship('InterviewSession', backref='responses')
 
+class AnswerSubmission(db.Model):
+    """First processing of a submitted answer, replayed to retries with the same idempotency key."""
+    __table_args__ = (db.UniqueConstraint('session_id', 'idempotency_key'),)
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('interview_session.id'), nullable=False)
+    idempotency_key = db.Column(db.String(200), nullable=False)
+    response_id = db.Column(db.Integer, db.ForeignKey('response.id'))
+    status = db.Column(db.String(20), default='processing')  # processing or done
+    status_code = db.Column(db.Integer)
+    result = db.Column(db.Text)  # JSON body of the first reply
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 def create_session(user_id):
     """Create a new interview session for the user."""
     session = InterviewSession(user_id=user_id)
@@ -176,8 +202,12 @@ def get_session_stats(session_id):
         raise
 
 def calculate_response_score(response_text, sentiment):
+    return response_score(len(response_text.split()), sentiment)
+
+def response_score(word_count, sentiment):
+    """Score of a text answer from its word count and sentiment label."""
     # Score based on response length (1-5 points)
-    length_score = min(5, len(response_text.split()) / 20)
+    length_score = min(5, word_count / 20)
     
     # Score based on sentiment (1-5 points)
     sentiment_scores = {'positive': 5, 'neutral': 3, 'negative': 1}
@@ -279,8 +309,10 @@ def store_interview_data(session_id, question, response_text, sentiment, input_t
         raise
 
 def analyze_sentiment(text):
-    blob = TextBlob(text)
-    sentiment = blob.sentiment.polarity
+    return sentiment_label(polarity(text))
+
+def sentiment_label(sentiment):
+    """Map a polarity in [-1, 1] to positive, negative or neutral."""
     if sentiment > 0.1:
         return "positive"
     elif sentiment < -0.1:
@@ -453,6 +485,12 @@ def preprocess_text(text):
 
 def classify_response(text):
     """Classify the response into predefined categories."""
+    if classifier is not None:
+        try:
+            return classifier.predict([preprocess_text(text).split()])[0]
+        except Exception as e:
+            print(f"Error in classify_response: {str(e)}")
+            return "general"
     if model is None or vectorizer is None:
         return "general"
         
@@ -1,19 +1,59 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, send_file, send_from_directory, redirect, url_for
 from flask_login import login_required, current_user
 from app.models.interview import db, InterviewSession, Response
 from app.models.interview import (
-    create_session, store_interview_data, analyze_sentiment, 
-    get_next_question, get_session_stats, classify_response,
-    get_follow_up_question, calculate_response_score
+    create_session, store_interview_data,
+    get_next_question, get_session_stats,
+    get_follow_up_question
 )
+from app.utils.audio_analysis import SAMPLE_RATE, AnalysisBudget, classify_audio_response, score_audio_features
+from app.utils.audio_decode import (
+    AudioDecodeError, AudioDecoderUnavailable, decode_audio, probe_audio_duration, iter_audio_blocks
+)
+from app.utils.audio_storage import (
+    encode_wav, save_audio_async, publish_audio_async, write_audio_blocks, file_checksum,
+    record_audio_asset, delete_session_assets
+)
+from app.utils.blob_storage import get_blob_store
+from app.utils.audio_jobs import create_audio_job, submit_audio_job, get_audio_job, cache_features, pool_runner
+from app.utils.audio_stream import (
+    start_audio_stream, get_audio_stream, append_audio_chunk, finish_audio_stream, discard_audio_stream,
+    delete_session_streams
+)
+from app.utils.feature_cache import feature_cache_key, get_feature_cache
+from app.utils.analysis_queue import get_analysis_queue
+from app.utils.idempotency import (
+    submission_key, claim_submission, attach_submission_response, complete_submission, release_submission
+)
+from app.utils.audio_transcode import transcode_stats
+from app.utils.question_audio import load_question_audio_manifest
+from app.utils.model_registry import get_model_registry
+from app.utils.text_analysis import AnalyzedText, get_classification_batcher
+from app.utils.waveform import waveform_peaks, file_peaks
+from app.utils.feature_store import FEATURE_LAYOUT, feature_vector, store_feature_vector, load_feature_matrix
+from werkzeug.exceptions import NotFound
+import numpy as np
 import traceback
+import base64
+import hashlib
+import io
 import os
-
-# Get the absolute path to the backend directory
-BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import re
 
 interview_bp = Blueprint('interview', __name__)
 
+# Placeholder text stored for audio answers, which carries the question number
+AUDIO_RESPONSE_TEXT = re.compile(r'^\[Audio Response for Question (\d+)\]$')
+
+# Content types of stored recordings, by extension (WAV, or a transcoded object)
+AUDIO_MIMETYPES = {'.wav': 'audio/wav', '.flac': 'audio/flac', '.ogg': 'audio/ogg'}
+
+# Pre-rendered question audio files, named by the hash of their text
+QUESTION_AUDIO_FILE = re.compile(r'^[0-9a-f]{32}\.(ogg|flac)$')
+
+# Question audio never changes under a name, so clients may cache it for a year
+QUESTION_AUDIO_MAX_AGE = 31536000
+
 @interview_bp.route("/start", methods=["GET"])
 @login_required
 def start_interview():
@@ -81,6 +121,7 @@ def start_interview():
 @login_required
 def handle_interview():
     conn = None
+    submission = None
     try:
         data = request.get_json()
         if not data:
@@ -114,9 +155,22 @@ def handle_interview():
         prev_question_id = data.get("prev_question_id")
         question_number = data.get("question_number", 1)
         
-        # Analyze response sentiment and category
-        sentiment = analyze_sentiment(user_response)
-        response_category = classify_response(user_response)
+        # A retried answer replays the first reply instead of being stored again
+        try:
+            submission = submission_key(request.headers, data.get("question_number"))
+        except ValueError as e:
+            conn.close()
+            return jsonify({"error": str(e)}), 400
+        if submission:
+            replay = claim_submission(session_id, submission)
+            if replay:
+                conn.close()
+                return _replayed_submission(replay, session_id)
+        
+        # Analyze response sentiment and category from one tokenization
+        analyzed = AnalyzedText(user_response, get_classification_batcher(current_app.config))
+        sentiment = analyzed.sentiment
+        response_category = analyzed.category
         
         print(f"Response category: {response_category}")  # Debug log
         
@@ -139,12 +193,16 @@ def handle_interview():
                     "VALUES (?, ?, ?, ?, ?, ?)",
                     (session_id, current_question, user_response, sentiment, response_category, 0.0)
                 )
+            response_id = cursor.lastrowid
+            if 'model_version' in columns:
+                cursor.execute(
+                    "UPDATE response SET model_version = ? WHERE id = ?",
+                    (analyzed.model_version, response_id)
+                )
+            if submission:
+                attach_submission_response(cursor, session_id, submission, response_id)
             
-            # Calculate a simple score based on response length (similar to the original logic)
-            score = min(10, max(1, len(user_response) / 20))
-            
-            # Use the proper scoring function from the models
-            score = calculate_response_score(user_response, sentiment)
+            score = analyzed.score
             
             # Update the response with the calculated score
             cursor.execute(
@@ -179,7 +237,7 @@ def handle_interview():
             conn.close()
             conn = None
             stats = get_session_stats(session_id)
-            return jsonify({
+            return _submission_reply(session_id, submission, {
                 "completed": True,
                 "stats": stats
             })
@@ -198,7 +256,7 @@ def handle_interview():
         if conn:
             conn.close()
             
-        return jsonify({
+        return _submission_reply(session_id, submission, {
             "completed": False,
             "next_question": next_question,
             "sentiment": sentiment,
@@ -214,6 +272,8 @@ def handle_interview():
                 conn.close()
             except:
                 pass
+        if submission:
+            release_submission(session_id, submission)
         print(f"Error in handle_interview: {str(e)}")
         print(traceback.format_exc())
         return jsonify({
@@ -432,7 +492,7 @@ def get_session(session_id):
         
         # Get all responses for this session
         cursor.execute(
-            "SELECT question, response, sentiment, category, score "
+            "SELECT question, response, sentiment, category, score, id "
             "FROM response WHERE session_id = ?",
             (session_id,)
         )
@@ -446,7 +506,8 @@ def get_session(session_id):
                 "response_text": response[1],  # response
                 "sentiment": response[2],      # sentiment
                 "category": response[3],       # category
-                "score": response[4]           # score
+                "score": response[4],          # score
+                "id": response[5]              # response ID, for the recording endpoints
             })
         
         # Calculate total score (average of all response scores)
@@ -529,40 +590,27 @@ def delete_session(session_id):
         
         print(f"Session {session_id} found and authorized for deletion")
         
-        # Check what columns exist in the response table
-        cursor.execute("PRAGMA table_info(response)")
-        columns = [column[1] for column in cursor.fetchall()]
-        has_question_number = 'question_number' in columns
-        
-        # Get response count
-        cursor.execute("SELECT COUNT(*) FROM response WHERE session_id = ?", (session_id,))
-        count_result = cursor.fetchone()
-        response_count = count_result[0] if count_result else 0
-        print(f"Found {response_count} responses for session {session_id}")
-        
-        # Generate a range of possible question numbers
-        question_numbers = list(range(1, response_count + 1))
-        
-        # If question_number column exists, try to get actual question numbers
-        if has_question_number:
-            try:
-                cursor.execute(
-                    "SELECT question_number FROM response WHERE session_id = ? AND question_number IS NOT NULL",
-                    (session_id,)
-                )
-                question_nums_results = cursor.fetchall()
-                if question_nums_results:
-                    question_numbers = [r[0] for r in question_nums_results if r[0]]
-                    print(f"Retrieved question numbers from database: {question_numbers}")
-            except Exception as e:
-                print(f"Error getting question numbers: {e}")
-                # Fall back to using range
-        
         # Database operation for deletion
         try:
             # Begin transaction
             cursor.execute("BEGIN TRANSACTION")
             
+            # Look up the session's audio files by index and drop their rows
+            audio_keys = delete_session_assets(cursor, session_id)
+            audio_keys += delete_session_streams(cursor, session_id)
+            cursor.execute(
+                "DELETE FROM audio_job WHERE session_id = ?",
+                (session_id,)
+            )
+            cursor.execute(
+                "DELETE FROM audio_feature_vector WHERE session_id = ?",
+                (session_id,)
+            )
+            cursor.execute(
+                "DELETE FROM answer_submission WHERE session_id = ?",
+                (session_id,)
+            )
+            
             # Delete all responses for this session
             cursor.execute(
                 "DELETE FROM response WHERE session_id = ?",
@@ -584,37 +632,9 @@ def delete_session(session_id):
             conn.close()
             conn = None
             
-            # Now handle audio file deletion
-            uploads_dir = os.path.join(BACKEND_DIR, 'uploads')
-            deleted_files = 0
-            
-            # Find files based on naming pattern, regardless of database entries
-            if os.path.exists(uploads_dir):
-                # First, find all audio files that match the pattern for this session
-                session_audio_pattern = f"audio_{session_id}_"
-                
-                for filename in os.listdir(uploads_dir):
-                    if filename.startswith(session_audio_pattern) and filename.endswith('.wav'):
-                        try:
-                            file_path = os.path.join(uploads_dir, filename)
-                            os.remove(file_path)
-                            deleted_files += 1
-                            print(f"Deleted audio file: {file_path}")
-                        except Exception as e:
-                            print(f"Could not delete audio file {file_path}: {str(e)}")
+            # Remove the audio files only once the rows are gone
+            deleted_files = get_blob_store(current_app.config).delete(audio_keys) if audio_keys else 0
             
-            # Also try specific filenames based on question numbers
-            for qnum in question_numbers:
-                try:
-                    audio_filename = f'audio_{session_id}_{qnum}.wav'
-                    file_path = os.path.join(uploads_dir, audio_filename)
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
-                        deleted_files += 1
-                        print(f"Deleted audio file by question number: {file_path}")
-                except Exception as e:
-                    print(f"Error checking/deleting question-based audio file: {e}")
-                            
             print(f"Successfully deleted session {session_id} with {responses_deleted} responses and {deleted_files} audio files")
             return jsonify({"success": True, "message": "Interview session deleted successfully"})
         except Exception as e:
@@ -635,10 +655,132 @@ def delete_session(session_id):
                 pass
         return jsonify({"error": f"Could not delete session: {str(e)}"}), 500
 
+def _store_audio_response(cursor, session_id, question, question_number, sentiment, category, score):
+    """Insert an audio response and update its session.
+
+    Returns (response_id, is_complete). The caller commits.
+    """
+    # For audio submissions, we'll use a placeholder response text
+    response_text = f"[Audio Response for Question {question_number}]"
+    
+    # Check if input_type column exists in the response table
+    cursor.execute("PRAGMA table_info(response)")
+    columns = [column[1] for column in cursor.fetchall()]
+    
+    # Insert the response
+    if 'input_type' in columns:
+        cursor.execute(
+            "INSERT INTO response (session_id, question, response, sentiment, category, input_type, score) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (session_id, question, response_text, sentiment, category, 'audio', score)
+        )
+    else:
+        cursor.execute(
+            "INSERT INTO response (session_id, question, response, sentiment, category, score) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (session_id, question, response_text, sentiment, category, score)
+        )
+    response_id = cursor.lastrowid
+    
+    # Update the session
+    cursor.execute(
+        "UPDATE interview_session SET question_count = question_count + 1, "
+        "total_score = total_score + ? WHERE id = ?",
+        (score, session_id)
+    )
+    
+    # Check if this is the last question
+    is_complete = question_number >= 10
+    if is_complete:
+        cursor.execute(
+            "UPDATE interview_session SET completed = 1 WHERE id = ?",
+            (session_id,)
+        )
+    
+    return response_id, is_complete
+
+def _audio_submission_result(conn, cursor, session_id, question_number, response_category, is_complete, result,
+                             submission=None):
+    """Build the reply to a stored audio answer and close the connection.
+
+    result holds the per-answer fields (score, sentiment, ...) to return.
+    The reply is kept for replaying to retries of the submission key.
+    """
+    if is_complete:
+        # Get session statistics
+        conn.close()
+        stats = get_session_stats(session_id)
+        return _submission_reply(session_id, submission, dict(result, completed=True, stats=stats))
+    
+    # Get next question
+    next_question = get_next_question(session_id)
+    if not next_question:
+        next_question = "Thank you for your responses. Do you have any questions for me?"
+    
+    # Update the current question in the session
+    try:
+        cursor.execute(
+            "UPDATE interview_session SET last_category = ? WHERE id = ?",
+            (response_category, session_id)
+        )
+        conn.commit()
+    except Exception as e:
+        print(f"Error updating session: {str(e)}")
+    finally:
+        conn.close()
+    
+    return _submission_reply(session_id, submission, dict(
+        result,
+        completed=False,
+        next_question=next_question,
+        question_number=question_number + 1
+    ))
+
+def _submission_reply(session_id, submission, body, status_code=200):
+    """Reply with body, storing it first as the replay for the submission key if there is one."""
+    if submission:
+        complete_submission(session_id, submission, body, status_code)
+    return jsonify(body), status_code
+
+def _replayed_submission(replay, session_id):
+    """Reply to a duplicate submission from the outcome of the first one.
+
+    A reply rebuilt from a stored answer whose first reply was lost gets
+    the next question or the session statistics added here.
+    """
+    status_code, body = replay
+    if status_code is None:
+        response = jsonify({"error": "This answer is still being processed"})
+        response.status_code = 409
+        response.headers['Retry-After'] = '1'
+        return response
+    if body.get('completed') is False and 'next_question' not in body:
+        body['next_question'] = (get_next_question(session_id)
+                                 or "Thank you for your responses. Do you have any questions for me?")
+    elif body.get('completed') and 'stats' not in body:
+        body['stats'] = get_session_stats(session_id)
+    response = jsonify(body)
+    response.status_code = status_code
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def _analysis_busy_response(queue):
+    """429 reply for an audio answer turned away because the analysis queue is full."""
+    retry_after = queue.retry_after()
+    response = jsonify({
+        "error": "Audio analysis is busy, please try again shortly",
+        "retry_after": retry_after
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
 @interview_bp.route("/submit-audio", methods=["POST"])
 @login_required
 def submit_audio():
     """Handle audio submission from the audio interview page."""
+    ticket = None
+    submission = None
     try:
         # Check if audio file is in the request
         if 'audio' not in request.files:
@@ -649,7 +791,7 @@ def submit_audio():
             return jsonify({"error": "Empty audio file"}), 400
         
         # Ensure uploads directory exists
-        uploads_dir = os.path.join(BACKEND_DIR, 'uploads')
+        uploads_dir = current_app.config['UPLOAD_FOLDER']
         if not os.path.exists(uploads_dir):
             os.makedirs(uploads_dir)
         
@@ -684,106 +826,108 @@ def submit_audio():
         
         # No need to query for current question since we get it from form data
         
-        # Save audio file to a temporary location (optional)
-        # audio_file.save(os.path.join('uploads', f'audio_{session_id}_{question_number}.wav'))
+        # A retried upload replays the first reply without being decoded or analyzed again
+        try:
+            submission = submission_key(request.headers, question_number)
+        except ValueError as e:
+            conn.close()
+            return jsonify({"error": str(e)}), 400
+        replay = claim_submission(session_id, submission)
+        if replay:
+            conn.close()
+            return _replayed_submission(replay, session_id)
+        
+        # Take a place in the analysis queue before doing any work, so a burst
+        # of uploads is turned away instead of saturating the CPU
+        queue = get_analysis_queue(current_app.config)
+        ticket = queue.reserve()
+        if ticket is None:
+            conn.close()
+            release_submission(session_id, submission)
+            return _analysis_busy_response(queue)
         
-        # Save audio file
         audio_filename = f'audio_{session_id}_{question_number}.wav'
         audio_path = os.path.join(uploads_dir, audio_filename)
-        audio_file.save(audio_path)
-        print(f"Audio saved to: {audio_path}")
         
+        # Long recordings are converted block by block straight to disk and
+        # analyzed from there, so they are never held in memory whole
+        duration = probe_audio_duration(audio_file.stream)
+        block_threshold = current_app.config.get('AUDIO_BLOCK_ANALYSIS_SECONDS', 120)
         try:
-            # Calculate score based on multiple factors
-            score = calculate_audio_response_score(audio_path, current_question)
-            
-            # For audio submissions, we'll use a placeholder response text
-            response_text = f"[Audio Response for Question {question_number}]"
-            
-            # Analyze sentiment and classify response
-            sentiment = analyze_audio_sentiment(audio_path)
+            if duration is not None and duration > block_threshold:
+                samples = audio_data = None
+                audio_size, audio_checksum = write_audio_blocks(
+                    audio_path, iter_audio_blocks(audio_file.stream, SAMPLE_RATE), SAMPLE_RATE
+                )
+                peaks, duration = file_peaks(audio_path)
+                print(f"Converted {duration:.1f}s upload in blocks")
+            else:
+                # Decode the upload once, in memory, whatever container the browser sent
+                samples, audio_format = decode_audio(audio_file.read())
+                print(f"Decoded {audio_format} upload: {len(samples) / SAMPLE_RATE:.1f}s")
+                
+                # The decoded recording is encoded here and written to disk in the background
+                audio_data = encode_wav(samples, SAMPLE_RATE)
+                audio_size, audio_checksum = len(audio_data), hashlib.sha256(audio_data).hexdigest()
+                peaks, duration = waveform_peaks(samples), len(samples) / float(SAMPLE_RATE)
+        except AudioDecodeError as e:
+            ticket.cancel()
+            conn.close()
+            release_submission(session_id, submission)
+            print(f"Could not decode audio upload: {str(e)}")
+            # A missing decoder is a server problem the client can retry later
+            return jsonify({"error": str(e)}), 503 if isinstance(e, AudioDecoderUnavailable) else 400
+        
+        try:
+            # The category only depends on the question, so it is set right away;
+            # score and sentiment are filled in by the background audio job
             response_category = classify_audio_response(audio_path, current_question)
             
-            # Store the response
+            # Store the response and queue its analysis
             try:
-                # Check if input_type column exists in the response table
-                cursor.execute("PRAGMA table_info(response)")
-                columns = [column[1] for column in cursor.fetchall()]
-                
-                # Insert the response
-                if 'input_type' in columns:
-                    cursor.execute(
-                        "INSERT INTO response (session_id, question, response, sentiment, category, input_type, score) "
-                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
-                        (session_id, current_question, response_text, sentiment, response_category, 'audio', score)
-                    )
-                else:
-                    cursor.execute(
-                        "INSERT INTO response (session_id, question, response, sentiment, category, score) "
-                        "VALUES (?, ?, ?, ?, ?, ?)",
-                        (session_id, current_question, response_text, sentiment, response_category, score)
-                    )
-            
-                # Update the session
-                cursor.execute(
-                    "UPDATE interview_session SET question_count = question_count + 1, "
-                    "total_score = total_score + ? WHERE id = ?",
-                    (score, session_id)
+                response_id, is_complete = _store_audio_response(
+                    cursor, session_id, current_question, question_number, None, response_category, 0.0
                 )
-                
-                # Check if this is the last question
-                is_complete = question_number >= 10
-                if is_complete:
-                    cursor.execute(
-                        "UPDATE interview_session SET completed = 1 WHERE id = ?",
-                        (session_id,)
-                    )
-            
+                record_audio_asset(cursor, uploads_dir, session_id, response_id, audio_path,
+                                   audio_size, audio_checksum, duration, peaks)
+                job_id = create_audio_job(cursor, session_id, response_id, audio_path, current_question)
+                attach_submission_response(cursor, session_id, submission, response_id)
                 conn.commit()
             except Exception as e:
                 conn.rollback()
                 print(f"Error storing audio response: {str(e)}")
                 raise
             
-            if is_complete:
-                # Get session statistics
-                conn.close()
-                conn = None
-                stats = get_session_stats(session_id)
-                return jsonify({
-                    "completed": True,
-                    "stats": stats
-                })
-            
-            # Get next question
-            next_question = get_next_question(session_id)
-            if not next_question:
-                next_question = "Thank you for your responses. Do you have any questions for me?"
+            if audio_data is not None:
+                save_audio_async(audio_path, audio_data)
+            store = get_blob_store(current_app.config)
+            if store.remote:
+                publish_audio_async(store, uploads_dir, audio_path)
             
-            # Update the current question in the session
-            if conn:
-                try:
-                    cursor.execute(
-                        "UPDATE interview_session SET last_category = ? WHERE id = ?",
-                        (response_category, session_id)
-                    )
-                    conn.commit()
-                except Exception as e:
-                    print(f"Error updating session: {str(e)}")
-                finally:
-                    conn.close()
+            # Hand the analysis to the worker pool and acknowledge the upload
+            submit_audio_job(job_id, samples, current_question, audio_path, audio_checksum, ticket)
+            ticket = None  # the job holds its place in the queue now
+            job = get_audio_job(job_id, current_user.id)
             
-            return jsonify({
-                "completed": False,
-                "next_question": next_question,
-                "sentiment": sentiment,
+            return _audio_submission_result(conn, cursor, session_id, question_number, response_category, is_complete, {
+                "sentiment": job["sentiment"],
                 "category": response_category,
-                "score": score,
-                "question_number": question_number + 1
-            })
+                "score": job["score"],
+                "speech": job["speech"],
+                "features_used": job["features_used"],
+                "job_id": job_id,
+                "analysis_status": job["status"]
+            }, submission)
         
         except Exception as e:
-            print(f"Error calculating audio score: {str(e)}")
+            if ticket:
+                ticket.cancel()
+            try:
+                conn.close()
+            except:
+                pass
+            release_submission(session_id, submission)
+            print(f"Error processing audio submission: {str(e)}")
             print(traceback.format_exc())
             return jsonify({
                 "error": "Failed to process audio submission",
@@ -791,6 +935,10 @@ def submit_audio():
             }), 500
         
     except Exception as e:
+        if ticket:
+            ticket.cancel()
+        if submission:
+            release_submission(session_id, submission)
         print(f"Error in submit_audio: {str(e)}")
         print(traceback.format_exc())
         return jsonify({
@@ -798,163 +946,465 @@ def submit_audio():
             "next_question": "Could you please try again?"
         }), 500
 
-def calculate_audio_response_score(audio_path, question):
+@interview_bp.route("/audio-job/<int:job_id>", methods=["GET"])
+@login_required
+def get_audio_job_status(job_id):
+    """Report the status and results of a background audio analysis job."""
+    try:
+        job = get_audio_job(job_id, current_user.id)
+        if not job:
+            return jsonify({"error": "Audio job not found"}), 404
+        return jsonify(job)
+    except Exception as e:
+        print(f"Error in get_audio_job_status: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({"error": "Failed to get audio job status"}), 500
+
+@interview_bp.route("/audio-cache", methods=["GET"])
+@login_required
+def get_audio_cache_stats():
+    """Report hit and miss counters of the audio feature cache."""
+    return jsonify(get_feature_cache(current_app.config).stats())
+
+@interview_bp.route("/audio-queue", methods=["GET"])
+@login_required
+def get_audio_queue_stats():
+    """Report the depth and wait times of the audio analysis queue."""
+    return jsonify(get_analysis_queue(current_app.config).stats())
+
+@interview_bp.route("/classify-queue", methods=["GET"])
+@login_required
+def get_classify_queue_stats():
+    """Report batch sizes and wait times of the text answer classification batcher."""
+    batcher = get_classification_batcher(current_app.config)
+    if batcher is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **batcher.stats()})
+
+@interview_bp.route("/model-registry", methods=["GET"])
+@login_required
+def get_model_registry_stats():
+    """Report the text classifier version being served and any rejected artifacts."""
+    return jsonify(get_model_registry(current_app.config).stats())
+
+@interview_bp.route("/audio-storage", methods=["GET"])
+@login_required
+def get_audio_storage_stats():
+    """Report stored audio sizes before and after transcoding, and the transcoder's throughput."""
+    conn = None
+    try:
+        conn = db.engine.raw_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT COUNT(*), COUNT(object_path), COALESCE(SUM(size), 0), "
+            "COALESCE(SUM(CASE WHEN object_path IS NULL THEN size END), 0) FROM audio_asset"
+        )
+        assets, transcoded, wav_bytes, untranscoded_bytes = cursor.fetchone()
+        # Objects are shared by identical recordings, so count each once
+        cursor.execute(
+            "SELECT COUNT(*), COALESCE(SUM(stored_size), 0) FROM "
+            "(SELECT object_path, MAX(stored_size) AS stored_size FROM audio_asset "
+            "WHERE object_path IS NOT NULL GROUP BY object_path)"
+        )
+        objects, object_bytes = cursor.fetchone()
+        conn.close()
+
+        stored_bytes = untranscoded_bytes + object_bytes
+        return jsonify({
+            "assets": assets,
+            "transcoded": transcoded,
+            "objects": objects,
+            "format": current_app.config.get('AUDIO_TRANSCODE_FORMAT', 'flac'),
+            "wav_bytes": wav_bytes,
+            "stored_bytes": stored_bytes,
+            "saved_bytes": wav_bytes - stored_bytes,
+            "transcoder": transcode_stats()
+        })
+    except Exception as e:
+        print(f"Error in get_audio_storage_stats: {str(e)}")
+        print(traceback.format_exc())
+        if conn:
+            try:
+                conn.close()
+            except:
+                pass
+        return jsonify({"error": "Failed to get audio storage stats"}), 500
+
+@interview_bp.route("/audio-features", methods=["GET"])
+@login_required
+def export_audio_features():
+    """Download the current user's stored audio feature vectors as one .npz matrix.
+
+    Optional query parameters: session_id, and start / end (ISO timestamps,
+    UTC) bounding the interview start time. The archive holds response_ids,
+    features (float32, one row per response) and columns (FEATURE_LAYOUT).
+    """
+    try:
+        session_id = request.args.get('session_id', type=int)
+        response_ids, matrix = load_feature_matrix(
+            user_id=current_user.id, session_id=session_id,
+            start=request.args.get('start'), end=request.args.get('end')
+        )
+        buf = io.BytesIO()
+        np.savez(buf, response_ids=response_ids, features=matrix, columns=np.array(FEATURE_LAYOUT))
+        buf.seek(0)
+        return send_file(buf, mimetype='application/octet-stream',
+                         as_attachment=True, download_name='audio_features.npz')
+    except Exception as e:
+        print(f"Error in export_audio_features: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({"error": "Failed to export audio features"}), 500
+
+def _answer_recording(cursor, response_id, user_id):
+    """Find the stored recording of one of the user's audio answers.
+
+    Returns (asset_id, blob store key, checksum, duration, peaks bytes) or
+    None; the key is the transcoded object once there is one. Answers
+    whose file was adopted by the sweeper are matched by name.
+    """
+    cursor.execute(
+        "SELECT r.session_id, r.response, a.id, COALESCE(a.object_path, a.path), "
+        "a.checksum, a.duration, a.peaks "
+        "FROM response r JOIN interview_session s ON s.id = r.session_id "
+        "LEFT JOIN audio_asset a ON a.response_id = r.id "
+        "WHERE r.id = ? AND s.user_id = ?",
+        (response_id, user_id)
+    )
+    row = cursor.fetchone()
+    if not row:
+        return None
+    session_id, response_text, asset = row[0], row[1], row[2:]
+
+    if asset[0] is None:
+        match = AUDIO_RESPONSE_TEXT.match(response_text or '')
+        if not match:
+            return None
+        cursor.execute(
+            "SELECT id, COALESCE(object_path, path), checksum, duration, peaks "
+            "FROM audio_asset WHERE path = ?",
+            (f'audio_{session_id}_{match.group(1)}.wav',)
+        )
+        asset = cursor.fetchone()
+        if not asset:
+            return None
+
+    asset_id, key, checksum, duration, peaks = asset
+    store = get_blob_store(current_app.config)
+    if not (store.local_path(key) or store.stat(key)):
+        return None
+    return asset_id, key, checksum, duration, peaks
+
+@interview_bp.route("/audio/<int:response_id>", methods=["GET"])
+@login_required
+def play_answer_audio(response_id):
+    """Stream an answer's recording, honoring Range and conditional requests.
+
+    A file on this node is handed to the WSGI server's file wrapper, which
+    serves full responses with sendfile where supported; with USE_X_SENDFILE
+    the front proxy serves it, ranges included. Recordings only held by a
+    remote blob store are redirected to a short-lived presigned URL, which
+    the store serves ranges from.
     """
-    Calculate a comprehensive score for an audio response based on multiple factors.
-    Returns a score between 1.0 and 5.0.
+    conn = db.engine.raw_connection()
+    try:
+        recording = _answer_recording(conn.cursor(), response_id, current_user.id)
+    finally:
+        conn.close()
+    if not recording:
+        return jsonify({"error": "Recording not found"}), 404
+
+    _, key, checksum, _, _ = recording
+    store = get_blob_store(current_app.config)
+    audio_path = store.local_path(key)
+    if not audio_path:
+        url = store.presigned_url(key, current_app.config.get('AUDIO_S3_URL_EXPIRY', 300))
+        if not url:
+            return jsonify({"error": "Recording not found"}), 404
+        return redirect(url)
+
+    # The ETag names the format too, as transcoding changes the bytes served
+    ext = os.path.splitext(audio_path)[1]
+    mimetype = AUDIO_MIMETYPES.get(ext, 'application/octet-stream')
+    return send_file(audio_path, mimetype=mimetype, conditional=True, etag=f"{checksum}{ext}" if checksum else True)
+
+@interview_bp.route("/audio/<int:response_id>/peaks", methods=["GET"])
+@login_required
+def get_answer_peaks(response_id):
+    """Return an answer's waveform as base64 int8 min/max pairs, for drawing without the audio."""
+    conn = None
+    try:
+        conn = db.engine.raw_connection()
+        cursor = conn.cursor()
+        recording = _answer_recording(cursor, response_id, current_user.id)
+        if not recording:
+            conn.close()
+            return jsonify({"error": "Recording not found"}), 404
+
+        asset_id, key, _, duration, peaks = recording
+        if peaks is None:
+            # Recordings stored before peaks were kept get them on first view
+            with get_blob_store(current_app.config).local_copy(key) as audio_path:
+                peaks, duration = file_peaks(audio_path)
+            peaks = peaks.tobytes()
+            cursor.execute(
+                "UPDATE audio_asset SET peaks = ?, duration = ? WHERE id = ?",
+                (peaks, duration, asset_id)
+            )
+            conn.commit()
+        conn.close()
+
+        return jsonify({
+            "response_id": response_id,
+            "duration": duration,
+            "buckets": len(peaks) // 2,
+            "peaks": base64.b64encode(peaks).decode('ascii')
+        })
+    except Exception as e:
+        print(f"Error in get_answer_peaks: {str(e)}")
+        print(traceback.format_exc())
+        if conn:
+            try:
+                conn.close()
+            except:
+                pass
+        return jsonify({"error": "Failed to get waveform"}), 500
+
+@interview_bp.route("/question-audio", methods=["GET"])
+def get_question_audio():
+    """Map question texts to their pre-rendered audio, built by build_question_audio.py.
+
+    The map is revalidated on every use through its ETag; the files it
+    points to are immutable, so a question is downloaded at most once.
     """
+    manifest = load_question_audio_manifest(current_app.config['QUESTION_AUDIO_DIR'])
+    if not manifest:
+        return jsonify({"error": "Question audio has not been built"}), 404
+
+    questions = {
+        text: url_for('interview.get_question_audio_file', filename=filename)
+        for text, filename in manifest['questions'].items()
+    }
+    response = jsonify({"format": manifest['format'], "questions": questions})
+    response.set_etag(hashlib.sha256(response.get_data()).hexdigest()[:32])
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@interview_bp.route("/question-audio/<filename>", methods=["GET"])
+def get_question_audio_file(filename):
+    """Serve one pre-rendered question as an immutable, long-cached static file."""
+    if not QUESTION_AUDIO_FILE.match(filename):
+        return jsonify({"error": "Question audio not found"}), 404
     try:
-        import wave
-        import contextlib
-        import numpy as np
-        import librosa
-        from pydub import AudioSegment
-        
-        # 1. Duration Analysis (25%)
-        with contextlib.closing(wave.open(audio_path, 'r')) as f:
-            frames = f.getnframes()
-            rate = f.getframerate()
-            duration = frames / float(rate)
-        
-        duration_score = 0.0
-        if duration < 10:  # Too short
-            duration_score = 2.0
-        elif duration < 30:  # A bit short
-            duration_score = 3.0
-        elif duration <= 120:  # Ideal range
-            duration_score = 5.0
-        elif duration <= 180:  # A bit long
-            duration_score = 4.0
-        else:  # Too long
-            duration_score = 3.0
-        
-        # 2. Audio Quality Analysis (25%)
-        y, sr = librosa.load(audio_path)
-        
-        # Calculate signal-to-noise ratio
-        noise_floor = np.mean(np.abs(y[y < np.mean(y)]))
-        signal_strength = np.mean(np.abs(y[y > np.mean(y)]))
-        snr = 20 * np.log10(signal_strength / (noise_floor + 1e-6))
-        quality_score = min(5.0, max(1.0, (snr + 20) / 20))
-        
-        # 3. Speech Clarity Analysis (25%)
-        # Calculate speech clarity using MFCCs
-        mfccs = librosa.feature.mfcc(y=y, sr=sr)
-        mfcc_var = np.var(mfccs)
-        clarity_score = min(5.0, max(1.0, 3 + mfcc_var))
-        
-        # 4. Engagement Analysis (25%)
-        # Calculate engagement based on pitch variation and energy dynamics
-        pitches, magnitudes = librosa.piptrack(y=y, sr=sr)
-        pitch_variation = np.std(pitches[pitches > 0])
-        energy_variation = np.std(librosa.feature.rms(y=y))
-        
-        engagement_score = min(5.0, max(1.0, 
-            2.5 + (pitch_variation / 100) + (energy_variation * 10)))
-        
-        # 5. Calculate final weighted score
-        final_score = (
-            0.25 * duration_score +     # Duration weight
-            0.25 * quality_score +      # Audio quality weight
-            0.25 * clarity_score +      # Speech clarity weight
-            0.25 * engagement_score     # Engagement weight
+        response = send_from_directory(
+            current_app.config['QUESTION_AUDIO_DIR'], filename,
+            mimetype=AUDIO_MIMETYPES['.' + filename.rsplit('.', 1)[1]],
+            max_age=QUESTION_AUDIO_MAX_AGE, etag=filename.split('.')[0]
         )
+    except NotFound:
+        return jsonify({"error": "Question audio not found"}), 404
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@interview_bp.route("/audio-stream/start", methods=["POST"])
+@login_required
+def start_audio_stream_upload():
+    """Open a chunked audio upload that is analyzed while the candidate speaks."""
+    conn = ticket = None
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "No data provided"}), 400
+        
+        try:
+            session_id = int(data.get("session_id"))
+            question_number = int(data.get("question_number"))
+            sample_rate = int(data.get("sample_rate", 0))
+        except (TypeError, ValueError):
+            return jsonify({"error": "Invalid session ID, question number or sample rate"}), 400
         
-        # Ensure score is between 1.0 and 5.0
-        final_score = min(5.0, max(1.0, final_score))
+        if not 8000 <= sample_rate <= 192000:
+            return jsonify({"error": "Unsupported sample rate"}), 400
         
-        return round(final_score, 2)
+        current_question = data.get("current_question", "Interview Question")
         
+        # Verify session belongs to current user
+        conn = db.engine.raw_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT user_id FROM interview_session WHERE id = ?",
+            (session_id,)
+        )
+        session_data = cursor.fetchone()
+        conn.close()
+        conn = None
+        
+        if not session_data or session_data[0] != current_user.id:
+            return jsonify({"error": "Invalid session"}), 403
+        
+        # A streamed answer holds a place in the analysis queue until it is
+        # finished or times out, so new ones are refused while it is full
+        queue = get_analysis_queue(current_app.config)
+        ticket = queue.reserve()
+        if ticket is None:
+            return _analysis_busy_response(queue)
+        
+        # The stages that fit in the analysis budget are chosen as for the
+        # longest upload accepted, since this one's length is not known yet
+        pitch_engine = current_app.config.get('PITCH_ENGINE', 'librosa')
+        stages = AnalysisBudget(current_app.config.get('AUDIO_ANALYSIS_BUDGET') or None, pitch_engine).plan(
+            current_app.config.get('AUDIO_STREAM_MAX_SECONDS', 600)
+        )
+        
+        upload_id = start_audio_stream(
+            get_blob_store(current_app.config),
+            current_app.config.get('AUDIO_STREAM_TIMEOUT', 600),
+            user_id=current_user.id,
+            session_id=session_id,
+            question_number=question_number,
+            question=current_question,
+            source_rate=sample_rate,
+            pitch_engine=pitch_engine,
+            vad_mode=current_app.config.get('AUDIO_VAD_MODE', 2),
+            stages=stages,
+            runner=pool_runner(current_app.config),
+            ticket=ticket
+        )
+        
+        return jsonify({"upload_id": upload_id})
     except Exception as e:
-        print(f"Error calculating audio score: {str(e)}")
-        return 3.0  # Default score if analysis fails
+        if ticket:
+            ticket.cancel()
+        print(f"Error in start_audio_stream_upload: {str(e)}")
+        print(traceback.format_exc())
+        if conn:
+            try:
+                conn.close()
+            except:
+                pass
+        return jsonify({"error": "Failed to start audio upload"}), 500
 
-def analyze_audio_sentiment(audio_path):
-    """
-    Analyze the sentiment of an audio response using multiple audio characteristics.
-    Returns 'positive', 'negative', or 'neutral' based on comprehensive analysis.
-    """
+@interview_bp.route("/audio-stream/<upload_id>/chunk", methods=["POST"])
+@login_required
+def append_audio_stream_chunk(upload_id):
+    """Append one chunk of 16-bit PCM to an open upload and analyze it."""
     try:
-        import librosa
-        import numpy as np
-        from scipy.stats import skew
-        
-        # Load the audio file
-        y, sr = librosa.load(audio_path)
-        
-        # 1. Extract audio features
-        # Mel-frequency cepstral coefficients (tone and vocal characteristics)
-        mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
-        mfcc_means = np.mean(mfccs, axis=1)
-        
-        # Spectral features
-        spectral_centroids = librosa.feature.spectral_centroid(y=y, sr=sr)[0]
-        spectral_rolloff = librosa.feature.spectral_rolloff(y=y, sr=sr)[0]
-        
-        # Energy and tempo features
-        tempo = librosa.beat.tempo(y=y, sr=sr)[0]
-        energy = np.mean(librosa.feature.rms(y=y))
-        
-        # Zero crossing rate (voice characteristics)
-        zcr = librosa.feature.zero_crossing_rate(y=y)[0]
-        
-        # 2. Calculate derived metrics
-        energy_variance = np.var(librosa.feature.rms(y=y))
-        pitch_variance = np.var(librosa.yin(y, fmin=librosa.note_to_hz('C2'), fmax=librosa.note_to_hz('C7')))
-        speech_rate = len(librosa.onset.onset_detect(y=y, sr=sr)) / (len(y) / sr)
-        
-        # 3. Score each component
-        scores = {
-            'energy_score': 1 if energy > 0.1 else (-1 if energy < 0.05 else 0),
-            'tempo_score': 1 if tempo > 120 else (-1 if tempo < 90 else 0),
-            'variance_score': 1 if energy_variance > 0.01 else (-1 if energy_variance < 0.005 else 0),
-            'pitch_score': 1 if pitch_variance > 0.1 else (-1 if pitch_variance < 0.05 else 0),
-            'speech_rate_score': 1 if speech_rate > 2.5 else (-1 if speech_rate < 1.5 else 0)
-        }
+        upload = get_audio_stream(upload_id, current_user.id)
+        if not upload:
+            return jsonify({"error": "Audio upload not found"}), 404
         
-        # 4. Calculate weighted sentiment score
-        weights = {
-            'energy_score': 0.3,
-            'tempo_score': 0.2,
-            'variance_score': 0.2,
-            'pitch_score': 0.15,
-            'speech_rate_score': 0.15
-        }
+        try:
+            seq = int(request.args.get("seq", upload['next_seq']))
+        except ValueError:
+            return jsonify({"error": "Invalid chunk sequence number"}), 400
         
-        total_score = sum(scores[key] * weights[key] for key in scores)
+        data = request.get_data()
+        max_seconds = current_app.config.get('AUDIO_STREAM_MAX_SECONDS', 600)
+        if seq >= upload['next_seq'] and (upload['samples'] + len(data) // 2) / float(upload['source_rate']) > max_seconds:
+            return jsonify({"error": f"Audio uploads are limited to {max_seconds} seconds"}), 413
         
-        # 5. Determine sentiment based on total score
-        if total_score > 0.3:
-            return 'positive'
-        elif total_score < -0.3:
-            return 'negative'
-        else:
-            return 'neutral'
-            
+        try:
+            accepted = append_audio_chunk(get_blob_store(current_app.config), upload, seq, data)
+        except ValueError as e:
+            return jsonify({"error": str(e), "expected_seq": upload['next_seq']}), 409
+        
+        return jsonify({
+            "received": accepted,
+            "next_seq": upload['next_seq'],
+            "duration": upload['samples'] / float(upload['source_rate'])
+        })
     except Exception as e:
-        print(f"Error analyzing audio sentiment: {str(e)}")
-        return 'neutral'
+        print(f"Error in append_audio_stream_chunk: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({"error": "Failed to process audio chunk"}), 500
 
-def classify_audio_response(audio_path, question):
-    """
-    Classify the type of audio response based on the question and audio characteristics.
-    Returns a response category.
-    """
+@interview_bp.route("/audio-stream/<upload_id>/finish", methods=["POST"])
+@login_required
+def finish_audio_stream_upload(upload_id):
+    """Finalize a streamed answer's score and store it like submit-audio."""
+    conn = None
+    upload = submission = None
     try:
-        # For now, return a basic classification based on the question
-        question_lower = question.lower()
-        
-        if 'experience' in question_lower or 'tell me about' in question_lower:
-            return 'narrative'
-        elif 'why' in question_lower:
-            return 'reasoning'
-        elif 'how would you' in question_lower or 'what would you' in question_lower:
-            return 'problem-solving'
-        elif 'strength' in question_lower or 'weakness' in question_lower:
-            return 'self-assessment'
-        else:
-            return 'general'
-            
+        upload = get_audio_stream(upload_id, current_user.id)
+        if not upload:
+            return jsonify({"error": "Audio upload not found"}), 404
+        store = get_blob_store(current_app.config)
+        session_id, question_number = upload['session_id'], upload['question_number']
+        
+        # An answer already stored, by this stream or by submit-audio, is
+        # replayed and the new recording dropped before it replaces the file
+        try:
+            submission = submission_key(request.headers, question_number)
+        except ValueError as e:
+            discard_audio_stream(store, upload)
+            return jsonify({"error": str(e)}), 400
+        replay = claim_submission(session_id, submission)
+        if replay:
+            discard_audio_stream(store, upload)
+            return _replayed_submission(replay, session_id)
+        
+        # The features were accumulated chunk by chunk; only the score is left
+        uploads_dir = current_app.config['UPLOAD_FOLDER']
+        os.makedirs(uploads_dir, exist_ok=True)
+        audio_path = os.path.join(uploads_dir, f'audio_{session_id}_{question_number}.wav')
+        features = finish_audio_stream(store, upload, audio_path,
+                                       current_app.config.get('PITCH_ENGINE', 'librosa'),
+                                       current_app.config.get('AUDIO_VAD_MODE', 2),
+                                       pool_runner(current_app.config))
+        if features is None:
+            release_submission(session_id, submission)
+            return jsonify({"error": "Audio upload not found"}), 404
+        print(f"Audio saved to: {audio_path}")
+        score, sentiment, response_category = score_audio_features(features, upload['question'])
+        size, checksum = file_checksum(audio_path)
+        peaks, duration = file_peaks(audio_path)
+        cache_features(
+            get_feature_cache(current_app.config),
+            feature_cache_key(checksum, current_app.config.get('PITCH_ENGINE', 'librosa'),
+                              current_app.config.get('AUDIO_VAD_MODE', 2)),
+            features
+        )
+        
+        conn = db.engine.raw_connection()
+        cursor = conn.cursor()
+        try:
+            response_id, is_complete = _store_audio_response(
+                cursor, session_id, upload['question'], question_number,
+                sentiment, response_category, score
+            )
+            record_audio_asset(cursor, uploads_dir, session_id,
+                               response_id, audio_path, size, checksum, duration, peaks)
+            store_feature_vector(cursor, session_id, response_id, feature_vector(features))
+            attach_submission_response(cursor, session_id, submission, response_id)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"Error storing audio response: {str(e)}")
+            raise
+        
+        if store.remote:
+            publish_audio_async(store, uploads_dir, audio_path)
+        
+        return _audio_submission_result(conn, cursor, session_id, question_number,
+                                        response_category, is_complete, {
+            "sentiment": sentiment,
+            "category": response_category,
+            "score": score,
+            "speech": features.speech,
+            "features_used": features.scored_features(),
+            "analysis_status": "done"
+        }, submission)
     except Exception as e:
-        print(f"Error classifying audio response: {str(e)}")
-        return 'general'
+        if submission:
+            release_submission(upload['session_id'], submission)
+        print(f"Error in finish_audio_stream_upload: {str(e)}")
+        print(traceback.format_exc())
+        if conn:
+            try:
+                conn.close()
+            except:
+                pass
+        return jsonify({
+            "error": "Failed to process audio submission",
+            "next_question": "Could you please try again?"
+        }), 500
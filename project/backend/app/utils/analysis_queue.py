@@ -0,0 +1,182 @@
+import math
+import threading
+import time
+from collections import deque
+
+# Waits kept for the percentile in AnalysisQueue.stats
+RECENT_WAITS = 200
+
+class AnalysisTicket:
+    """A place in the AnalysisQueue, held from admission until the analysis starts."""
+
+    def __init__(self, queue):
+        self.queue = queue
+        self.admitted_at = time.perf_counter()
+        self.started = False
+        self.cancelled = False
+
+    def cancel(self):
+        """Give the place back if the analysis never started. Safe to call twice."""
+        self.queue._cancel(self)
+
+class AnalysisQueue:
+    """Admission control for audio analysis.
+
+    At most max_active analyses run at once and at most max_waiting more
+    wait for a slot; reserve() returns None beyond that so the caller can
+    turn the request away before doing any work. Pool jobs wait in a FIFO
+    and are handed to the executor as slots free up, instead of piling up
+    in the executor's own unbounded queue. Safe to share between threads.
+    """
+
+    def __init__(self, max_active=2, max_waiting=16):
+        self.max_active = max(1, max_active)
+        self.max_waiting = max(0, max_waiting)
+        self.active = 0
+        self.waiting = 0
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._waits = deque(maxlen=RECENT_WAITS)
+        self._service_time = None
+        self.admitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def reserve(self, force=False):
+        """Take a place in the queue, or return None when it is full.
+
+        force admits the analysis even then, for work that cannot be refused.
+        """
+        with self._cond:
+            if not force and self.active + self.waiting >= self.max_active + self.max_waiting:
+                self.rejected += 1
+                return None
+            self.waiting += 1
+            self.admitted += 1
+            return AnalysisTicket(self)
+
+    def full(self):
+        """Whether reserve() would turn an analysis away right now."""
+        with self._cond:
+            return self.active + self.waiting >= self.max_active + self.max_waiting
+
+    def retry_after(self):
+        """Seconds a turned-away client should wait, from the recent analysis times."""
+        with self._cond:
+            service_time = self._service_time or 5.0
+            rounds = (self.waiting + 1) / float(self.max_active)
+            return max(1, int(math.ceil(rounds * service_time)))
+
+    def submit(self, ticket, executor, fn, args, callback):
+        """Run fn(*args) in executor once a slot is free, then callback(future)."""
+        with self._cond:
+            self._pending.append((ticket, executor, fn, args, callback))
+        self._dispatch()
+
+    def run_inline(self, ticket, fn, *args):
+        """Run fn(*args) in the calling thread once a slot is free and return its result."""
+        with self._cond:
+            while self.active >= self.max_active:
+                self._cond.wait()
+            self._start(ticket)
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self._finish(time.perf_counter() - started)
+
+    def stats(self):
+        with self._cond:
+            waits = sorted(self._waits)
+            started = self.admitted - self.waiting - self.cancelled
+            return {
+                "active": self.active,
+                "waiting": self.waiting,
+                "max_active": self.max_active,
+                "max_waiting": self.max_waiting,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "mean_wait": self.total_wait / started if started > 0 else 0.0,
+                "p95_wait": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+                "max_wait": self.max_wait,
+                "mean_analysis_time": self._service_time or 0.0
+            }
+
+    def _dispatch(self):
+        started = []
+        with self._cond:
+            while self._pending and self.active < self.max_active:
+                ticket, executor, fn, args, callback = self._pending.popleft()
+                if ticket.cancelled:
+                    continue
+                self._start(ticket)
+                started.append((executor, fn, args, callback))
+
+        for executor, fn, args, callback in started:
+            began = time.perf_counter()
+            try:
+                future = executor.submit(fn, *args)
+            except Exception:
+                self._finish(time.perf_counter() - began)
+                raise
+            future.add_done_callback(lambda f, began=began, callback=callback: self._done(f, began, callback))
+
+    def _done(self, future, began, callback):
+        self._finish(time.perf_counter() - began)
+        try:
+            callback(future)
+        finally:
+            self._dispatch()
+
+    def _start(self, ticket):
+        # Caller holds self._cond
+        wait = time.perf_counter() - ticket.admitted_at
+        ticket.started = True
+        self.waiting -= 1
+        self.active += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self._waits.append(wait)
+
+    def _finish(self, elapsed):
+        with self._cond:
+            self.active -= 1
+            self.completed += 1
+            if self._service_time is None:
+                self._service_time = elapsed
+            else:
+                self._service_time = 0.8 * self._service_time + 0.2 * elapsed
+            self._cond.notify_all()
+
+    def _cancel(self, ticket):
+        with self._cond:
+            if ticket.started or ticket.cancelled:
+                return
+            ticket.cancelled = True
+            self.waiting -= 1
+            self.cancelled += 1
+            self._cond.notify_all()
+
+# Queue shared by every request in this process, created on first use
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_analysis_queue(config):
+    """Return the process-wide AnalysisQueue configured from the app config.
+
+    AUDIO_ANALYSIS_WORKERS analyses run at once (one when they run inline)
+    and AUDIO_ANALYSIS_QUEUE more may wait.
+    """
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = AnalysisQueue(
+                config.get('AUDIO_ANALYSIS_WORKERS', 2) or 1,
+                config.get('AUDIO_ANALYSIS_QUEUE', 16)
+            )
+        return _queue
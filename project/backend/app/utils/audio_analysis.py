@@ -0,0 +1,404 @@
+import time
+import numpy as np
+from app.utils.pitch import estimate_pitch
+from app.utils.vad import trim_silence
+
+# Analysis parameters shared by every feature below, so the spectrogram is
+# computed once and reused instead of being rebuilt by each librosa call.
+SAMPLE_RATE = 22050
+N_FFT = 2048
+HOP_LENGTH = 512
+N_MFCC = 20
+
+# Number of leading MFCC coefficients summarised per recording
+N_MFCC_MEANS = 13
+
+# Tempo is estimated from the average tempogram over TEMPO_WINDOW seconds
+# of lag (librosa's default), built TEMPOGRAM_CHUNK frames at a time
+TEMPO_WINDOW = 8.0
+TEMPOGRAM_CHUNK = 2048
+
+# Optional feature groups, cheapest first, and the seconds each one takes
+# per second of audio on a typical core until real timings are measured.
+# 'base' is the decode and the cheap frame features that always run.
+ANALYSIS_STAGES = ('spectral', 'onsets', 'pitch')
+STAGE_COSTS = {
+    'base': 0.0015,
+    'spectral': 0.003,    # STFT, mel spectrum, MFCC, centroid, rolloff
+    'onsets': 0.0012,     # onset count and tempo, from the mel spectrum
+    'pitch': 0.0065,      # piptrack + yin; the numpy engine is ~5x cheaper
+}
+
+# Features the scorers read, in the order they are reported
+SCORED_FEATURES = ('duration', 'snr', 'energy', 'energy_std', 'mfcc_var',
+                   'onset_count', 'tempo', 'pitch_std', 'f0_var')
+
+class AudioFeatures:
+    """Summary features of an audio response, as read by the scorers.
+
+    Built either from one decode and STFT of the whole recording
+    (compute_audio_features) or incrementally from streamed chunks
+    (app.utils.audio_stream.AudioFeatureAccumulator). When voice activity
+    detection is on, everything but duration and snr is measured on the
+    speech only.
+    """
+
+    def __init__(self, duration, snr, mfcc_var, mfcc_means, spectral_centroid, spectral_rolloff,
+                 energy, energy_std, zcr, onset_count, tempo, pitch_std, f0_var, speech=None):
+        self.duration = duration                    # seconds
+        self.snr = snr                              # dB, from the waveform amplitude split
+        self.mfcc_var = mfcc_var                    # variance over every MFCC value
+        self.mfcc_means = mfcc_means                # mean of the first N_MFCC_MEANS coefficients
+        self.spectral_centroid = spectral_centroid  # mean, Hz
+        self.spectral_rolloff = spectral_rolloff    # mean, Hz
+        self.energy = energy                        # mean frame RMS
+        self.energy_std = energy_std                # standard deviation of frame RMS
+        self.zcr = zcr                              # mean zero crossing rate
+        self.onset_count = onset_count
+        self.tempo = tempo                          # BPM
+        self.pitch_std = pitch_std                  # std of the non-zero pitch track values
+        self.f0_var = f0_var                        # variance of the f0 track
+        self.speech = speech                        # speaking time and pauses (SpeechGate.metrics), or None
+
+    def scored_features(self):
+        """Names of the features the scorers could use; skipped stages leave theirs as None."""
+        return [name for name in SCORED_FEATURES if getattr(self, name) is not None]
+
+    @property
+    def complete(self):
+        return len(self.scored_features()) == len(SCORED_FEATURES)
+
+class AnalysisBudget:
+    """Decides which optional analysis stages fit in a time budget.
+
+    Each stage's cost per second of audio is learned from the stages run in
+    this process (an exponential moving average), starting from STAGE_COSTS.
+    A budget of None or 0 allows every stage.
+    """
+
+    _rates = {}
+
+    def __init__(self, seconds=None, pitch_engine='librosa'):
+        self.start = time.perf_counter()
+        self.deadline = self.start + seconds if seconds else None
+        self.pitch_engine = pitch_engine
+
+    def _key(self, stage):
+        return (stage, self.pitch_engine) if stage == 'pitch' else stage
+
+    def rate(self, stage):
+        default = STAGE_COSTS[stage]
+        if stage == 'pitch' and self.pitch_engine != 'librosa':
+            default /= 5
+        return AnalysisBudget._rates.get(self._key(stage), default)
+
+    def allows(self, stage, duration):
+        """Whether stage is expected to finish on duration seconds of audio in time."""
+        if self.deadline is None:
+            return True
+        return time.perf_counter() + self.rate(stage) * duration <= self.deadline
+
+    def plan(self, duration):
+        """Stages to run on a recording of this length, decided up front."""
+        if self.deadline is None:
+            return set(ANALYSIS_STAGES)
+        remaining = self.deadline - time.perf_counter() - self.rate('base') * duration
+        stages = set()
+        for stage in ANALYSIS_STAGES:
+            cost = self.rate(stage) * duration
+            if cost <= remaining:
+                stages.add(stage)
+                remaining -= cost
+        return stages
+
+    def record(self, stage, duration, elapsed):
+        """Fold a measured stage time into the cost estimate."""
+        if duration <= 0:
+            return
+        key = self._key(stage)
+        measured = elapsed / duration
+        previous = AnalysisBudget._rates.get(key)
+        AnalysisBudget._rates[key] = measured if previous is None else 0.8 * previous + 0.2 * measured
+
+def extract_audio_features(audio_path, pitch_engine='librosa', vad_mode=None, budget=None):
+    """Decode an audio file once and compute every feature used for scoring."""
+    from app.utils.audio_decode import load_audio
+
+    y, _ = load_audio(audio_path, SAMPLE_RATE)
+    return compute_audio_features(y, SAMPLE_RATE, pitch_engine, vad_mode, budget)
+
+def mean_tempogram(onset_env, sr):
+    """Time average of librosa's centered tempogram of an onset envelope.
+
+    The full tempogram holds several hundred lags for every frame; summing it
+    TEMPOGRAM_CHUNK frames at a time keeps memory bounded by the chunk.
+    """
+    import librosa
+
+    win_length = librosa.time_to_frames(TEMPO_WINDOW, sr=sr, hop_length=HOP_LENGTH).item()
+    n_frames = len(onset_env)
+    padded = np.pad(onset_env, win_length // 2, mode='linear_ramp', end_values=0)
+
+    total = np.zeros(win_length)
+    for start in range(0, n_frames, TEMPOGRAM_CHUNK):
+        stop = min(start + TEMPOGRAM_CHUNK, n_frames)
+        tg = librosa.feature.tempogram(
+            onset_envelope=padded[start:stop + win_length - 1], sr=sr,
+            hop_length=HOP_LENGTH, win_length=win_length, center=False
+        )
+        total += tg.sum(axis=1)
+    return total / n_frames
+
+def onset_features(onset_env, sr):
+    """Onset count and tempo from an onset strength envelope."""
+    import librosa
+
+    onset_count = len(librosa.onset.onset_detect(onset_envelope=onset_env, sr=sr, hop_length=HOP_LENGTH))
+    tg = mean_tempogram(onset_env, sr)[:, np.newaxis]
+    tempo = librosa.feature.tempo(tg=tg, sr=sr, hop_length=HOP_LENGTH, aggregate=None)[0]
+    return onset_count, float(tempo)
+
+def compute_audio_features(y, sr, pitch_engine='librosa', vad_mode=None, budget=None):
+    """Compute AudioFeatures from a decoded mono signal.
+
+    pitch_engine selects the pitch tracker from app.utils.pitch. vad_mode is
+    a webrtcvad aggressiveness (0-3); when set, silence is trimmed before the
+    spectral, pitch and onset features are computed. None or a negative
+    value analyzes every sample.
+
+    budget is a time limit in seconds. Duration, SNR, RMS and ZCR are always
+    computed; the ANALYSIS_STAGES after them only run while they are expected
+    to finish in time, and the features of skipped stages are left as None.
+    """
+    import librosa
+
+    budget = AnalysisBudget(budget, pitch_engine)
+    duration = len(y) / float(sr)
+
+    # Signal-to-noise ratio straight from the waveform, silence included
+    noise_floor = np.mean(np.abs(y[y < np.mean(y)]))
+    signal_strength = np.mean(np.abs(y[y > np.mean(y)]))
+    snr = 20 * np.log10(signal_strength / (noise_floor + 1e-6))
+
+    # Only the speech goes through the expensive features below
+    speech = None
+    if vad_mode is not None and vad_mode >= 0:
+        voiced, speech = trim_silence(y, sr, vad_mode)
+        if len(voiced):
+            y = voiced
+    analyzed = len(y) / float(sr)
+
+    # Frame-domain features that need the waveform itself
+    rms = librosa.feature.rms(y=y, frame_length=N_FFT, hop_length=HOP_LENGTH)[0]
+    zcr = librosa.feature.zero_crossing_rate(y=y, frame_length=N_FFT, hop_length=HOP_LENGTH)[0]
+
+    features = AudioFeatures(
+        duration=duration,
+        snr=float(snr),
+        mfcc_var=None,
+        mfcc_means=None,
+        spectral_centroid=None,
+        spectral_rolloff=None,
+        energy=float(np.mean(rms)),
+        energy_std=float(np.std(rms)),
+        zcr=float(np.mean(zcr)),
+        onset_count=None,
+        tempo=None,
+        pitch_std=None,
+        f0_var=None,
+        speech=speech
+    )
+
+    # One magnitude spectrogram feeds the spectral, pitch and mel features
+    S = mel_db = None
+    if budget.allows('spectral', analyzed):
+        started = time.perf_counter()
+        S = np.abs(librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH))
+        mel_db = librosa.power_to_db(librosa.feature.melspectrogram(S=S ** 2, sr=sr))
+
+        mfccs = librosa.feature.mfcc(S=mel_db, n_mfcc=N_MFCC)
+        features.mfcc_var = float(np.var(mfccs))
+        features.mfcc_means = np.mean(mfccs[:N_MFCC_MEANS], axis=1)
+        features.spectral_centroid = float(np.mean(librosa.feature.spectral_centroid(S=S, sr=sr)[0]))
+        features.spectral_rolloff = float(np.mean(librosa.feature.spectral_rolloff(S=S, sr=sr)[0]))
+        budget.record('spectral', analyzed, time.perf_counter() - started)
+
+    # Onsets and tempo share the same onset strength envelope
+    if mel_db is not None and budget.allows('onsets', analyzed):
+        started = time.perf_counter()
+        onset_env = librosa.onset.onset_strength(S=mel_db, sr=sr)
+        features.onset_count, features.tempo = onset_features(onset_env, sr)
+        budget.record('onsets', analyzed, time.perf_counter() - started)
+
+    if budget.allows('pitch', analyzed):
+        started = time.perf_counter()
+        pitches, f0 = estimate_pitch(y, sr, S=S, engine=pitch_engine)
+        features.pitch_std = float(np.std(pitches[pitches > 0]))
+        features.f0_var = float(np.var(f0))
+        budget.record('pitch', analyzed, time.perf_counter() - started)
+
+    return features
+
+def calculate_audio_response_score(features, question):
+    """
+    Calculate a comprehensive score for an audio response based on multiple factors.
+    Components whose features were not computed are left out and the
+    remaining weights rescaled. Returns a score between 1.0 and 5.0.
+    """
+    try:
+        # 1. Duration Analysis (25%)
+        duration = features.duration
+
+        duration_score = 0.0
+        if duration < 10:  # Too short
+            duration_score = 2.0
+        elif duration < 30:  # A bit short
+            duration_score = 3.0
+        elif duration <= 120:  # Ideal range
+            duration_score = 5.0
+        elif duration <= 180:  # A bit long
+            duration_score = 4.0
+        else:  # Too long
+            duration_score = 3.0
+
+        # 2. Audio Quality Analysis (25%)
+        quality_score = min(5.0, max(1.0, (features.snr + 20) / 20))
+
+        # 3. Speech Clarity Analysis (25%)
+        # Calculate speech clarity using MFCCs
+        mfcc_var = features.mfcc_var
+        clarity_score = None
+        if mfcc_var is not None:
+            clarity_score = min(5.0, max(1.0, 3 + mfcc_var))
+
+        # 4. Engagement Analysis (25%)
+        # Calculate engagement based on pitch variation and energy dynamics
+        pitch_variation = features.pitch_std
+        energy_variation = features.energy_std
+
+        engagement_score = None
+        if pitch_variation is not None:
+            engagement_score = min(5.0, max(1.0,
+                2.5 + (pitch_variation / 100) + (energy_variation * 10)))
+
+        # 5. Calculate final weighted score over the measured components
+        components = [
+            (0.25, duration_score),     # Duration weight
+            (0.25, quality_score),      # Audio quality weight
+            (0.25, clarity_score),      # Speech clarity weight
+            (0.25, engagement_score)    # Engagement weight
+        ]
+        measured = [(weight, score) for weight, score in components if score is not None]
+        final_score = sum(weight * score for weight, score in measured) / sum(weight for weight, _ in measured)
+
+        # Ensure score is between 1.0 and 5.0
+        final_score = min(5.0, max(1.0, final_score))
+
+        return round(float(final_score), 2)
+
+    except Exception as e:
+        print(f"Error calculating audio score: {str(e)}")
+        return 3.0  # Default score if analysis fails
+
+def analyze_audio_sentiment(features):
+    """
+    Analyze the sentiment of an audio response using multiple audio characteristics.
+    Components whose features were not computed are left out.
+    Returns 'positive', 'negative', or 'neutral' based on comprehensive analysis.
+    """
+    try:
+        # 1. Derived metrics from the shared features
+        energy = features.energy
+        energy_variance = features.energy_std ** 2
+        pitch_variance = features.f0_var
+        speech_rate = None
+        if features.onset_count is not None:
+            speech_rate = features.onset_count / features.duration if features.duration > 0 else 0.0
+        tempo = features.tempo
+
+        # 2. Score each component
+        scores = {
+            'energy_score': 1 if energy > 0.1 else (-1 if energy < 0.05 else 0),
+            'tempo_score': None if tempo is None else (1 if tempo > 120 else (-1 if tempo < 90 else 0)),
+            'variance_score': 1 if energy_variance > 0.01 else (-1 if energy_variance < 0.005 else 0),
+            'pitch_score': None if pitch_variance is None else
+                (1 if pitch_variance > 0.1 else (-1 if pitch_variance < 0.05 else 0)),
+            'speech_rate_score': None if speech_rate is None else
+                (1 if speech_rate > 2.5 else (-1 if speech_rate < 1.5 else 0))
+        }
+
+        # 3. Calculate weighted sentiment score
+        weights = {
+            'energy_score': 0.3,
+            'tempo_score': 0.2,
+            'variance_score': 0.2,
+            'pitch_score': 0.15,
+            'speech_rate_score': 0.15
+        }
+
+        measured = [key for key in scores if scores[key] is not None]
+        total_score = sum(scores[key] * weights[key] for key in measured) / sum(weights[key] for key in measured)
+
+        # 4. Determine sentiment based on total score
+        if total_score > 0.3:
+            return 'positive'
+        elif total_score < -0.3:
+            return 'negative'
+        else:
+            return 'neutral'
+
+    except Exception as e:
+        print(f"Error analyzing audio sentiment: {str(e)}")
+        return 'neutral'
+
+def classify_audio_response(audio_path, question):
+    """
+    Classify the type of audio response based on the question and audio characteristics.
+    Returns a response category.
+    """
+    try:
+        # For now, return a basic classification based on the question
+        question_lower = question.lower()
+
+        if 'experience' in question_lower or 'tell me about' in question_lower:
+            return 'narrative'
+        elif 'why' in question_lower:
+            return 'reasoning'
+        elif 'how would you' in question_lower or 'what would you' in question_lower:
+            return 'problem-solving'
+        elif 'strength' in question_lower or 'weakness' in question_lower:
+            return 'self-assessment'
+        else:
+            return 'general'
+
+    except Exception as e:
+        print(f"Error classifying audio response: {str(e)}")
+        return 'general'
+
+def score_audio_features(features, question):
+    """Run every audio scorer over one set of features.
+
+    Returns a (score, sentiment, category) tuple.
+    """
+    score = calculate_audio_response_score(features, question)
+    sentiment = analyze_audio_sentiment(features)
+    category = classify_audio_response(None, question)
+    return score, sentiment, category
+
+def analyze_audio_samples(y, sr, question, pitch_engine='librosa', vad_mode=None):
+    """Score an already decoded mono signal; see score_audio_features."""
+    return score_audio_features(compute_audio_features(y, sr, pitch_engine, vad_mode), question)
+
+def analyze_audio(audio_path, question, pitch_engine='librosa', vad_mode=None):
+    """Decode a stored audio file and score it; see score_audio_features.
+
+    If the recording cannot be decoded the scorers fall back to their
+    defaults, as before.
+    """
+    try:
+        features = extract_audio_features(audio_path, pitch_engine, vad_mode)
+    except Exception as e:
+        print(f"Error extracting audio features: {str(e)}")
+        return 3.0, 'neutral', classify_audio_response(audio_path, question)
+
+    return score_audio_features(features, question)
@@ -0,0 +1,281 @@
+import io
+import shutil
+import struct
+import subprocess
+import threading
+import numpy as np
+from app.utils.audio_analysis import SAMPLE_RATE
+
+# Containers libsndfile (soundfile) can decode directly
+SOUNDFILE_FORMATS = {'wav', 'flac', 'ogg', 'mp3', 'aiff'}
+
+# Source frames decoded at a time by iter_audio_blocks
+BLOCK_FRAMES = 65536
+
+# EBML IDs of the WebM elements _webm_duration reads
+WEBM_SEGMENT = 0x18538067
+WEBM_INFO = 0x1549A966
+WEBM_TIMECODE_SCALE = 0x2AD7B1
+WEBM_DURATION = 0x4489
+WEBM_CLUSTER = 0x1F43B675
+WEBM_TIMECODE = 0xE7
+WEBM_BLOCK_GROUP = 0xA0
+WEBM_BLOCK = 0xA1
+WEBM_SIMPLE_BLOCK = 0xA3
+# Elements whose children are read; the contents of all others are skipped
+WEBM_MASTERS = {WEBM_SEGMENT, WEBM_INFO, WEBM_CLUSTER, WEBM_BLOCK_GROUP}
+
+class AudioDecodeError(ValueError):
+    """Raised when uploaded bytes cannot be decoded as audio."""
+
+class AudioDecoderUnavailable(AudioDecodeError):
+    """Raised for a WebM or MP4 upload when pydub or ffmpeg is not installed: the server's fault, not the upload's."""
+
+# Whether pydub and ffmpeg are installed, checked on first use
+_decoder_available = None
+
+def decoder_available():
+    """Whether containers soundfile cannot read (WebM, MP4) can be decoded.
+
+    pydub runs ffmpeg to decode them and ffprobe to read their format (or
+    libav's avconv and avprobe), so both have to be installed.
+    """
+    global _decoder_available
+    if _decoder_available is None:
+        try:
+            import pydub
+            _decoder_available = bool(shutil.which('ffmpeg') and shutil.which('ffprobe')
+                                      or shutil.which('avconv') and shutil.which('avprobe'))
+        except ImportError:
+            _decoder_available = False
+    return _decoder_available
+
+def detect_audio_format(data):
+    """Identify the container of an audio upload from its leading bytes.
+
+    Browsers label MediaRecorder output as whatever the page asked for, so the
+    declared MIME type and file name cannot be trusted.
+    """
+    if data[:4] == b'RIFF' and data[8:12] == b'WAVE':
+        return 'wav'
+    if data[:4] == b'OggS':
+        return 'ogg'
+    if data[:4] == b'fLaC':
+        return 'flac'
+    if data[:4] == b'\x1a\x45\xdf\xa3':
+        return 'webm'
+    if data[:4] == b'FORM' and data[8:12] in (b'AIFF', b'AIFC'):
+        return 'aiff'
+    if data[4:8] == b'ftyp':
+        return 'mp4'
+    if data[:3] == b'ID3' or (len(data) > 1 and data[0] == 0xFF and data[1] & 0xE0 == 0xE0):
+        return 'mp3'
+    return None
+
+def decode_audio(data, sr=SAMPLE_RATE):
+    """Decode audio bytes into one mono float32 buffer at sr.
+
+    Returns (y, audio_format). WAV, FLAC, Ogg and MP3 are decoded in memory by
+    soundfile; WebM and MP4 (Chrome and Safari MediaRecorder output) go
+    through pydub, which needs ffmpeg; without it they raise
+    AudioDecoderUnavailable.
+    """
+    import soxr
+
+    audio_format = detect_audio_format(data)
+    if audio_format is None:
+        raise AudioDecodeError("Unrecognized audio format")
+    if audio_format not in SOUNDFILE_FORMATS and not decoder_available():
+        raise AudioDecoderUnavailable(f"Cannot decode {audio_format} audio: ffmpeg is not installed on the server")
+
+    try:
+        if audio_format in SOUNDFILE_FORMATS:
+            import soundfile as sf
+            y, source_rate = sf.read(io.BytesIO(data), dtype='float32', always_2d=True)
+        else:
+            from pydub import AudioSegment
+            segment = AudioSegment.from_file(io.BytesIO(data), format=audio_format)
+            scale = float(1 << (8 * segment.sample_width - 1))
+            y = np.array(segment.get_array_of_samples(), dtype=np.float32) / scale
+            y = y.reshape(-1, segment.channels)
+            source_rate = segment.frame_rate
+    except Exception as e:
+        raise AudioDecodeError(f"Could not decode {audio_format} audio: {str(e)}")
+
+    # Mix down to mono and resample once
+    y = y.mean(axis=1)
+    if not len(y):
+        raise AudioDecodeError("Audio upload is empty")
+    if source_rate != sr:
+        y = soxr.resample(y, source_rate, sr)
+    return np.ascontiguousarray(y, dtype=np.float32), audio_format
+
+def load_audio(audio_path, sr=SAMPLE_RATE):
+    """Decode a stored audio file; see decode_audio."""
+    with open(audio_path, 'rb') as f:
+        return decode_audio(f.read(), sr)
+
+def _sniff(f):
+    """Detect the format of a seekable binary file, leaving it at the start."""
+    f.seek(0)
+    audio_format = detect_audio_format(f.read(12))
+    f.seek(0)
+    return audio_format
+
+def _ebml_vint(data, pos, marker):
+    """The EBML variable-length integer at pos as (value, next pos, unknown).
+
+    marker keeps the length marker bit, as element IDs are written; unknown
+    is whether a size has every bit set, which means "unknown size".
+    """
+    first = data[pos]
+    length = 1
+    while length <= 8 and not first & (0x100 >> length):
+        length += 1
+    if length > 8 or pos + length > len(data):
+        raise ValueError("Truncated EBML integer")
+    value = first if marker else first & (0xFF >> length)
+    for byte in data[pos + 1:pos + length]:
+        value = value << 8 | byte
+    return value, pos + length, not marker and value == (1 << 7 * length) - 1
+
+def _webm_duration(data):
+    """Duration in seconds of WebM bytes, or None when it cannot be told.
+
+    MediaRecorder writes WebM live, without a Duration in its header, so
+    the timestamp of the last block is used instead. Only element headers
+    are parsed; the audio itself is skipped, not decoded.
+    """
+    scale, duration, cluster, last = 1000000, None, 0, None
+    pos = 0
+    try:
+        while pos < len(data):
+            element, pos, _ = _ebml_vint(data, pos, True)
+            size, pos, unknown = _ebml_vint(data, pos, False)
+            if element in WEBM_MASTERS:
+                continue
+            payload = data[pos:pos + size]
+            if element == WEBM_TIMECODE_SCALE:
+                scale = int.from_bytes(payload, 'big')
+            elif element == WEBM_DURATION and size in (4, 8):
+                duration = struct.unpack('>f' if size == 4 else '>d', payload)[0]
+            elif element == WEBM_TIMECODE:
+                cluster = int.from_bytes(payload, 'big')
+            elif element in (WEBM_SIMPLE_BLOCK, WEBM_BLOCK):
+                # The track number, then the block's time relative to its cluster
+                _, start, _ = _ebml_vint(data, pos, False)
+                timestamp = cluster + int.from_bytes(data[start:start + 2], 'big', signed=True)
+                last = timestamp if last is None else max(last, timestamp)
+            if unknown:
+                break
+            pos += size
+    except (IndexError, ValueError):
+        pass  # a truncated recording still has the blocks read so far
+    if duration:
+        return duration * scale / 1e9
+    if last is not None:
+        return last * scale / 1e9
+    return None
+
+def probe_audio_duration(f):
+    """Duration in seconds of a seekable audio file, without decoding it.
+
+    Read from the header, or for WebM from the block timestamps. Returns
+    None for MP4 and for unreadable files. The file is left at the start.
+    """
+    import soundfile as sf
+
+    audio_format = _sniff(f)
+    try:
+        if audio_format == 'webm':
+            return _webm_duration(f.read())
+        if audio_format not in SOUNDFILE_FORMATS:
+            return None
+        return sf.info(f).duration
+    except Exception:
+        return None
+    finally:
+        f.seek(0)
+
+def iter_audio_blocks(source, sr=SAMPLE_RATE, block_frames=BLOCK_FRAMES):
+    """Decode audio one block at a time, as mono float32 at sr.
+
+    source is a path or a seekable binary file. Only block_frames source
+    frames and the resampler state are held at once, so memory does not grow
+    with the recording. Containers soundfile cannot read are piped through
+    ffmpeg, which decodes, mixes down and resamples them as they are read.
+    """
+    import soundfile as sf
+    import soxr
+
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            yield from iter_audio_blocks(f, sr, block_frames)
+        return
+
+    audio_format = _sniff(source)
+    if audio_format is None:
+        raise AudioDecodeError("Unrecognized audio format")
+    if audio_format not in SOUNDFILE_FORMATS:
+        yield from _ffmpeg_blocks(source, audio_format, sr, block_frames)
+        return
+
+    try:
+        with sf.SoundFile(source) as f:
+            resampler = None
+            if f.samplerate != sr:
+                resampler = soxr.ResampleStream(f.samplerate, sr, 1, dtype='float32')
+            for block in f.blocks(blocksize=block_frames, dtype='float32', always_2d=True):
+                y = block.mean(axis=1)
+                if resampler is not None:
+                    y = resampler.resample_chunk(y)
+                yield y
+            if resampler is not None:
+                yield resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+    except RuntimeError as e:
+        raise AudioDecodeError(f"Could not decode {audio_format} audio: {str(e)}")
+
+def _ffmpeg_blocks(f, audio_format, sr, block_frames):
+    """Decode a file through an ffmpeg process, as mono float32 at sr, block_frames samples at a time."""
+    if not decoder_available():
+        raise AudioDecoderUnavailable(f"Cannot decode {audio_format} audio: ffmpeg is not installed on the server")
+    process = subprocess.Popen(
+        [shutil.which('ffmpeg') or shutil.which('avconv'), '-v', 'error', '-i', 'pipe:0',
+         '-f', 'f32le', '-ac', '1', '-ar', str(sr), 'pipe:1'],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+
+    def feed():
+        try:
+            shutil.copyfileobj(f, process.stdin, 1 << 16)
+        except OSError:
+            pass  # ffmpeg exited early; its error is reported below
+        finally:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+
+    # Written from another thread so a full stdout pipe cannot block the input
+    writer = threading.Thread(target=feed, name='ffmpeg-feed', daemon=True)
+    writer.start()
+    samples = 0
+    try:
+        while True:
+            data = process.stdout.read(4 * block_frames)
+            if not data:
+                break
+            samples += len(data) // 4
+            yield np.frombuffer(data[:len(data) - len(data) % 4], dtype='<f4')
+        error = process.stderr.read().decode('utf-8', 'replace').strip()
+        if process.wait() != 0:
+            raise AudioDecodeError(f"Could not decode {audio_format} audio: {error}")
+        if not samples:
+            raise AudioDecodeError("Audio upload is empty")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        writer.join()
+        process.stdout.close()
+        process.stderr.close()
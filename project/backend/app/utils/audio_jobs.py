@@ -0,0 +1,388 @@
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ProcessPoolExecutor
+from flask import current_app
+from app.models.interview import db
+from app.utils.audio_analysis import SAMPLE_RATE, compute_audio_features, score_audio_features
+from app.utils.audio_stream import extract_audio_features_blocked
+from app.utils.analysis_queue import get_analysis_queue
+from app.utils.blob_storage import get_blob_store
+from app.utils.warmup import warm_up_pipeline
+from app.utils.feature_cache import feature_cache_key, get_feature_cache
+from app.utils.feature_store import feature_vector, store_feature_vector
+from app.utils.vad import SPEECH_METRICS
+
+# Process pool shared by every request in this worker, created on first use
+_executor = None
+_executor_lock = threading.Lock()
+
+def _init_worker(niceness, warmup):
+    """Pool initializer: yield the CPU to the web workers under audio load and,
+    when warmup is a (pitch_engine, vad_mode) pair, warm up the pipeline."""
+    if niceness and hasattr(os, 'nice'):
+        try:
+            os.nice(niceness)
+        except OSError:
+            pass
+    if warmup:
+        try:
+            warm_up_pipeline(*warmup)
+        except Exception as e:
+            print(f"Error warming up audio worker {os.getpid()}: {str(e)}")
+
+def warm_worker():
+    """No-op pool task; returning means the worker that ran it has warmed up."""
+    return os.getpid()
+
+def get_executor(config):
+    """Return the shared audio analysis process pool, configured from the app config."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            warmup = None
+            if config.get('AUDIO_WARMUP', 1):
+                warmup = (config.get('PITCH_ENGINE', 'librosa'), config.get('AUDIO_VAD_MODE', 2))
+            _executor = ProcessPoolExecutor(
+                max_workers=config.get('AUDIO_ANALYSIS_WORKERS', 2), initializer=_init_worker,
+                initargs=(config.get('AUDIO_ANALYSIS_NICE', 10), warmup)
+            )
+        return _executor
+
+def pool_runner(config):
+    """Run analysis steps through the AnalysisQueue, for AudioFeatureAccumulator.
+
+    Returns a function that runs fn(*args) in the shared worker pool, or
+    inline when AUDIO_ANALYSIS_WORKERS is 0, once the queue has a free
+    slot, and returns a Future of the result. Steps are always admitted:
+    the upload they belong to was admitted when it started. Cancelling the
+    Future before the step starts takes it out of the queue.
+    """
+    queue = get_analysis_queue(config)
+    executor = get_executor(config) if config.get('AUDIO_ANALYSIS_WORKERS', 2) > 0 else None
+
+    def run(fn, *args):
+        future = Future()
+        ticket = queue.reserve(force=True)
+        if executor is None:
+            future.set_running_or_notify_cancel()
+            try:
+                future.set_result(queue.run_inline(ticket, fn, *args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        def cancelled(future):
+            if future.cancelled():
+                ticket.cancel()
+
+        def done(result):
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(result.result())
+            except Exception as e:
+                future.set_exception(e)
+
+        future.add_done_callback(cancelled)
+        queue.submit(ticket, executor, fn, args, done)
+        return future
+
+    return run
+
+def create_audio_job(cursor, session_id, response_id, audio_path, question):
+    """Insert a queued audio job using the caller's cursor and return its ID."""
+    cursor.execute(
+        "INSERT INTO audio_job (session_id, response_id, audio_path, question, status, created_at) "
+        "VALUES (?, ?, ?, ?, 'queued', datetime('now'))",
+        (session_id, response_id, audio_path, question)
+    )
+    return cursor.lastrowid
+
+def extract_job_features(samples, audio_path, pitch_engine='librosa', vad_mode=None, budget=None):
+    """Compute one recording's AudioFeatures in a pool worker.
+
+    samples is the decoded recording at SAMPLE_RATE, or None to read the
+    stored file at audio_path in bounded-memory blocks instead. budget is
+    the analysis time limit in seconds, or None for no limit.
+    """
+    if samples is None:
+        return extract_audio_features_blocked(audio_path, pitch_engine, vad_mode, budget)
+    return compute_audio_features(samples, SAMPLE_RATE, pitch_engine, vad_mode, budget)
+
+def job_result(features, question):
+    """(score, sentiment, category, speech, features_used, vector) for complete_audio_job.
+
+    speech is the recording's speech statistics, or None when voice
+    activity detection is off; features_used names the features the score
+    was computed from, and vector packs them all for the feature store.
+    """
+    return score_audio_features(features, question) + (
+        features.speech, features.scored_features(), feature_vector(features)
+    )
+
+def cache_features(cache, cache_key, features):
+    """Cache features unless the time budget cut the analysis short."""
+    if cache_key and features.complete:
+        cache.put(cache_key, features)
+
+def submit_audio_job(job_id, samples, question, audio_path=None, checksum=None, ticket=None):
+    """Run the analysis for a queued job in the worker pool.
+
+    samples is the decoded mono recording at SAMPLE_RATE, or None for long
+    recordings already stored at audio_path, which the worker then reads
+    block by block. checksum is the SHA-256 of the stored WAV; recordings
+    already in the feature cache are scored from it without reaching the
+    pool. The job must already be committed. When AUDIO_ANALYSIS_WORKERS is
+    0 the analysis runs inline and the job is finished before this returns.
+    AUDIO_ANALYSIS_BUDGET caps the seconds spent on the optional features.
+
+    ticket is the job's place in the AnalysisQueue, reserved before the
+    upload was decoded; without one the job is admitted regardless of load.
+    """
+    app = current_app._get_current_object()
+    max_workers = app.config.get('AUDIO_ANALYSIS_WORKERS', 2)
+    pitch_engine = app.config.get('PITCH_ENGINE', 'librosa')
+    vad_mode = app.config.get('AUDIO_VAD_MODE', 2)
+    budget = app.config.get('AUDIO_ANALYSIS_BUDGET') or None
+    queue = get_analysis_queue(app.config)
+    if ticket is None:
+        ticket = queue.reserve(force=True)
+
+    cache = get_feature_cache(app.config)
+    cache_key = feature_cache_key(checksum, pitch_engine, vad_mode) if checksum else None
+    features = cache.get(cache_key) if cache_key else None
+    if features is not None:
+        ticket.cancel()
+        complete_audio_job(job_id, job_result(features, question))
+        return
+
+    if max_workers <= 0:
+        try:
+            features = queue.run_inline(ticket, extract_job_features, samples, audio_path,
+                                        pitch_engine, vad_mode, budget)
+        except Exception as e:
+            fail_audio_job(job_id, str(e))
+            return
+        cache_features(cache, cache_key, features)
+        complete_audio_job(job_id, job_result(features, question))
+        return
+
+    executor = get_executor(app.config)
+    queue.submit(
+        ticket, executor, extract_job_features, (samples, audio_path, pitch_engine, vad_mode, budget),
+        lambda f: _on_job_done(app, job_id, question, cache_key, f)
+    )
+
+def _on_job_done(app, job_id, question, cache_key, future):
+    """Write a finished job's result back from the pool's callback thread."""
+    with app.app_context():
+        try:
+            features = future.result()
+        except Exception as e:
+            print(f"Audio job {job_id} failed: {str(e)}")
+            fail_audio_job(job_id, str(e))
+            return
+        cache_features(get_feature_cache(app.config), cache_key, features)
+        complete_audio_job(job_id, job_result(features, question))
+
+def complete_audio_job(job_id, result):
+    """Store a job's score and sentiment on its response and session."""
+    score, sentiment, category, speech, features_used, vector = result
+    speech = speech or {}
+
+    conn = db.engine.raw_connection()
+    cursor = conn.cursor()
+
+    try:
+        # Only the first result is stored: a job submitted again after a
+        # restart may also still be finishing on another node
+        cursor.execute(
+            "UPDATE audio_job SET status = 'done', score = ?, sentiment = ?, category = ?, "
+            "speaking_time = ?, speech_ratio = ?, pause_count = ?, mean_pause = ?, longest_pause = ?, "
+            "features_used = ?, finished_at = datetime('now') WHERE id = ? AND status = 'queued'",
+            (score, sentiment, category) + tuple(speech.get(name) for name in SPEECH_METRICS) +
+            (','.join(features_used), job_id)
+        )
+        if cursor.rowcount != 1:
+            conn.rollback()
+            conn.close()
+            return
+
+        cursor.execute(
+            "SELECT session_id, response_id FROM audio_job WHERE id = ?",
+            (job_id,)
+        )
+        session_id, response_id = cursor.fetchone()
+
+        cursor.execute(
+            "UPDATE response SET score = ?, sentiment = ?, category = ? WHERE id = ?",
+            (score, sentiment, category, response_id)
+        )
+        cursor.execute(
+            "UPDATE interview_session SET total_score = total_score + ? WHERE id = ?",
+            (score, session_id)
+        )
+        store_feature_vector(cursor, session_id, response_id, vector)
+
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        print(f"Error completing audio job {job_id}: {str(e)}")
+        print(traceback.format_exc())
+        try:
+            conn.rollback()
+            conn.close()
+        except:
+            pass
+
+def fail_audio_job(job_id, error):
+    """Mark a job as failed, leaving its response at the placeholder score."""
+    conn = db.engine.raw_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            "UPDATE audio_job SET status = 'failed', error = ?, finished_at = datetime('now') "
+            "WHERE id = ? AND status = 'queued'",
+            (error, job_id)
+        )
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        print(f"Error failing audio job {job_id}: {str(e)}")
+        try:
+            conn.close()
+        except:
+            pass
+
+def get_audio_job(job_id, user_id):
+    """Return a job's status and results if it belongs to the user, else None."""
+    conn = db.engine.raw_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            "SELECT j.id, j.session_id, j.response_id, j.status, j.score, j.sentiment, j.category, "
+            "j.error, j.created_at, j.finished_at, "
+            "j.speaking_time, j.speech_ratio, j.pause_count, j.mean_pause, j.longest_pause, j.features_used "
+            "FROM audio_job j JOIN interview_session s ON s.id = j.session_id "
+            "WHERE j.id = ? AND s.user_id = ?",
+            (job_id, user_id)
+        )
+        job_data = cursor.fetchone()
+        conn.close()
+    except Exception:
+        try:
+            conn.close()
+        except:
+            pass
+        raise
+
+    if not job_data:
+        return None
+
+    return {
+        "job_id": job_data[0],
+        "session_id": job_data[1],
+        "response_id": job_data[2],
+        "status": job_data[3],
+        "score": job_data[4],
+        "sentiment": job_data[5],
+        "category": job_data[6],
+        "error": job_data[7],
+        "created_at": job_data[8],
+        "finished_at": job_data[9],
+        "speech": dict(zip(SPEECH_METRICS, job_data[10:15])) if job_data[10] is not None else None,
+        "features_used": job_data[15].split(',') if job_data[15] else None
+    }
+
+def ensure_requeued_at_column(conn):
+    """Add audio_job.requeued_at to databases created before job recovery."""
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(audio_job)")
+    if 'requeued_at' not in [column[1] for column in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE audio_job ADD COLUMN requeued_at DATETIME")
+        conn.commit()
+
+def recover_audio_jobs(timeout):
+    """Submit again the jobs still queued timeout seconds after they were queued.
+
+    Queued jobs only live in the memory of the process that accepted them,
+    so a restart loses them and their answers would keep the placeholder
+    score. A lost job is claimed by setting requeued_at, which keeps other
+    processes from claiming it too, and analyzed from its stored file; a
+    job still queued timeout seconds after that, or whose file is gone, is
+    failed so rescore_audio.py picks the answer up. Must run inside an app
+    context. Returns (resubmitted, failed).
+    """
+    store = get_blob_store(current_app.config)
+    conn = db.engine.raw_connection()
+    cursor = conn.cursor()
+    lost = []
+
+    try:
+        cursor.execute(
+            "SELECT j.id, j.audio_path, j.question, j.requeued_at, a.path, a.checksum "
+            "FROM audio_job j LEFT JOIN audio_asset a ON a.response_id = j.response_id "
+            "WHERE j.status = 'queued' AND COALESCE(j.requeued_at, j.created_at) < datetime('now', ?)",
+            (f'-{int(timeout)} seconds',)
+        )
+        for job_id, audio_path, question, requeued_at, key, checksum in cursor.fetchall():
+            if requeued_at is not None:
+                lost.append((job_id, None, question, None, 'Analysis did not finish after being resubmitted'))
+                continue
+            if not os.path.exists(audio_path):
+                audio_path = store.local_path(key) if key else None
+            if not audio_path:
+                lost.append((job_id, None, question, None, 'Recording is no longer stored on this node'))
+                continue
+            cursor.execute(
+                "UPDATE audio_job SET requeued_at = datetime('now') WHERE id = ? AND status = 'queued' "
+                "AND requeued_at IS NULL",
+                (job_id,)
+            )
+            conn.commit()
+            if cursor.rowcount == 1:
+                lost.append((job_id, audio_path, question, checksum, None))
+        conn.close()
+    except Exception:
+        try:
+            conn.rollback()
+            conn.close()
+        except:
+            pass
+        raise
+
+    resubmitted = failed = 0
+    for job_id, audio_path, question, checksum, error in lost:
+        if error:
+            fail_audio_job(job_id, error)
+            failed += 1
+        else:
+            submit_audio_job(job_id, None, question, audio_path, checksum)
+            resubmitted += 1
+    return resubmitted, failed
+
+def start_audio_job_recovery(app):
+    """Run recover_audio_jobs now and then every AUDIO_JOB_TIMEOUT seconds in a daemon thread."""
+    timeout = app.config.get('AUDIO_JOB_TIMEOUT', 900)
+    if timeout <= 0:
+        return None
+
+    def run():
+        while True:
+            try:
+                with app.app_context():
+                    resubmitted, failed = recover_audio_jobs(timeout)
+                if resubmitted or failed:
+                    print(f"Audio job recovery: {resubmitted} resubmitted, {failed} failed")
+            except Exception as e:
+                print(f"Error recovering audio jobs: {str(e)}")
+                print(traceback.format_exc())
+            time.sleep(timeout)
+
+    thread = threading.Thread(target=run, name='audio-job-recovery', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,333 @@
+import hashlib
+import io
+import os
+import re
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from app.models.interview import db
+from app.utils.blob_storage import LocalBlobStore, get_blob_store
+from app.utils.feature_cache import get_feature_cache
+from app.utils.waveform import file_peaks
+
+# Single background writer so uploads are acknowledged before they hit disk
+_writer = ThreadPoolExecutor(max_workers=1)
+
+# Stored answers are named audio_<session_id>_<question_number>.wav
+AUDIO_FILENAME = re.compile(r'^audio_(\d+)_(\d+)\.wav$')
+
+# Directory under the upload folder holding transcoded, content-addressed answers
+OBJECTS_DIR = 'objects'
+
+def encode_wav(samples, sr):
+    """Encode a decoded recording as 16-bit WAV bytes."""
+    import soundfile as sf
+
+    buf = io.BytesIO()
+    sf.write(buf, samples, sr, subtype='PCM_16', format='WAV')
+    return buf.getvalue()
+
+def write_audio(audio_path, data):
+    """Write encoded audio to disk, replacing any previous file atomically."""
+    partial_path = audio_path + '.part'
+    try:
+        with open(partial_path, 'wb') as f:
+            f.write(data)
+        os.replace(partial_path, audio_path)
+        print(f"Audio saved to: {audio_path}")
+    except Exception as e:
+        print(f"Error saving audio file {audio_path}: {str(e)}")
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+def write_audio_blocks(audio_path, blocks, sr):
+    """Write decoded blocks to disk as 16-bit WAV without holding the whole recording.
+
+    Returns (size, SHA-256 hex digest) of the written file.
+    """
+    import soundfile as sf
+
+    partial_path = audio_path + '.part'
+    try:
+        with sf.SoundFile(partial_path, 'w', samplerate=sr, channels=1, subtype='PCM_16', format='WAV') as f:
+            for block in blocks:
+                f.write(block)
+        os.replace(partial_path, audio_path)
+        print(f"Audio saved to: {audio_path}")
+    except Exception as e:
+        print(f"Error saving audio file {audio_path}: {str(e)}")
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    return file_checksum(audio_path)
+
+def save_audio_async(audio_path, data):
+    """Persist encoded audio in the background and return the future."""
+    return _writer.submit(write_audio, audio_path, data)
+
+def publish_audio(store, key, audio_path):
+    """Copy a file written to the upload folder into the blob store."""
+    try:
+        store.put_file(key, audio_path)
+    except Exception as e:
+        # The sweeper uploads spooled files the store is missing
+        print(f"Error storing audio file {key}: {str(e)}")
+        raise
+
+def publish_audio_async(store, upload_folder, audio_path):
+    """Publish a stored answer in the background, after any pending write of it."""
+    return _writer.submit(publish_audio, store, os.path.relpath(audio_path, upload_folder), audio_path)
+
+def file_checksum(path, chunk_size=1 << 20):
+    """Return (size, SHA-256 hex digest) of a file, read in chunks."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return size, digest.hexdigest()
+
+def record_audio_asset(cursor, upload_folder, session_id, response_id, audio_path, size, checksum,
+                       duration=None, peaks=None):
+    """Track a stored audio file using the caller's cursor and return its ID.
+
+    peaks are the recording's int8 waveform peaks (app.utils.waveform). A
+    re-recorded answer reuses its file name, so any row already tracking the
+    path is replaced. The caller commits.
+    """
+    path = os.path.relpath(audio_path, upload_folder)
+    cursor.execute("DELETE FROM audio_asset WHERE path = ?", (path,))
+    cursor.execute(
+        "INSERT INTO audio_asset (session_id, response_id, path, size, checksum, duration, peaks, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, datetime('now'))",
+        (session_id, response_id, path, size, checksum, duration,
+         peaks.tobytes() if peaks is not None else None)
+    )
+    return cursor.lastrowid
+
+def asset_key(path, object_path=None):
+    """Blob store key holding an asset: its transcoded object if any, else the WAV."""
+    return object_path or path
+
+def delete_session_assets(cursor, session_id):
+    """Delete a session's asset rows and return the blob store keys of their files.
+
+    Transcoded objects still used by another asset are kept. The blobs
+    themselves should only be deleted once the caller commits.
+    """
+    cursor.execute("SELECT path, object_path FROM audio_asset WHERE session_id = ?", (session_id,))
+    rows = cursor.fetchall()
+    cursor.execute("DELETE FROM audio_asset WHERE session_id = ?", (session_id,))
+
+    keys = [path for path, _ in rows]
+    for object_path in {object_path for _, object_path in rows if object_path}:
+        cursor.execute("SELECT 1 FROM audio_asset WHERE object_path = ? LIMIT 1", (object_path,))
+        if not cursor.fetchone():
+            keys.append(object_path)
+    return keys
+
+def remove_audio_files(paths):
+    """Remove stored audio files and return how many were removed."""
+    removed = 0
+    for path in paths:
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Could not delete audio file {path}: {str(e)}")
+    return removed
+
+def sweep_audio_assets(upload_folder, batch_size=500, grace=3600, store=None):
+    """Reconcile upload_folder and the blob store with the audio_asset table.
+
+    Rows whose blob is gone are deleted, or re-uploaded when this node still
+    has the file. Untracked files are adopted when they are named after a
+    session that still exists, and removed otherwise, along with abandoned
+    .part files; transcoded objects no row refers to are removed too. With
+    a remote store, files the store already holds are then pruned from the
+    upload folder. Anything younger than grace seconds is left alone so
+    uploads still being written are never touched. Work is done batch_size
+    rows or files at a time, each batch in its own transaction. Must run
+    inside an app context.
+    """
+    store = store or LocalBlobStore(upload_folder)
+    stats = {'rows_removed': 0, 'files_uploaded': 0, 'files_adopted': 0, 'files_removed': 0,
+             'objects_removed': 0, 'spool_removed': 0}
+    cutoff = time.time() - grace
+    _sweep_rows(store, batch_size, cutoff, stats)
+    if os.path.isdir(upload_folder):
+        _sweep_files(upload_folder, store, batch_size, cutoff, stats)
+    _sweep_objects(store, batch_size, cutoff, stats)
+    if store.remote:
+        stats['spool_removed'] += store.prune_spool(cutoff)
+    return stats
+
+def _sweep_rows(store, batch_size, cutoff, stats):
+    """Delete asset rows older than cutoff whose blob no longer exists."""
+    last_id = 0
+    while True:
+        conn = db.engine.raw_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT id, path, object_path FROM audio_asset "
+                "WHERE id > ? AND created_at < datetime(?, 'unixepoch') ORDER BY id LIMIT ?",
+                (last_id, cutoff, batch_size)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+
+            missing = []
+            for asset_id, path, object_path in rows:
+                key = asset_key(path, object_path)
+                if store.stat(key):
+                    continue
+                # A failed upload is retried from the node that wrote the file
+                local_path = store.local_path(key)
+                if local_path:
+                    try:
+                        store.put_file(key, local_path)
+                        stats['files_uploaded'] += 1
+                        continue
+                    except Exception as e:
+                        print(f"Could not store audio file {key}: {str(e)}")
+                        continue
+                missing.append((asset_id,))
+            if missing:
+                cursor.executemany("DELETE FROM audio_asset WHERE id = ?", missing)
+                conn.commit()
+                stats['rows_removed'] += len(missing)
+        finally:
+            conn.close()
+        if len(rows) < batch_size:
+            return
+
+def _sweep_files(upload_folder, store, batch_size, cutoff, stats):
+    """Adopt or remove untracked files older than cutoff, one batch at a time."""
+    batch = []
+    with os.scandir(upload_folder) as entries:
+        for entry in entries:
+            if not (AUDIO_FILENAME.match(entry.name) or entry.name.endswith('.part')):
+                continue
+            try:
+                if not entry.is_file() or entry.stat().st_mtime >= cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            batch.append(entry.name)
+            if len(batch) >= batch_size:
+                _reconcile_files(upload_folder, store, batch, stats)
+                batch = []
+    if batch:
+        _reconcile_files(upload_folder, store, batch, stats)
+
+def _reconcile_files(upload_folder, store, names, stats):
+    conn = db.engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        placeholders = ','.join('?' * len(names))
+        cursor.execute(f"SELECT path FROM audio_asset WHERE path IN ({placeholders})", names)
+        tracked = {row[0] for row in cursor.fetchall()}
+        untracked = [name for name in names if name not in tracked]
+
+        # Answers saved before assets were tracked are adopted if their session still exists
+        session_ids = {}
+        for name in untracked:
+            match = AUDIO_FILENAME.match(name)
+            if match:
+                session_ids[name] = int(match.group(1))
+        live_sessions = set()
+        if session_ids:
+            ids = sorted(set(session_ids.values()))
+            placeholders = ','.join('?' * len(ids))
+            cursor.execute(f"SELECT id FROM interview_session WHERE id IN ({placeholders})", ids)
+            live_sessions = {row[0] for row in cursor.fetchall()}
+
+        orphans = []
+        for name in untracked:
+            path = os.path.join(upload_folder, name)
+            if session_ids.get(name) in live_sessions:
+                try:
+                    size, checksum = file_checksum(path)
+                    peaks, duration = file_peaks(path)
+                except FileNotFoundError:
+                    continue
+                except Exception as e:
+                    print(f"Could not read audio file {path}: {str(e)}")
+                    peaks = duration = None
+                store.put_file(name, path)
+                record_audio_asset(cursor, upload_folder, session_ids[name], None, path, size, checksum,
+                                   duration, peaks)
+                stats['files_adopted'] += 1
+            else:
+                orphans.append(path)
+        conn.commit()
+    finally:
+        conn.close()
+
+    stats['files_removed'] += remove_audio_files(orphans)
+
+def _sweep_objects(store, batch_size, cutoff, stats):
+    """Remove transcoded objects older than cutoff that no asset refers to."""
+    batch = []
+    for key, _, mtime in store.list(OBJECTS_DIR + '/'):
+        if mtime >= cutoff:
+            continue
+        batch.append(key)
+        if len(batch) >= batch_size:
+            _remove_unreferenced_objects(store, batch, stats)
+            batch = []
+    if batch:
+        _remove_unreferenced_objects(store, batch, stats)
+
+def _remove_unreferenced_objects(store, object_paths, stats):
+    conn = db.engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        placeholders = ','.join('?' * len(object_paths))
+        cursor.execute(f"SELECT object_path FROM audio_asset WHERE object_path IN ({placeholders})", object_paths)
+        referenced = {row[0] for row in cursor.fetchall()}
+    finally:
+        conn.close()
+
+    orphans = [path for path in object_paths if path not in referenced]
+    if orphans:
+        stats['objects_removed'] += store.delete(orphans)
+
+def start_audio_sweeper(app):
+    """Run sweep_audio_assets every AUDIO_SWEEP_INTERVAL seconds in a daemon thread.
+
+    Each pass also trims the feature cache's directory to AUDIO_FEATURE_CACHE_MAX_BYTES.
+    """
+    interval = app.config.get('AUDIO_SWEEP_INTERVAL', 3600)
+    if interval <= 0:
+        return None
+
+    def run():
+        while True:
+            try:
+                with app.app_context():
+                    stats = sweep_audio_assets(
+                        app.config['UPLOAD_FOLDER'],
+                        app.config.get('AUDIO_SWEEP_BATCH', 500),
+                        app.config.get('AUDIO_SWEEP_GRACE', 3600),
+                        get_blob_store(app.config)
+                    )
+                    stats['cached_features_removed'] = get_feature_cache(app.config).prune()
+                if any(stats.values()):
+                    print(f"Audio sweep: {stats}")
+            except Exception as e:
+                print(f"Error sweeping audio files: {str(e)}")
+                print(traceback.format_exc())
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name='audio-sweeper', daemon=True)
+    thread.start()
+    return thread
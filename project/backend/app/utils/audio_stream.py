@@ -0,0 +1,535 @@
+import io
+import os
+import threading
+import time
+from collections import deque
+import numpy as np
+from app.models.interview import db
+from app.utils.audio_analysis import (
+    SAMPLE_RATE, N_FFT, HOP_LENGTH, N_MFCC, N_MFCC_MEANS, ANALYSIS_STAGES, AnalysisBudget,
+    AudioFeatures, onset_features
+)
+from app.utils.pitch import estimate_pitch
+from app.utils.vad import SpeechGate
+from app.utils.tokens import generate_token
+
+# Samples buffered before a block of frames is analyzed
+BLOCK_LENGTH = SAMPLE_RATE
+
+class RunningStats:
+    """Count, mean and variance of a stream of values without keeping them."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        self.count += values.size
+        self.total += float(values.sum())
+        self.total_sq += float(np.dot(values, values))
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else float('nan')
+
+    @property
+    def var(self):
+        if not self.count:
+            return float('nan')
+        return max(0.0, self.total_sq / self.count - self.mean ** 2)
+
+    @property
+    def std(self):
+        return float(np.sqrt(self.var))
+
+class AudioFeatureAccumulator:
+    """Build AudioFeatures incrementally from consecutive pieces of a signal.
+
+    Samples are framed on the same centered N_FFT/HOP_LENGTH grid as
+    compute_audio_features and analyzed one block of whole frames at a time,
+    so memory stays bounded by BLOCK_LENGTH no matter how long the recording
+    is. Frame statistics are kept as running sums; only the onset envelope
+    (one value per frame) is kept so onsets and tempo can be found at the end.
+
+    Results track the whole-file analysis closely but not exactly: dB
+    clipping for the mel spectrum and the SNR amplitude split are applied per
+    block rather than over the whole recording. With vad_mode set, samples
+    pass through the same SpeechGate as compute_audio_features before they
+    are framed. stages limits the optional ANALYSIS_STAGES that are computed;
+    the features of the others are left as None.
+
+    Blocks are analyzed in the calling thread unless runner is given: it is
+    called as runner(fn, *args) and returns a concurrent.futures.Future, so
+    blocks can be analyzed in the worker pool while more samples arrive.
+    Their results are merged in order; finalize waits for the last ones.
+    """
+
+    def __init__(self, sr=SAMPLE_RATE, pitch_engine='librosa', vad_mode=None, stages=None, runner=None):
+        self.sr = sr
+        self.pitch_engine = pitch_engine
+        self.runner = runner
+        self._pending = deque()
+        self.stages = set(ANALYSIS_STAGES if stages is None else stages)
+        if 'spectral' not in self.stages:
+            self.stages.discard('onsets')  # onsets come from the mel spectrum
+        self.n_samples = 0
+        self._gate = None
+        if vad_mode is not None and vad_mode >= 0:
+            self._gate = SpeechGate(sr, vad_mode)
+        # Leading zeros reproduce librosa's centered framing
+        self._buffer = np.zeros(N_FFT // 2, dtype=np.float32)
+        self._noise = RunningStats()
+        self._signal = RunningStats()
+        self._mfcc = RunningStats()
+        self._mfcc_sums = np.zeros(N_MFCC_MEANS)
+        self._centroid = RunningStats()
+        self._rolloff = RunningStats()
+        self._rms = RunningStats()
+        self._zcr = RunningStats()
+        self._pitch = RunningStats()
+        self._f0 = RunningStats()
+        self._onset_env = []
+        self._last_mel = None
+
+    def add(self, y):
+        """Feed the next mono float samples at self.sr."""
+        y = np.asarray(y, dtype=np.float32).ravel()
+        if not len(y):
+            return
+
+        self.n_samples += len(y)
+
+        threshold = np.mean(y)
+        self._noise.add(np.abs(y[y < threshold]))
+        self._signal.add(np.abs(y[y > threshold]))
+
+        if self._gate is not None:
+            y = self._gate.add(y)
+        self._buffer = np.concatenate([self._buffer, y])
+        if len(self._buffer) >= BLOCK_LENGTH:
+            self._process_buffer()
+
+    def finalize(self):
+        """Analyze the remaining samples and return the AudioFeatures."""
+        if self._gate is not None:
+            self._buffer = np.concatenate([self._buffer, self._gate.flush()])
+        tail = np.zeros(N_FFT // 2, dtype=np.float32)
+        self._buffer = np.concatenate([self._buffer, tail])
+        if len(self._buffer) < N_FFT:
+            self._buffer = np.pad(self._buffer, (0, N_FFT - len(self._buffer)))
+        self._process_buffer()
+        self._merge_pending(wait=True)
+
+        if 'onsets' not in self.stages:
+            onset_count, tempo = None, None
+        elif self._onset_env:
+            onset_env = np.concatenate(self._onset_env)
+            if self.runner is not None:
+                onset_count, tempo = self.runner(onset_features, onset_env, self.sr).result()
+            else:
+                onset_count, tempo = onset_features(onset_env, self.sr)
+        else:
+            onset_count, tempo = 0, 0.0
+        spectral = 'spectral' in self.stages
+        pitch = 'pitch' in self.stages
+
+        snr = 20 * np.log10(self._signal.mean / (self._noise.mean + 1e-6))
+        mfcc_means = self._mfcc_sums / (self._mfcc.count / N_MFCC) if self._mfcc.count else self._mfcc_sums
+
+        return AudioFeatures(
+            duration=self.n_samples / float(self.sr),
+            snr=float(snr),
+            mfcc_var=self._mfcc.var if spectral else None,
+            mfcc_means=mfcc_means if spectral else None,
+            spectral_centroid=self._centroid.mean if spectral else None,
+            spectral_rolloff=self._rolloff.mean if spectral else None,
+            energy=self._rms.mean,
+            energy_std=self._rms.std,
+            zcr=self._zcr.mean,
+            onset_count=onset_count,
+            tempo=tempo,
+            pitch_std=self._pitch.std if pitch else None,
+            f0_var=self._f0.var if pitch else None,
+            speech=self._gate.metrics() if self._gate is not None else None
+        )
+
+    def _process_buffer(self):
+        """Analyze every whole frame in the buffer, keeping the overlap."""
+        if len(self._buffer) < N_FFT:
+            return
+        n_frames = 1 + (len(self._buffer) - N_FFT) // HOP_LENGTH
+        block = self._buffer[:(n_frames - 1) * HOP_LENGTH + N_FFT]
+        self._buffer = self._buffer[n_frames * HOP_LENGTH:]
+        args = (block, self.sr, self.stages, self.pitch_engine)
+        if self.runner is None:
+            self._merge(analyze_block(*args))
+            return
+        self._pending.append(self.runner(analyze_block, *args))
+        self._merge_pending(wait=False)
+
+    def cancel(self):
+        """Drop the blocks still waiting for the runner; the features cannot be finalized afterwards."""
+        while self._pending:
+            self._pending.popleft().cancel()
+
+    def _merge_pending(self, wait):
+        """Merge the analyzed blocks in order, up to the first unfinished one unless wait."""
+        while self._pending and (wait or self._pending[0].done()):
+            self._merge(self._pending.popleft().result())
+
+    def _merge(self, result):
+        """Fold one block's frame features (see analyze_block) into the running statistics."""
+        self._rms.add(result['rms'])
+        self._zcr.add(result['zcr'])
+
+        if 'mel_db' in result:
+            mel_db = result['mel_db']
+            self._mfcc.add(result['mfcc'])
+            self._mfcc_sums += result['mfcc'][:N_MFCC_MEANS].sum(axis=1)
+            self._centroid.add(result['centroid'])
+            self._rolloff.add(result['rolloff'])
+
+            # Spectral flux against the previous frame, as librosa's onset_strength
+            previous = self._last_mel if self._last_mel is not None else mel_db[:, :1]
+            flux = np.maximum(0.0, np.diff(np.hstack([previous, mel_db]), axis=1))
+            self._onset_env.append(flux.mean(axis=0))
+            self._last_mel = mel_db[:, -1:]
+
+        if 'pitches' in result:
+            self._pitch.add(result['pitches'])
+            self._f0.add(result['f0'])
+
+def analyze_block(block, sr, stages, pitch_engine='librosa'):
+    """Frame features of one block of whole, uncentered frames, for AudioFeatureAccumulator.
+
+    Returns a dict of arrays; the mel spectrum is included so the caller
+    can compute the spectral flux across block boundaries.
+    """
+    import librosa
+
+    result = {
+        'rms': librosa.feature.rms(y=block, frame_length=N_FFT, hop_length=HOP_LENGTH, center=False),
+        'zcr': librosa.feature.zero_crossing_rate(block, frame_length=N_FFT, hop_length=HOP_LENGTH, center=False),
+    }
+
+    S = None
+    if 'spectral' in stages:
+        S = np.abs(librosa.stft(block, n_fft=N_FFT, hop_length=HOP_LENGTH, center=False))
+        mel_db = librosa.power_to_db(librosa.feature.melspectrogram(S=S ** 2, sr=sr))
+        result['mel_db'] = mel_db
+        result['mfcc'] = librosa.feature.mfcc(S=mel_db, n_mfcc=N_MFCC)
+        result['centroid'] = librosa.feature.spectral_centroid(S=S, sr=sr)
+        result['rolloff'] = librosa.feature.spectral_rolloff(S=S, sr=sr)
+
+    if 'pitch' in stages:
+        pitches, f0 = estimate_pitch(block, sr, S=S, engine=pitch_engine, center=False)
+        result['pitches'] = pitches[pitches > 0]
+        result['f0'] = f0
+    return result
+
+def extract_audio_features_blocked(source, pitch_engine='librosa', vad_mode=None, budget=None):
+    """Compute AudioFeatures from a file read one block at a time.
+
+    source is a path or a seekable binary file; see iter_audio_blocks. Peak
+    memory is set by the block sizes rather than the recording length.
+    budget is a time limit in seconds, as for compute_audio_features; since
+    blocks are analyzed as they are read, the stages that fit are chosen up
+    front from the recording's length.
+    """
+    from app.utils.audio_decode import iter_audio_blocks, probe_audio_duration
+
+    stages = None
+    if budget:
+        if isinstance(source, str):
+            with open(source, 'rb') as f:
+                duration = probe_audio_duration(f)
+        else:
+            duration = probe_audio_duration(source)
+        if duration is not None:
+            stages = AnalysisBudget(budget, pitch_engine).plan(duration)
+    accumulator = AudioFeatureAccumulator(SAMPLE_RATE, pitch_engine, vad_mode, stages)
+    for block in iter_audio_blocks(source, SAMPLE_RATE):
+        accumulator.add(block)
+    if not accumulator.n_samples:
+        raise ValueError("Audio file is empty")
+    return accumulator.finalize()
+
+# Blob store keys of the chunks of uploads in progress, one object per chunk
+STREAM_PREFIX = 'streams/'
+
+def stream_chunk_key(upload_id, seq):
+    return f"{STREAM_PREFIX}{upload_id}-{seq:06d}.pcm"
+
+class StreamAnalysis:
+    """Features of a chunked upload, accumulated as its chunks arrive.
+
+    Chunks are raw 16-bit little-endian mono PCM at source_rate, resampled
+    into an AudioFeatureAccumulator computing only the given stages.
+    next_seq is the first chunk not fed yet; a process that misses a chunk
+    drops its StreamAnalysis and the upload is analyzed from its stored
+    chunks when it is finished. runner is passed on to the accumulator.
+
+    ticket is the upload's place in the AnalysisQueue, held from the start
+    of the upload and given back by release().
+    """
+
+    def __init__(self, source_rate, pitch_engine='librosa', vad_mode=None, stages=None, runner=None,
+                 ticket=None):
+        import soxr
+
+        self.next_seq = 0
+        self.last_seen = time.time()
+        self.lock = threading.Lock()
+        self.ticket = ticket
+        self._resampler = None
+        if source_rate != SAMPLE_RATE:
+            self._resampler = soxr.ResampleStream(source_rate, SAMPLE_RATE, 1, dtype='float32')
+        self.accumulator = AudioFeatureAccumulator(SAMPLE_RATE, pitch_engine, vad_mode, stages, runner)
+
+    def add(self, pcm):
+        samples = pcm.astype(np.float32) / 32768.0
+        if self._resampler is not None:
+            samples = self._resampler.resample_chunk(samples)
+        self.accumulator.add(samples)
+        self.next_seq += 1
+        self.last_seen = time.time()
+
+    def finish(self):
+        if self._resampler is not None:
+            self.accumulator.add(self._resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True))
+        return self.accumulator.finalize()
+
+    def release(self):
+        if self.ticket is not None:
+            self.ticket.cancel()
+
+    def cancel(self):
+        """release() and stop analyzing, for an upload that will not be finished here."""
+        self.release()
+        self.accumulator.cancel()
+
+# Analyses of the uploads whose chunks reached this process, keyed by upload
+# ID. The uploads themselves are rows of the audio_stream table, so any
+# worker can take a chunk; when every chunk of an upload reaches the same
+# process (sticky routing), finishing it only has to finalize the features.
+_analyses = {}
+_analyses_lock = threading.Lock()
+
+def _forget_analysis(upload_id, cancel=True):
+    with _analyses_lock:
+        analysis = _analyses.pop(upload_id, None)
+    if analysis is not None:
+        if cancel:
+            analysis.cancel()
+        else:
+            analysis.release()
+    return analysis
+
+def _stream_row(cursor, upload_id):
+    cursor.execute(
+        "SELECT upload_id, user_id, session_id, question_number, question, source_rate, next_seq, samples, "
+        "stages FROM audio_stream WHERE upload_id = ?",
+        (upload_id,)
+    )
+    row = cursor.fetchone()
+    if not row:
+        return None
+    keys = ('upload_id', 'user_id', 'session_id', 'question_number', 'question', 'source_rate',
+            'next_seq', 'samples')
+    stream = dict(zip(keys, row))
+    stream['stages'] = set(row[8].split(',')) if row[8] else set()
+    return stream
+
+def _chunk_keys(streams):
+    """Blob store keys of the chunks of (upload_id, next_seq) pairs."""
+    # Chunk next_seq is there too when a request stored it but failed to record it
+    return [stream_chunk_key(upload_id, seq) for upload_id, next_seq in streams for seq in range(next_seq + 1)]
+
+def _delete_chunks(store, streams):
+    keys = _chunk_keys(streams)
+    if keys:
+        store.delete(keys)
+
+def start_audio_stream(store, timeout, user_id, session_id, question_number, question, source_rate,
+                       pitch_engine='librosa', vad_mode=None, stages=ANALYSIS_STAGES, runner=None, ticket=None):
+    """Open a new streaming upload and return its upload ID.
+
+    stages are the optional ANALYSIS_STAGES to compute, decided up front
+    since the upload's length is not known yet; runner and ticket are as
+    for StreamAnalysis. Any upload still open for the same session and
+    question (for example after the candidate records again) is
+    discarded, as are uploads idle for longer than timeout seconds, along
+    with their chunks.
+    """
+    upload_id = generate_token()
+    with _analyses_lock:
+        local_ids = list(_analyses)
+    conn = db.engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT upload_id, next_seq FROM audio_stream "
+            "WHERE (session_id = ? AND question_number = ?) OR last_seen < datetime('now', ?)",
+            (session_id, question_number, f'-{int(timeout)} seconds')
+        )
+        stale = cursor.fetchall()
+        cursor.executemany("DELETE FROM audio_stream WHERE upload_id = ?", [(row[0],) for row in stale])
+        # Uploads of this process that another one finished or discarded
+        live = set()
+        if local_ids:
+            cursor.execute(
+                "SELECT upload_id FROM audio_stream WHERE upload_id IN (%s)" % ','.join('?' * len(local_ids)),
+                local_ids
+            )
+            live = {row[0] for row in cursor.fetchall()}
+        cursor.execute(
+            "INSERT INTO audio_stream (upload_id, user_id, session_id, question_number, question, source_rate, "
+            "next_seq, samples, stages, created_at, last_seen) "
+            "VALUES (?, ?, ?, ?, ?, ?, 0, 0, ?, datetime('now'), datetime('now'))",
+            (upload_id, user_id, session_id, question_number, question, source_rate,
+             ','.join(stage for stage in ANALYSIS_STAGES if stage in stages))
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    _delete_chunks(store, stale)
+    now = time.time()
+    with _analyses_lock:
+        gone = [existing_id for existing_id, analysis in _analyses.items()
+                if existing_id in local_ids and existing_id not in live or now - analysis.last_seen > timeout]
+        _analyses[upload_id] = StreamAnalysis(source_rate, pitch_engine, vad_mode, stages, runner, ticket)
+    for existing_id in gone:
+        _forget_analysis(existing_id)
+    return upload_id
+
+def get_audio_stream(upload_id, user_id):
+    """Return the user's open upload with this ID as a dict, or None."""
+    conn = db.engine.raw_connection()
+    try:
+        stream = _stream_row(conn.cursor(), upload_id)
+    finally:
+        conn.close()
+    if stream is None or stream['user_id'] != user_id:
+        return None
+    return stream
+
+def append_audio_chunk(store, stream, seq, data):
+    """Store chunk number seq of an upload and analyze it if this process has every earlier chunk.
+
+    Returns False for an already received chunk. Raises ValueError for a
+    chunk out of order or not made of 16-bit samples. stream is updated to
+    the upload's new state.
+    """
+    if seq < stream['next_seq']:
+        return False
+    if seq > stream['next_seq']:
+        raise ValueError(f"Expected chunk {stream['next_seq']}, got {seq}")
+    if len(data) % 2:
+        raise ValueError("Chunk is not 16-bit PCM")
+
+    upload_id = stream['upload_id']
+    store.put(stream_chunk_key(upload_id, seq), io.BytesIO(data))
+    conn = db.engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE audio_stream SET next_seq = next_seq + 1, samples = samples + ?, last_seen = datetime('now') "
+            "WHERE upload_id = ? AND next_seq = ?",
+            (len(data) // 2, upload_id, seq)
+        )
+        stored = cursor.rowcount == 1
+        conn.commit()
+        stream.update(_stream_row(cursor, upload_id) or {})
+    finally:
+        conn.close()
+    if not stored:
+        # A retry of this chunk got here first
+        return False
+
+    with _analyses_lock:
+        analysis = _analyses.get(upload_id)
+    if analysis is not None:
+        with analysis.lock:
+            if analysis.next_seq == seq:
+                analysis.add(np.frombuffer(data, dtype='<i2'))
+                return True
+        _forget_analysis(upload_id)
+    return True
+
+def finish_audio_stream(store, stream, audio_path, pitch_engine='librosa', vad_mode=None, runner=None):
+    """Write an upload's chunks to a WAV file at audio_path and return the recording's AudioFeatures.
+
+    The features accumulated while the chunks arrived are used when this
+    process saw all of them; otherwise the stored chunks are analyzed now,
+    through runner. The upload's AnalysisQueue ticket is given back either
+    way. Returns None when the upload was already finished or discarded.
+    """
+    import soundfile as sf
+
+    upload_id = stream['upload_id']
+    conn = db.engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM audio_stream WHERE upload_id = ?", (upload_id,))
+        claimed = cursor.rowcount == 1
+        conn.commit()
+    finally:
+        conn.close()
+    analysis = _forget_analysis(upload_id, cancel=not claimed)
+    if not claimed:
+        return None
+
+    count = stream['next_seq']
+    if analysis is None or analysis.next_seq != count:
+        if analysis is not None:
+            analysis.cancel()
+        analysis = StreamAnalysis(stream['source_rate'], pitch_engine, vad_mode, stream['stages'], runner)
+        replay = True
+    else:
+        replay = False
+
+    partial_path = f"{audio_path}.{upload_id}.part"
+    try:
+        with sf.SoundFile(partial_path, 'w', samplerate=stream['source_rate'], channels=1,
+                          subtype='PCM_16', format='WAV') as writer:
+            for seq in range(count):
+                with store.open(stream_chunk_key(upload_id, seq)) as f:
+                    pcm = np.frombuffer(f.read(), dtype='<i2')
+                writer.write(pcm)
+                if replay:
+                    analysis.add(pcm)
+        os.replace(partial_path, audio_path)
+    except Exception:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    finally:
+        _delete_chunks(store, [(upload_id, count)])
+    return analysis.finish()
+
+def discard_audio_stream(store, stream):
+    """Discard an upload and its stored chunks."""
+    conn = db.engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM audio_stream WHERE upload_id = ?", (stream['upload_id'],))
+        conn.commit()
+    finally:
+        conn.close()
+    _forget_analysis(stream['upload_id'])
+    _delete_chunks(store, [(stream['upload_id'], stream['next_seq'])])
+
+def delete_session_streams(cursor, session_id):
+    """Delete a session's open uploads using the caller's cursor and return the keys of their chunks.
+
+    The chunks should only be deleted once the caller commits.
+    """
+    cursor.execute("SELECT upload_id, next_seq FROM audio_stream WHERE session_id = ?", (session_id,))
+    streams = cursor.fetchall()
+    cursor.execute("DELETE FROM audio_stream WHERE session_id = ?", (session_id,))
+    for upload_id, _ in streams:
+        _forget_analysis(upload_id)
+    return _chunk_keys(streams)
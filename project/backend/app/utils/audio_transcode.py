@@ -0,0 +1,211 @@
+import os
+import threading
+import time
+import traceback
+import numpy as np
+from app.models.interview import db
+from app.utils.audio_storage import OBJECTS_DIR
+from app.utils.blob_storage import LocalBlobStore, get_blob_store
+
+# Container, subtype and extension of each transcode target. FLAC is
+# lossless, so the scorers see the same samples as in the WAV; Opus is
+# several times smaller but lossy.
+TRANSCODE_FORMATS = {
+    'flac': ('FLAC', 'PCM_16', 'flac'),
+    'opus': ('OGG', 'OPUS', 'ogg'),
+}
+
+# Sample rates the Opus encoder accepts; other recordings are resampled up
+# to the next one (the scorers resample to SAMPLE_RATE on decode anyway)
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+# Totals since the process started, reported by the audio storage endpoint
+_stats = {'files': 0, 'deduplicated': 0, 'bytes_in': 0, 'bytes_out': 0, 'audio_seconds': 0.0, 'seconds': 0.0}
+_stats_lock = threading.Lock()
+
+def resolve_transcode_format(name):
+    """Validate a transcode format name, falling back to FLAC when libsndfile lacks Opus."""
+    import soundfile as sf
+
+    name = (name or 'flac').lower()
+    if name not in TRANSCODE_FORMATS:
+        raise ValueError(f"Unknown audio transcode format: {name}")
+    container, subtype, _ = TRANSCODE_FORMATS[name]
+    if subtype not in sf.available_subtypes(container):
+        print(f"libsndfile cannot write {name}, transcoding audio to flac instead")
+        return 'flac'
+    return name
+
+def object_path_for(checksum, fmt):
+    """Content-addressed location, relative to the upload folder, of a transcoded answer."""
+    return os.path.join(OBJECTS_DIR, checksum[:2], f"{checksum}.{TRANSCODE_FORMATS[fmt][2]}")
+
+def transcode_file(src, dst, fmt, block_frames=65536):
+    """Encode the audio file src to dst in fmt, block by block; returns its duration in seconds.
+
+    The output is written to a .part file and renamed into place, so dst is
+    either absent or complete.
+    """
+    import soundfile as sf
+
+    container, subtype, _ = TRANSCODE_FORMATS[fmt]
+    tmp = dst + '.part'
+    with sf.SoundFile(src) as f:
+        samplerate = f.samplerate
+        if fmt == 'opus' and samplerate not in OPUS_SAMPLE_RATES:
+            samplerate = next((rate for rate in OPUS_SAMPLE_RATES if rate > f.samplerate), OPUS_SAMPLE_RATES[-1])
+        with sf.SoundFile(tmp, 'w', samplerate=samplerate, channels=f.channels,
+                          format=container, subtype=subtype) as out:
+            blocks = f.blocks(blocksize=block_frames, dtype='float32', always_2d=True)
+            if samplerate == f.samplerate:
+                for block in blocks:
+                    out.write(block)
+            else:
+                import soxr
+
+                stream = soxr.ResampleStream(f.samplerate, samplerate, f.channels, dtype='float32')
+                for block in blocks:
+                    out.write(stream.resample_chunk(block))
+                out.write(stream.resample_chunk(np.zeros((0, f.channels), dtype=np.float32), last=True))
+        seconds = f.frames / float(f.samplerate)
+    os.replace(tmp, dst)
+    return seconds
+
+def transcode_stats():
+    """Return a copy of this process's transcode totals, with throughput."""
+    with _stats_lock:
+        stats = dict(_stats)
+    seconds = stats['seconds']
+    stats['audio_seconds_per_second'] = stats['audio_seconds'] / seconds if seconds else None
+    stats['mb_per_second'] = stats['bytes_in'] / 1e6 / seconds if seconds else None
+    return stats
+
+def _record_stats(**values):
+    with _stats_lock:
+        for key, value in values.items():
+            _stats[key] += value
+
+def transcode_audio_assets(upload_folder, fmt='flac', batch_size=100, min_age=600, store=None):
+    """Move stored WAV answers into compressed, content-addressed objects.
+
+    Assets older than min_age seconds that are not waiting for analysis are
+    encoded to fmt under OBJECTS_DIR, named by the WAV's checksum, so
+    identical recordings share one object. Objects are encoded in the
+    upload folder and then published to the blob store. The row's
+    object_path is set only if the row still describes the same recording,
+    and the WAV is removed only if it was not rewritten meanwhile. Returns
+    this pass's counts.
+    """
+    store = store or LocalBlobStore(upload_folder)
+    stats = {'files': 0, 'deduplicated': 0, 'bytes_in': 0, 'bytes_out': 0, 'audio_seconds': 0.0}
+    started = time.perf_counter()
+    cutoff = time.time() - min_age
+    last_id = 0
+
+    while True:
+        conn = db.engine.raw_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT id, path, checksum FROM audio_asset "
+                "WHERE object_path IS NULL AND checksum IS NOT NULL AND id > ? "
+                "AND created_at < datetime(?, 'unixepoch') "
+                "AND (response_id IS NULL OR response_id NOT IN "
+                "(SELECT response_id FROM audio_job WHERE status = 'queued' AND response_id IS NOT NULL)) "
+                "ORDER BY id LIMIT ?",
+                (last_id, cutoff, batch_size)
+            )
+            rows = cursor.fetchall()
+        finally:
+            conn.close()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        # Encode outside of any transaction; the batch is committed together below
+        done = []
+        for asset_id, path, checksum in rows:
+            object_path = object_path_for(checksum, fmt)
+            try:
+                before = store.stat(path)
+                if not before:
+                    # Deleted meanwhile; the sweeper drops the row
+                    continue
+                stored = store.stat(object_path)
+                if stored:
+                    stats['deduplicated'] += 1
+                else:
+                    dst = os.path.join(upload_folder, object_path)
+                    os.makedirs(os.path.dirname(dst), exist_ok=True)
+                    with store.local_copy(path) as src:
+                        stats['audio_seconds'] += transcode_file(src, dst, fmt)
+                    store.put_file(object_path, dst)
+                    stored = (os.path.getsize(dst), None)
+                    stats['files'] += 1
+                    stats['bytes_in'] += before[0]
+                    stats['bytes_out'] += stored[0]
+            except Exception as e:
+                print(f"Error transcoding {path}: {str(e)}")
+                continue
+            done.append((asset_id, path, checksum, object_path, stored[0], before))
+
+        replaced = []
+        conn = db.engine.raw_connection()
+        try:
+            cursor = conn.cursor()
+            for asset_id, path, checksum, object_path, stored_size, before in done:
+                cursor.execute(
+                    "UPDATE audio_asset SET object_path = ?, stored_size = ? "
+                    "WHERE id = ? AND path = ? AND checksum = ? AND object_path IS NULL",
+                    (object_path, stored_size, asset_id, path, checksum)
+                )
+                if cursor.rowcount:
+                    replaced.append((path, before))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        # A re-recorded answer would have a newer WAV under the same key
+        stale = [path for path, before in replaced if store.stat(path) == before]
+        if stale:
+            store.delete(stale)
+
+    stats['seconds'] = time.perf_counter() - started
+    if stats['files'] or stats['deduplicated']:
+        _record_stats(**stats)
+    return stats
+
+def start_audio_transcoder(app):
+    """Run transcode_audio_assets every AUDIO_TRANSCODE_INTERVAL seconds in a daemon thread."""
+    interval = app.config.get('AUDIO_TRANSCODE_INTERVAL', 900)
+    if interval <= 0:
+        return None
+    fmt = resolve_transcode_format(app.config.get('AUDIO_TRANSCODE_FORMAT', 'flac'))
+
+    def run():
+        while True:
+            try:
+                with app.app_context():
+                    stats = transcode_audio_assets(
+                        app.config['UPLOAD_FOLDER'],
+                        fmt,
+                        app.config.get('AUDIO_TRANSCODE_BATCH', 100),
+                        app.config.get('AUDIO_TRANSCODE_DELAY', 600),
+                        get_blob_store(app.config)
+                    )
+                if stats['files'] or stats['deduplicated']:
+                    ratio = stats['bytes_out'] / stats['bytes_in'] if stats['bytes_in'] else 0.0
+                    print(f"Audio transcode: {stats['files']} files to {fmt} ({ratio:.0%} of the WAV size), "
+                          f"{stats['deduplicated']} deduplicated, "
+                          f"{stats['audio_seconds']:.0f}s of audio in {stats['seconds']:.1f}s")
+            except Exception as e:
+                print(f"Error transcoding audio files: {str(e)}")
+                print(traceback.format_exc())
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name='audio-transcoder', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,282 @@
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+# Objects removed per S3 DeleteObjects request (the API's limit)
+S3_DELETE_BATCH = 1000
+
+class BlobStore:
+    """Durable storage of answer recordings, addressed by key.
+
+    Keys are the paths stored in audio_asset ('audio_<session>_<n>.wav',
+    'objects/ab/<sha256>.flac'). Recordings are first written to the node's
+    upload folder and then published with put_file; readers that need a
+    seekable file (soundfile, send_file) use local_path or local_copy.
+    """
+
+    # Whether keys live somewhere other than the upload folder
+    remote = False
+
+    def put_file(self, key, path):
+        """Store the local file at path under key."""
+        with open(path, 'rb') as f:
+            self.put(key, f)
+
+    def put(self, key, fileobj):
+        """Store a readable binary stream under key, without reading it into memory."""
+        raise NotImplementedError
+
+    def open(self, key):
+        """Return a readable binary stream of key's contents; the caller closes it."""
+        raise NotImplementedError
+
+    def stat(self, key):
+        """Return (size, mtime) of key, or None when it does not exist."""
+        raise NotImplementedError
+
+    def delete(self, keys):
+        """Delete keys, ignoring missing ones; returns how many were deleted."""
+        raise NotImplementedError
+
+    def list(self, prefix=''):
+        """Yield (key, size, mtime) for every key starting with prefix."""
+        raise NotImplementedError
+
+    def local_path(self, key):
+        """Path of a local file holding key, or None."""
+        return None
+
+    def presigned_url(self, key, expires=300):
+        """A URL clients can GET (with Range) for key without credentials, or None."""
+        return None
+
+    @contextmanager
+    def local_copy(self, key):
+        """Yield a local file path with key's contents, downloading it to a temporary file if needed."""
+        path = self.local_path(key)
+        if path:
+            yield path
+            return
+        fd, path = tempfile.mkstemp(suffix=os.path.splitext(key)[1])
+        try:
+            with os.fdopen(fd, 'wb') as out, self.open(key) as f:
+                shutil.copyfileobj(f, out, 1 << 20)
+            yield path
+        finally:
+            os.remove(path)
+
+class LocalBlobStore(BlobStore):
+    """Keys stored as files under root, the upload folder itself by default."""
+
+    def __init__(self, root):
+        self.root = os.path.realpath(root)
+
+    def _path(self, key):
+        path = os.path.realpath(os.path.join(self.root, key))
+        if os.path.commonpath([self.root, path]) != self.root:
+            raise ValueError(f"Blob key outside of the storage root: {key}")
+        return path
+
+    def put_file(self, key, path):
+        target = self._path(key)
+        if os.path.realpath(path) == target:
+            # Written in place in the upload folder
+            return
+        super().put_file(key, path)
+
+    def put(self, key, fileobj):
+        target = self._path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        partial_path = target + '.part'
+        try:
+            with open(partial_path, 'wb') as out:
+                shutil.copyfileobj(fileobj, out, 1 << 20)
+            os.replace(partial_path, target)
+        except Exception:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+
+    def open(self, key):
+        return open(self._path(key), 'rb')
+
+    def stat(self, key):
+        try:
+            st = os.stat(self._path(key))
+        except FileNotFoundError:
+            return None
+        return st.st_size, st.st_mtime
+
+    def delete(self, keys):
+        removed = 0
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+                removed += 1
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"Could not delete audio file {key}: {str(e)}")
+        return removed
+
+    def list(self, prefix=''):
+        top = self._path(os.path.dirname(prefix))
+        for root, _, names in os.walk(top):
+            for name in names:
+                path = os.path.join(root, name)
+                key = os.path.relpath(path, self.root).replace(os.sep, '/')
+                if not key.startswith(prefix):
+                    continue
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield key, st.st_size, st.st_mtime
+
+    def local_path(self, key):
+        path = self._path(key)
+        return path if os.path.exists(path) else None
+
+class S3BlobStore(BlobStore):
+    """Keys stored in an S3-compatible bucket (AWS S3, MinIO, Ceph RGW, ...).
+
+    The node's upload folder acts as a spool: recordings written there are
+    served from it until the sweeper prunes them after they are uploaded.
+    Credentials come from boto3's usual sources (AWS_ACCESS_KEY_ID and
+    AWS_SECRET_ACCESS_KEY, a profile, or an instance role).
+    """
+
+    remote = True
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, region=None, spool_dir=None):
+        try:
+            import boto3
+        except ImportError:
+            raise ImportError("AUDIO_STORAGE=s3 needs boto3 (pip install boto3)")
+        from boto3.s3.transfer import TransferConfig
+
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        self.spool_dir = spool_dir
+        self.client = boto3.client('s3', endpoint_url=endpoint_url or None, region_name=region or None)
+        # Multipart above 16 MB, so large recordings stream in parts
+        self.transfer_config = TransferConfig(multipart_threshold=16 << 20, multipart_chunksize=16 << 20)
+
+    def _key(self, key):
+        return self.prefix + key.replace(os.sep, '/')
+
+    def put_file(self, key, path):
+        self.client.upload_file(path, self.bucket, self._key(key), Config=self.transfer_config)
+
+    def put(self, key, fileobj):
+        self.client.upload_fileobj(fileobj, self.bucket, self._key(key), Config=self.transfer_config)
+
+    def open(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=self._key(key))['Body']
+
+    def stat(self, key):
+        from botocore.exceptions import ClientError
+
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+        return head['ContentLength'], head['LastModified'].timestamp()
+
+    def delete(self, keys):
+        keys = list(keys)
+        removed = 0
+        for start in range(0, len(keys), S3_DELETE_BATCH):
+            batch = keys[start:start + S3_DELETE_BATCH]
+            result = self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={'Objects': [{'Key': self._key(key)} for key in batch], 'Quiet': True}
+            )
+            for error in result.get('Errors', []):
+                print(f"Could not delete audio object {error.get('Key')}: {error.get('Message')}")
+            # S3 does not report keys that were already missing
+            removed += len(batch) - len(result.get('Errors', []))
+        # Spooled copies go too, so this node does not keep serving them
+        for key in keys:
+            path = self.local_path(key)
+            if path:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    def list(self, prefix=''):
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            for item in page.get('Contents', []):
+                yield item['Key'][len(self.prefix):], item['Size'], item['LastModified'].timestamp()
+
+    def local_path(self, key):
+        if not self.spool_dir:
+            return None
+        path = os.path.join(self.spool_dir, key)
+        return path if os.path.exists(path) else None
+
+    def presigned_url(self, key, expires=300):
+        return self.client.generate_presigned_url(
+            'get_object', Params={'Bucket': self.bucket, 'Key': self._key(key)}, ExpiresIn=expires
+        )
+
+    def prune_spool(self, cutoff):
+        """Remove spooled files older than cutoff once the bucket has them; returns how many.
+
+        Abandoned .part files older than cutoff are removed as well.
+        """
+        removed = 0
+        if not self.spool_dir or not os.path.isdir(self.spool_dir):
+            return removed
+        for root, _, names in os.walk(self.spool_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                key = os.path.relpath(path, self.spool_dir)
+                try:
+                    st = os.stat(path)
+                    if st.st_mtime >= cutoff:
+                        continue
+                    if not name.endswith('.part'):
+                        stored = self.stat(key)
+                        if not stored or stored[0] != st.st_size:
+                            continue
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    continue
+        return removed
+
+def create_blob_store(config):
+    """Build the BlobStore selected by AUDIO_STORAGE ('local' or 's3') from a config mapping."""
+    kind = config.get('AUDIO_STORAGE', 'local')
+    if kind == 'local':
+        return LocalBlobStore(config['UPLOAD_FOLDER'])
+    if kind == 's3':
+        if not config.get('AUDIO_S3_BUCKET'):
+            raise ValueError("AUDIO_STORAGE=s3 needs AUDIO_S3_BUCKET")
+        return S3BlobStore(
+            config['AUDIO_S3_BUCKET'],
+            config.get('AUDIO_S3_PREFIX', ''),
+            config.get('AUDIO_S3_ENDPOINT_URL'),
+            config.get('AUDIO_S3_REGION'),
+            spool_dir=config['UPLOAD_FOLDER']
+        )
+    raise ValueError(f"Unknown AUDIO_STORAGE: {kind}")
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_blob_store(config):
+    """Return the process-wide BlobStore configured from the app config."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = create_blob_store(config)
+        return _store
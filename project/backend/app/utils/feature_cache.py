@@ -0,0 +1,176 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from app.utils.audio_analysis import AudioFeatures
+
+# Bump when AudioFeatures or the way it is computed changes, so stale
+# entries are never returned
+FEATURE_VERSION = 1
+
+def feature_cache_key(checksum, pitch_engine='librosa', vad_mode=None):
+    """Cache key for one recording analyzed with the given settings.
+
+    checksum is the SHA-256 of the stored 16-bit WAV, which holds the
+    decoded audio rather than the upload, so the same recording sent again
+    in another container or under another name maps to the same entry.
+    """
+    if vad_mode is not None and vad_mode < 0:
+        vad_mode = None
+    key = f"{checksum}:{pitch_engine}:{vad_mode}:{FEATURE_VERSION}"
+    return hashlib.sha256(key.encode()).hexdigest()
+
+class FeatureCache:
+    """AudioFeatures by content hash: an in-memory LRU over an optional directory.
+
+    Scores are not cached: they are recomputed from the cached features,
+    which takes microseconds and keeps working when the scoring weights
+    change. Safe to share between threads. The directory is kept under
+    max_disk_bytes (0 for no limit) by prune(), which drops the entries
+    read or written longest ago.
+    """
+
+    def __init__(self, max_entries=256, directory=None, max_disk_bytes=0):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the cached AudioFeatures for key, or None."""
+        with self._lock:
+            features = self._entries.get(key)
+            if features is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return features
+
+        features = self._read(key)
+        with self._lock:
+            if features is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, features)
+        return features
+
+    def put(self, key, features):
+        """Cache features under key in memory and on disk."""
+        with self._lock:
+            self._remember(key, features)
+        self._write(key, features)
+
+    def stats(self):
+        files = self._disk_files()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "disk_entries": len(files),
+                "disk_bytes": sum(size for _, size, _ in files),
+                "max_disk_bytes": self.max_disk_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+    def prune(self):
+        """Delete the least recently used files until the directory fits max_disk_bytes; returns how many."""
+        if not self.directory or self.max_disk_bytes <= 0:
+            return 0
+        files = self._disk_files()
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for path, size, _ in sorted(files, key=lambda entry: entry[2]):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        return removed
+
+    def _disk_files(self):
+        """(path, size, mtime) of every entry in the directory."""
+        files = []
+        if not self.directory or not os.path.isdir(self.directory):
+            return files
+        for folder in os.scandir(self.directory):
+            if not folder.is_dir():
+                continue
+            for entry in os.scandir(folder.path):
+                if entry.name.endswith('.pkl'):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    files.append((entry.path, stat.st_size, stat.st_mtime))
+        return files
+
+    def _remember(self, key, features):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = features
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.pkl")
+
+    def _read(self, key):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                features = AudioFeatures(**pickle.load(f))
+            # Recently read entries are the last ones prune() deletes
+            os.utime(path)
+            return features
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error reading cached audio features {key}: {str(e)}")
+            return None
+
+    def _write(self, key, features):
+        if not self.directory:
+            return
+        path = self._path(key)
+        partial_path = f"{path}.{threading.get_ident()}.part"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(partial_path, 'wb') as f:
+                pickle.dump(vars(features), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(partial_path, path)
+        except Exception as e:
+            print(f"Error caching audio features {key}: {str(e)}")
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+
+# Cache shared by every request in this process, created on first use
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_feature_cache(config):
+    """Return the process-wide FeatureCache configured from the app config."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = FeatureCache(
+                config.get('AUDIO_FEATURE_CACHE_SIZE', 256),
+                config.get('AUDIO_FEATURE_CACHE_DIR'),
+                config.get('AUDIO_FEATURE_CACHE_MAX_BYTES', 0)
+            )
+        return _cache
@@ -0,0 +1,91 @@
+import numpy as np
+from app.models.interview import db
+from app.utils.audio_analysis import N_MFCC_MEANS
+from app.utils.vad import SPEECH_METRICS
+
+# Column order of a stored feature vector. Append new columns and bump
+# FEATURE_LAYOUT_VERSION; never reorder, or stored vectors change meaning.
+FEATURE_LAYOUT = (
+    ('duration', 'snr', 'energy', 'energy_std', 'zcr', 'mfcc_var', 'spectral_centroid',
+     'spectral_rolloff', 'onset_count', 'speech_rate', 'tempo', 'pitch_std', 'f0_var')
+    + SPEECH_METRICS
+    + tuple(f'mfcc_mean_{i}' for i in range(N_MFCC_MEANS))
+)
+FEATURE_LAYOUT_VERSION = 1
+FEATURE_COLUMNS = {name: i for i, name in enumerate(FEATURE_LAYOUT)}
+
+# Stored byte order and width, independent of the platform
+VECTOR_DTYPE = np.dtype('<f4')
+
+def feature_vector(features):
+    """Pack AudioFeatures into a float32 vector laid out as FEATURE_LAYOUT.
+
+    Features that were not computed (a skipped analysis stage, or speech
+    statistics with voice activity detection off) are NaN.
+    """
+    values = dict(vars(features), **(features.speech or {}))
+    if features.onset_count is not None:
+        values['speech_rate'] = features.onset_count / features.duration if features.duration > 0 else 0.0
+    if features.mfcc_means is not None:
+        values.update((f'mfcc_mean_{i}', value) for i, value in enumerate(features.mfcc_means[:N_MFCC_MEANS]))
+
+    vector = np.full(len(FEATURE_LAYOUT), np.nan, dtype=VECTOR_DTYPE)
+    for i, name in enumerate(FEATURE_LAYOUT):
+        if values.get(name) is not None:
+            vector[i] = values[name]
+    return vector
+
+def store_feature_vector(cursor, session_id, response_id, vector):
+    """Save a response's packed feature vector using the caller's cursor.
+
+    Any vector already stored for the response is replaced. The caller commits.
+    """
+    data = np.asarray(vector, dtype=VECTOR_DTYPE).tobytes()
+    cursor.execute("DELETE FROM audio_feature_vector WHERE response_id = ?", (response_id,))
+    cursor.execute(
+        "INSERT INTO audio_feature_vector (session_id, response_id, layout_version, vector, created_at) "
+        "VALUES (?, ?, ?, ?, datetime('now'))",
+        (session_id, response_id, FEATURE_LAYOUT_VERSION, data)
+    )
+
+def load_feature_matrix(user_id=None, session_id=None, start=None, end=None):
+    """Load stored feature vectors in bulk as one matrix.
+
+    Filters by the owning user, the session and the start time of the
+    interview (start inclusive, end exclusive; UTC datetimes or ISO
+    strings). Returns
+    (response_ids, matrix): an int64 array and a float32 array with one row
+    per response, in response ID order, and one column per FEATURE_LAYOUT
+    entry. Use FEATURE_COLUMNS to find a column; missing features are NaN.
+    """
+    where = ["v.layout_version = ?"]
+    params = [FEATURE_LAYOUT_VERSION]
+    if user_id is not None:
+        where.append("s.user_id = ?")
+        params.append(user_id)
+    if session_id is not None:
+        where.append("v.session_id = ?")
+        params.append(session_id)
+    if start is not None:
+        where.append("s.start_time >= ?")
+        params.append(str(start).replace('T', ' '))
+    if end is not None:
+        where.append("s.start_time < ?")
+        params.append(str(end).replace('T', ' '))
+
+    conn = db.engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT v.response_id, v.vector FROM audio_feature_vector v "
+            "JOIN interview_session s ON s.id = v.session_id "
+            f"WHERE {' AND '.join(where)} ORDER BY v.response_id",
+            params
+        )
+        rows = cursor.fetchall()
+    finally:
+        conn.close()
+
+    response_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    matrix = np.frombuffer(b''.join(row[1] for row in rows), dtype=VECTOR_DTYPE)
+    return response_ids, matrix.reshape(len(rows), len(FEATURE_LAYOUT))
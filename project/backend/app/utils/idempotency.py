@@ -0,0 +1,175 @@
+import json
+import sqlite3
+from app.models.interview import db
+
+# Request header naming one logical answer submission; retries reuse it
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 200
+
+# A claim whose request died before storing an answer is taken over after this many seconds
+STALE_CLAIM_SECONDS = 300
+
+def submission_key(headers, question_number=None):
+    """Idempotency key of an answer submission, or None when it cannot be deduplicated.
+
+    The Idempotency-Key header wins; without it an answer is identified by
+    its question number within the session. Raises ValueError for a key
+    longer than MAX_KEY_LENGTH.
+    """
+    key = (headers.get(IDEMPOTENCY_HEADER) or '').strip()
+    if key:
+        if len(key) > MAX_KEY_LENGTH:
+            raise ValueError(f"{IDEMPOTENCY_HEADER} is longer than {MAX_KEY_LENGTH} characters")
+        return key
+    if question_number is not None:
+        return f"question-{question_number}"
+    return None
+
+def claim_submission(session_id, key):
+    """Record that this request is processing key's answer.
+
+    Returns None when the caller should process the answer, or the earlier
+    submission as (status_code, body) when it was already processed, with
+    status_code None while it is still being processed. Costs one lookup
+    on the (session_id, idempotency_key) unique index for a duplicate.
+    """
+    conn = db.engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "INSERT INTO answer_submission (session_id, idempotency_key, status, created_at) "
+                "VALUES (?, ?, 'processing', datetime('now'))",
+                (session_id, key)
+            )
+            conn.commit()
+            return None
+        except sqlite3.IntegrityError:
+            conn.rollback()
+
+        cursor.execute(
+            "SELECT status, status_code, result, response_id, "
+            "created_at < datetime('now', ?) FROM answer_submission "
+            "WHERE session_id = ? AND idempotency_key = ?",
+            (f'-{STALE_CLAIM_SECONDS} seconds', session_id, key)
+        )
+        row = cursor.fetchone()
+        if row is None:
+            # Released between the insert and the lookup
+            return claim_submission(session_id, key)
+        status, status_code, result, response_id, stale = row
+        if status == 'done':
+            return status_code, json.loads(result)
+
+        if stale and response_id is not None:
+            # The answer was stored but its request died before replying
+            body = _complete_stored(cursor, session_id, key, response_id)
+            conn.commit()
+            if body is not None:
+                return 200, body
+        if stale:
+            cursor.execute(
+                "UPDATE answer_submission SET created_at = datetime('now'), response_id = NULL "
+                "WHERE session_id = ? AND idempotency_key = ? AND status = 'processing' "
+                "AND created_at < datetime('now', ?)",
+                (session_id, key, f'-{STALE_CLAIM_SECONDS} seconds')
+            )
+            conn.commit()
+            if cursor.rowcount:
+                return None
+        return None, None
+    finally:
+        conn.close()
+
+def _stored_reply(cursor, response_id):
+    """Reply to an answer rebuilt from its stored rows, or None when the response is gone.
+
+    Fields worked out while replying, such as the next question, are left
+    to the caller.
+    """
+    cursor.execute(
+        "SELECT r.sentiment, r.category, r.score, s.completed, s.question_count "
+        "FROM response r JOIN interview_session s ON s.id = r.session_id WHERE r.id = ?",
+        (response_id,)
+    )
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    sentiment, category, score, completed, question_count = row
+    body = {"sentiment": sentiment, "category": category, "score": score, "completed": bool(completed)}
+    if not completed:
+        body["question_number"] = question_count + 1
+    cursor.execute(
+        "SELECT id, status FROM audio_job WHERE response_id = ? ORDER BY id DESC LIMIT 1",
+        (response_id,)
+    )
+    job = cursor.fetchone()
+    if job:
+        body.update(job_id=job[0], analysis_status=job[1])
+    return body
+
+def _complete_stored(cursor, session_id, key, response_id):
+    """Mark a claim whose answer is stored as done with the stored reply, which is returned."""
+    body = _stored_reply(cursor, response_id)
+    if body is not None:
+        cursor.execute(
+            "UPDATE answer_submission SET status = 'done', status_code = 200, result = ? "
+            "WHERE session_id = ? AND idempotency_key = ? AND status = 'processing'",
+            (json.dumps(body), session_id, key)
+        )
+    return body
+
+def attach_submission_response(cursor, session_id, key, response_id):
+    """Link the stored response to its submission using the caller's cursor.
+
+    Call in the transaction that inserts the response, so a crash before
+    the reply is stored can never lead to the answer being counted twice.
+    """
+    cursor.execute(
+        "UPDATE answer_submission SET response_id = ? WHERE session_id = ? AND idempotency_key = ?",
+        (response_id, session_id, key)
+    )
+
+def complete_submission(session_id, key, body, status_code=200):
+    """Store the reply to key's first processing, replayed to any duplicate."""
+    conn = db.engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE answer_submission SET status = 'done', status_code = ?, result = ? "
+            "WHERE session_id = ? AND idempotency_key = ?",
+            (status_code, json.dumps(body), session_id, key)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+def release_submission(session_id, key):
+    """End an unfinished claim after a failed attempt.
+
+    A claim whose answer was already stored is marked done with a reply
+    rebuilt from the stored rows, so a retry gets that answer instead of
+    storing it twice; any other claim is dropped so a retry processes the
+    answer again.
+    """
+    conn = db.engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT response_id FROM answer_submission "
+            "WHERE session_id = ? AND idempotency_key = ? AND status = 'processing'",
+            (session_id, key)
+        )
+        row = cursor.fetchone()
+        if row and row[0] is not None and _complete_stored(cursor, session_id, key, row[0]) is not None:
+            conn.commit()
+            return
+        cursor.execute(
+            "DELETE FROM answer_submission WHERE session_id = ? AND idempotency_key = ? AND status = 'processing'",
+            (session_id, key)
+        )
+        conn.commit()
+    except Exception as e:
+        print(f"Could not release submission {key}: {str(e)}")
+    finally:
+        conn.close()
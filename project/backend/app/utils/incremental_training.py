@@ -0,0 +1,258 @@
+import os
+import pickle
+import threading
+import time
+import traceback
+from app.models.interview import db, preprocess_text, questions_df
+from app.utils.model_artifact import export_classifier
+
+try:
+    import fcntl
+except ImportError:  # Windows: runs are not serialized across processes
+    fcntl = None
+
+# Placeholder stored for audio answers, which have no words to learn from
+AUDIO_RESPONSE_PATTERN = '[Audio Response for Question %'
+
+STATE_NAME = 'state.pkl'
+LOCK_NAME = 'train.lock'
+ARTIFACT_PREFIX = 'incremental-'
+
+def hashing_vectorizer(n_features):
+    """The TF-IDF classifier's analyzer over a fixed number of hashed columns, with no state to fit."""
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    return HashingVectorizer(
+        n_features=n_features, stop_words='english', ngram_range=(1, 2), alternate_sign=False, norm='l2'
+    )
+
+def question_categories():
+    """Category of each question in data/questions.csv: its follow_up_trigger."""
+    return {str(question): str(category)
+            for question, category in zip(questions_df['question'], questions_df['follow_up_trigger'])}
+
+def seed_model(vectorizer):
+    """A MultinomialNB fitted on create_model.py's sample answers.
+
+    Its classes are every question category as well as the sample labels,
+    since partial_fit cannot add classes later. Class priors are uniform:
+    stored answers follow whichever questions get asked most, and learned
+    priors let the largest category win every prediction.
+    """
+    from sklearn.naive_bayes import MultinomialNB
+    from ml_model.create_model import X_train, y_train
+
+    model = MultinomialNB(alpha=1.0, fit_prior=False)
+    model.partial_fit(
+        vectorizer.transform([preprocess_text(text) for text in X_train]), y_train,
+        classes=sorted(set(y_train) | set(question_categories().values()))
+    )
+    return model
+
+def sample_accuracy(model, vectorizer):
+    """Share of create_model.py's sample answers the model labels correctly.
+
+    The samples cover six categories evenly, so a model that has drifted
+    into predicting one category for everything scores about 1/6.
+    """
+    from ml_model.create_model import X_train, y_train
+
+    predicted = model.predict(vectorizer.transform([preprocess_text(text) for text in X_train]))
+    return sum(str(label) == expected for label, expected in zip(predicted, y_train)) / len(y_train)
+
+class IncrementalTrainer:
+    """Keeps training the text classifier on the answers stored in the response table.
+
+    Text answers are read in id order, batch_size rows at a time, and fed
+    to MultinomialNB.partial_fit through a HashingVectorizer. Nothing grows
+    with the corpus: the vectorizer has no vocabulary, the model is a fixed
+    classes x n_features table of counts, and only one batch of rows is in
+    memory at a time. An answer is labeled with the category of the
+    question it answers, from data/questions.csv, not with the category
+    stored with it: that one was predicted by the classifier being
+    trained. Answers to questions that are not in the file are skipped.
+
+    The model and the id of the last row trained on are saved to state_dir
+    after every batch, so each run starts where the previous one stopped.
+    Runs publish the model as a classifier artifact that the model registry
+    picks up, once it labels enough of the sample answers correctly.
+    """
+
+    def __init__(self, state_dir, n_features=2 ** 16, batch_size=500):
+        self.state_dir = state_dir
+        self.n_features = n_features
+        self.batch_size = max(1, batch_size)
+        os.makedirs(state_dir, exist_ok=True)
+
+    @property
+    def state_path(self):
+        return os.path.join(self.state_dir, STATE_NAME)
+
+    def load_state(self):
+        """The saved training state, or a model seeded with the sample answers.
+
+        A saved model that lacks some question category is started over.
+        """
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'rb') as f:
+                state = pickle.load(f)
+            if state['n_features'] != self.n_features:
+                print(f"Training state has {state['n_features']} hashed features, not {self.n_features}; "
+                      f"keeping {state['n_features']} (restart training to change it)")
+            missing = set(question_categories().values()) - {str(label) for label in state['model'].classes_}
+            if not missing:
+                # Models saved before priors were uniform; the next partial_fit drops the learned ones
+                state['model'].fit_prior = False
+                return state
+            print(f"Training state has no classes for {sorted(missing)}; starting over from the sample answers")
+        return {
+            'model': seed_model(hashing_vectorizer(self.n_features)),
+            'n_features': self.n_features,
+            'last_id': 0,
+            'rows': 0,
+            'published': None,
+        }
+
+    def save_state(self, state):
+        partial_path = self.state_path + '.partial'
+        with open(partial_path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(partial_path, self.state_path)
+
+    def restart(self):
+        """Forget the training state; the next run starts from the sample answers and the first row."""
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+
+    def _query(self, cursor):
+        cursor.execute("PRAGMA table_info(response)")
+        columns = [column[1] for column in cursor.fetchall()]
+        where = "id > ? AND response NOT LIKE ?"
+        if 'input_type' in columns:
+            where += " AND COALESCE(input_type, 'text') = 'text'"
+        return f"SELECT id, response, question FROM response WHERE {where} ORDER BY id LIMIT ?"
+
+    def train(self, conn, max_batches=None, publish_dir=None, min_rows=0, keep=3, min_accuracy=0.5):
+        """Train on the rows stored since the last run, then publish if anything was learned.
+
+        At most max_batches batches are read (None for all). A new artifact is
+        written to publish_dir once the model has seen at least min_rows
+        stored answers and labels at least min_accuracy of the sample answers
+        correctly. Returns a dict of counts, the sample accuracy and the
+        published version; skipped counts the answers to questions without a
+        category.
+        """
+        started = time.perf_counter()
+        state = self.load_state()
+        model = state['model']
+        vectorizer = hashing_vectorizer(state['n_features'])
+        categories = question_categories()
+        classes = {str(label) for label in model.classes_}
+        cursor = conn.cursor()
+        sql = self._query(cursor)
+        stats = {'batches': 0, 'rows': 0, 'skipped': 0, 'accuracy': None, 'version': None}
+
+        while max_batches is None or stats['batches'] < max_batches:
+            cursor.execute(sql, [state['last_id'], AUDIO_RESPONSE_PATTERN, self.batch_size])
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            labeled = [(row[1], categories.get(row[2])) for row in rows]
+            labeled = [(text, label) for text, label in labeled if label in classes]
+            if labeled:
+                model.partial_fit(vectorizer.transform([preprocess_text(text) for text, _ in labeled]),
+                                  [label for _, label in labeled])
+            state['last_id'] = rows[-1][0]
+            state['rows'] += len(labeled)
+            self.save_state(state)
+            stats['batches'] += 1
+            stats['rows'] += len(labeled)
+            stats['skipped'] += len(rows) - len(labeled)
+            if len(rows) < self.batch_size:
+                break
+
+        if publish_dir and stats['rows'] and state['rows'] >= min_rows:
+            stats['accuracy'] = sample_accuracy(model, vectorizer)
+            if stats['accuracy'] >= min_accuracy:
+                stats['version'] = self.publish(model, vectorizer, publish_dir, keep)
+                state['published'] = stats['version']
+                self.save_state(state)
+        stats['total_rows'] = state['rows']
+        stats['seconds'] = time.perf_counter() - started
+        return stats
+
+    def publish(self, model, vectorizer, out_dir, keep=3):
+        """Export the model into the registry's folder, keeping the newest keep incremental artifacts."""
+        os.makedirs(out_dir, exist_ok=True)
+        name = f"{ARTIFACT_PREFIX}{time.strftime('%Y%m%d%H%M%S')}.npz"
+        version = export_classifier(model, vectorizer, os.path.join(out_dir, name))
+        published = sorted(
+            (os.path.join(out_dir, entry) for entry in os.listdir(out_dir)
+             if entry.startswith(ARTIFACT_PREFIX) and entry.endswith('.npz')),
+            key=os.path.getmtime, reverse=True
+        )
+        for path in published[max(1, keep):]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return version
+
+    def run_exclusive(self, conn, **kwargs):
+        """train, unless another process is already training on this state; then returns None."""
+        with open(os.path.join(self.state_dir, LOCK_NAME), 'w') as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return None
+            return self.train(conn, **kwargs)
+
+def trainer_from_config(config):
+    return IncrementalTrainer(
+        config.get('TRAINING_STATE_DIR'),
+        config.get('TRAINING_HASH_FEATURES', 2 ** 16),
+        config.get('TRAINING_BATCH', 500)
+    )
+
+def start_incremental_training(app):
+    """Train on newly stored answers every TRAINING_INTERVAL seconds in a daemon thread."""
+    interval = app.config.get('TRAINING_INTERVAL', 0)
+    if interval <= 0:
+        return None
+
+    def run():
+        trainer = trainer_from_config(app.config)
+        while True:
+            time.sleep(interval)
+            conn = None
+            try:
+                with app.app_context():
+                    conn = db.engine.raw_connection()
+                    stats = trainer.run_exclusive(
+                        conn,
+                        max_batches=app.config.get('TRAINING_MAX_BATCHES', 20),
+                        publish_dir=app.config.get('MODEL_ARTIFACTS_DIR'),
+                        min_rows=app.config.get('TRAINING_MIN_ROWS', 200),
+                        keep=app.config.get('TRAINING_KEEP_VERSIONS', 3),
+                        min_accuracy=app.config.get('TRAINING_MIN_ACCURACY', 0.5)
+                    )
+                if stats and stats['rows']:
+                    print(f"Incremental training: {stats['rows']} answers in {stats['batches']} batches "
+                          f"({stats['total_rows']} in total) in {stats['seconds']:.1f}s"
+                          + (f", published {stats['version']}" if stats['version'] else "")
+                          + (f", not published: {stats['accuracy']:.0%} of the sample answers labeled correctly"
+                             if stats['accuracy'] is not None and not stats['version'] else ""))
+            except Exception as e:
+                print(f"Error training the classifier: {str(e)}")
+                print(traceback.format_exc())
+            finally:
+                if conn:
+                    try:
+                        conn.close()
+                    except:
+                        pass
+
+    thread = threading.Thread(target=run, name='incremental-training', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,151 @@
+import threading
+import time
+from collections import deque
+
+# Waits kept for the percentile in MicroBatcher.stats
+RECENT_WAITS = 200
+
+class _BatchItem:
+    __slots__ = ('value', 'enqueued_at', 'result', 'error', 'done')
+
+    def __init__(self, value):
+        self.value = value
+        self.enqueued_at = time.perf_counter()
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+class MicroBatcher:
+    """Runs fn once on items submitted by concurrent threads within a short window.
+
+    fn takes a list of values and returns a list of results in the same
+    order. A daemon thread starts a batch max_wait seconds after its first
+    item arrives, or as soon as max_batch items are waiting, and hands each
+    caller its own result; an exception from fn is raised in every caller
+    of that batch. Fixed per-call costs of fn are thereby shared by the
+    batch. A caller that finds the batcher idle runs fn on its own value
+    right away, so a lone request never waits for the window; callers
+    arriving meanwhile are batched.
+    """
+
+    def __init__(self, fn, max_batch=32, max_wait=0.003, name='micro-batcher'):
+        self.fn = fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait)
+        self.name = name
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._busy = 0
+        self._waits = deque(maxlen=RECENT_WAITS)
+        self._sizes = {}
+        self.batches = 0
+        self.items = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.max_wait_seen = 0.0
+        self.total_run_time = 0.0
+
+    def submit(self, value):
+        """Add value to the next batch and block until its result is ready."""
+        item = _BatchItem(value)
+        with self._cond:
+            inline = not self._pending and not self._busy
+            if inline:
+                self._busy += 1
+        if inline:
+            return self._run_inline(item)
+
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._pending.append(item)
+            self._cond.notify_all()
+        item.done.wait()
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    def stats(self):
+        with self._cond:
+            waits = sorted(self._waits)
+            return {
+                "max_batch": self.max_batch,
+                "max_wait": self.max_wait,
+                "pending": len(self._pending),
+                "batches": self.batches,
+                "items": self.items,
+                "failed": self.failed,
+                "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+                "batch_sizes": {str(size): count for size, count in sorted(self._sizes.items())},
+                "mean_wait": self.total_wait / self.items if self.items else 0.0,
+                "p95_wait": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+                "max_wait_seen": self.max_wait_seen,
+                "mean_run_time": self.total_run_time / self.batches if self.batches else 0.0,
+                "mean_run_time_per_item": self.total_run_time / self.items if self.items else 0.0
+            }
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            deadline = self._pending[0].enqueued_at + self.max_wait
+            while len(self._pending) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            count = min(self.max_batch, len(self._pending))
+            self._busy += 1
+            return [self._pending.popleft() for _ in range(count)]
+
+    def _run_inline(self, item):
+        try:
+            self._process([item])
+        finally:
+            with self._cond:
+                self._busy -= 1
+                self._cond.notify_all()
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            try:
+                self._process(batch)
+            finally:
+                with self._cond:
+                    self._busy -= 1
+            for item in batch:
+                item.done.set()
+
+    def _process(self, batch):
+        started = time.perf_counter()
+        try:
+            results = self.fn([item.value for item in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"{self.name} returned {len(results)} results for {len(batch)} items")
+            for item, result in zip(batch, results):
+                item.result = result
+        except Exception as e:
+            print(f"Error in {self.name} batch of {len(batch)}: {str(e)}")
+            for item in batch:
+                item.error = e
+        self._record(batch, started, time.perf_counter() - started)
+
+    def _record(self, batch, started, elapsed):
+        with self._cond:
+            self.batches += 1
+            self.items += len(batch)
+            if batch[0].error is not None:
+                self.failed += len(batch)
+            self._sizes[len(batch)] = self._sizes.get(len(batch), 0) + 1
+            self.total_run_time += elapsed
+            for item in batch:
+                wait = started - item.enqueued_at
+                self.total_wait += wait
+                self.max_wait_seen = max(self.max_wait_seen, wait)
+                self._waits.append(wait)
@@ -0,0 +1,281 @@
+import functools
+import hashlib
+import mmap
+import os
+import zipfile
+import numpy as np
+
+try:
+    from sklearn.utils import murmurhash3_32 as _compiled_murmurhash3_32
+except ImportError:  # serving needs NumPy alone; hashed artifacts fall back to the pure-Python hash
+    _compiled_murmurhash3_32 = None
+
+# Bumped whenever the arrays or their meaning change; loaders refuse versions
+# they do not know. Format 2 added hashed features.
+ARTIFACT_FORMAT = 2
+SUPPORTED_FORMATS = (1, 2)
+
+# The only token_pattern the kernel reproduces: on normalized text, every
+# whitespace token of two or more characters
+DEFAULT_TOKEN_PATTERN = r'(?u)\b\w\w+\b'
+
+NORMS = {None: 0, 'l1': 1, 'l2': 2}
+
+class ArtifactError(ValueError):
+    """A model that cannot be exported, or an artifact that cannot be loaded."""
+
+def word_ngrams(tokens, stop_words, ngram_range):
+    """CountVectorizer's _word_ngrams on normalized tokens: stop words first, then n-grams of what is left."""
+    words = [token for token in tokens if len(token) > 1 and token not in stop_words]
+    min_n, max_n = ngram_range
+    grams = list(words) if min_n == 1 else []
+    for n in range(max(min_n, 2), min(max_n, len(words)) + 1):
+        grams.extend(' '.join(words[i:i + n]) for i in range(len(words) - n + 1))
+    return grams
+
+def murmurhash3_32(data, seed=0):
+    """Signed MurmurHash3 (x86, 32 bit) of bytes, as sklearn.utils.murmurhash3_32 computes it."""
+    c1, c2, mask = 0xcc9e2d51, 0x1b873593, 0xffffffff
+    h = seed & mask
+    length = len(data)
+    blocks = length & ~3
+    for i in range(0, blocks, 4):
+        k = (data[i] | data[i + 1] << 8 | data[i + 2] << 16 | data[i + 3] << 24) * c1 & mask
+        k = ((k << 15) | (k >> 17)) * c2 & mask
+        h ^= k
+        h = ((h << 13) | (h >> 19)) & mask
+        h = (h * 5 + 0xe6546b64) & mask
+    k = 0
+    tail = length & 3
+    if tail == 3:
+        k ^= data[blocks + 2] << 16
+    if tail >= 2:
+        k ^= data[blocks + 1] << 8
+    if tail:
+        k ^= data[blocks]
+        k = k * c1 & mask
+        k = ((k << 15) | (k >> 17)) * c2 & mask
+        h ^= k
+    h ^= length
+    h ^= h >> 16
+    h = h * 0x85ebca6b & mask
+    h ^= h >> 13
+    h = h * 0xc2b2ae35 & mask
+    h ^= h >> 16
+    return h - 0x100000000 if h & 0x80000000 else h
+
+@functools.lru_cache(maxsize=2 ** 16)
+def hashed_column(gram, n_features):
+    """HashingVectorizer's column for an n-gram.
+
+    Hashed with scikit-learn's compiled murmurhash3_32 when it is installed,
+    and cached, since answers keep using the same words.
+    """
+    if _compiled_murmurhash3_32 is not None:
+        h = int(_compiled_murmurhash3_32(gram))
+    else:
+        h = murmurhash3_32(gram.encode('utf-8'))
+    if h == -0x80000000:
+        # abs(-2**31) overflows in sklearn's int32 arithmetic; this is what it computes instead
+        return (0x7fffffff - (n_features - 1)) % n_features
+    return abs(h) % n_features
+
+def _linear_weights(model):
+    """Per-class weights and biases whose argmax over X @ weights.T + biases is model.predict(X)."""
+    if hasattr(model, 'feature_log_prob_') and hasattr(model, 'class_log_prior_'):
+        # MultinomialNB and ComplementNB's joint log likelihood
+        return np.asarray(model.feature_log_prob_, dtype=np.float64), np.asarray(model.class_log_prior_, dtype=np.float64)
+    if hasattr(model, 'coef_') and hasattr(model, 'intercept_'):
+        coef = np.asarray(model.coef_, dtype=np.float64)
+        intercept = np.atleast_1d(np.asarray(model.intercept_, dtype=np.float64))
+        if coef.shape[0] == 1 and len(model.classes_) == 2:
+            # Binary models keep one row scoring the second class against the first
+            coef = np.vstack([np.zeros_like(coef), coef])
+            intercept = np.concatenate([[0.0], intercept])
+        return coef, intercept
+    raise ArtifactError(f"{type(model).__name__} is not a linear classifier the kernel can run")
+
+def export_classifier(model, vectorizer, path):
+    """Write a fitted linear classifier and its vectorizer to a versioned .npz at path.
+
+    For a TfidfVectorizer the vocabulary is stored sorted, with the IDF
+    weights and the class weights permuted into the same column order, so
+    the kernel finds a term's column with a binary search instead of a
+    dict. For a HashingVectorizer only the number of columns is stored and
+    the kernel hashes each term. Arrays are stored uncompressed so
+    ClassifierArtifact can memory-map them. Returns the artifact's model
+    version, a hash of its contents.
+    """
+    hashing = hasattr(vectorizer, 'n_features') and not hasattr(vectorizer, 'vocabulary_')
+    fits = (
+        getattr(vectorizer, 'analyzer', None) == 'word'
+        and vectorizer.tokenizer is None
+        and vectorizer.preprocessor is None
+        and vectorizer.strip_accents is None
+        and vectorizer.token_pattern == DEFAULT_TOKEN_PATTERN
+        and vectorizer.norm in NORMS
+        and (hasattr(vectorizer, 'vocabulary_') or hashing and not vectorizer.alternate_sign)
+    )
+    if not fits:
+        raise ArtifactError("only word TF-IDF or unsigned hashing vectorizers with the default tokenizer "
+                            "can be exported")
+
+    weights, biases = _linear_weights(model)
+    if hashing:
+        terms = []
+        columns = np.arange(vectorizer.n_features)
+        extra = {'hashed_features': np.array(vectorizer.n_features, dtype=np.int64)}
+    else:
+        terms = sorted(vectorizer.vocabulary_)
+        columns = np.array([vectorizer.vocabulary_[term] for term in terms], dtype=np.int64)
+        if getattr(vectorizer, 'use_idf', True):
+            idf = np.asarray(vectorizer.idf_, dtype=np.float64)[columns]
+        else:
+            idf = np.ones(len(columns))
+        extra = {'idf': idf}
+    if weights.shape[1] != len(columns):
+        raise ArtifactError(f"the model has {weights.shape[1]} features, the vectorizer {len(columns)}")
+
+    arrays = {
+        'terms': np.array(terms, dtype=str),
+        # Transposed so the weights of one term are one contiguous row
+        'weights': np.ascontiguousarray(weights[:, columns].T),
+        'biases': biases,
+        **extra,
+        'classes': np.array([str(label) for label in model.classes_], dtype=str),
+        'stop_words': np.array(sorted(vectorizer.get_stop_words() or ()), dtype=str),
+        'ngram_range': np.array(vectorizer.ngram_range, dtype=np.int64),
+        'flags': np.array(
+            [NORMS[vectorizer.norm], vectorizer.binary, getattr(vectorizer, 'sublinear_tf', False)], dtype=np.int64
+        ),
+    }
+    digest = hashlib.sha256()
+    for name in sorted(arrays):
+        digest.update(name.encode())
+        digest.update(arrays[name].tobytes())
+    version = digest.hexdigest()[:12]
+    arrays['format'] = np.array(ARTIFACT_FORMAT, dtype=np.int64)
+    arrays['version'] = np.array(version)
+
+    partial_path = f"{path}.partial"
+    with open(partial_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(partial_path, path)
+    return version
+
+def _map_npz(path):
+    """Arrays of an uncompressed .npz as read-only views of one shared memory map."""
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        arrays = {}
+        with zipfile.ZipFile(f) as archive:
+            for info in archive.infolist():
+                if info.compress_type != zipfile.ZIP_STORED:
+                    raise ArtifactError(f"{info.filename} is compressed and cannot be memory-mapped")
+                # The member's data follows its local header: 30 bytes, then the name and extra field
+                f.seek(info.header_offset + 26)
+                name_length, extra_length = (int(n) for n in np.frombuffer(f.read(4), dtype='<u2'))
+                f.seek(info.header_offset + 30 + name_length + extra_length)
+                version = np.lib.format.read_magic(f)
+                if version == (1, 0):
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+                else:
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+                if dtype.hasobject:
+                    raise ArtifactError(f"{info.filename} holds Python objects")
+                arrays[info.filename[:-len('.npy')]] = np.ndarray(
+                    shape, dtype=dtype, buffer=buffer, offset=f.tell(), order='F' if fortran_order else 'C'
+                )
+    return arrays
+
+class ClassifierArtifact:
+    """A classifier exported by export_classifier, run with NumPy alone.
+
+    The arrays are memory-mapped from the artifact file, so every worker
+    process that loads the same file shares one copy of them in the page
+    cache instead of unpickling its own scikit-learn objects. predict
+    vectorizes normalized token lists the way the exported TfidfVectorizer
+    or HashingVectorizer does and takes the argmax of the linear class
+    scores, as the model's predict would.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        arrays = _map_npz(path)
+        try:
+            if int(arrays['format']) not in SUPPORTED_FORMATS:
+                raise ArtifactError(f"{path} has format {int(arrays['format'])}, expected one of {SUPPORTED_FORMATS}")
+            self.version = str(arrays['version'])
+            self.terms = arrays['terms']
+            # Hashed artifacts have a column count instead of a vocabulary and IDF weights
+            self.hashed_features = int(arrays['hashed_features']) if 'hashed_features' in arrays else 0
+            self.idf = None if self.hashed_features else arrays['idf']
+            self.weights = arrays['weights']
+            self.biases = arrays['biases']
+            self.classes = arrays['classes'].tolist()
+            self.stop_words = frozenset(arrays['stop_words'].tolist())
+            self.ngram_range = tuple(int(n) for n in arrays['ngram_range'])
+            self.norm, self.binary, self.sublinear_tf = (int(flag) for flag in arrays['flags'])
+        except KeyError as e:
+            raise ArtifactError(f"{path} has no {e.args[0]} array")
+        features = self.hashed_features or len(self.terms)
+        if self.weights.shape != (features, len(self.biases)) or self.idf is not None and len(self.idf) != features:
+            raise ArtifactError(f"{path} has inconsistent array shapes")
+
+    @property
+    def features(self):
+        """Number of columns of the feature space."""
+        return len(self.weights)
+
+    def _columns(self, grams):
+        """Feature columns of n-grams and which of them have one."""
+        if self.hashed_features:
+            # Each distinct n-gram of the batch is hashed once
+            distinct = {gram: hashed_column(gram, self.hashed_features) for gram in set(grams)}
+            columns = np.array([distinct[gram] for gram in grams], dtype=np.int64)
+            return columns, np.ones(len(columns), dtype=bool)
+        grams = np.array(grams, dtype=str)
+        columns = np.minimum(np.searchsorted(self.terms, grams), len(self.terms) - 1)
+        return columns, self.terms[columns] == grams
+
+    def tfidf(self, token_lists):
+        """Rows, columns and TF-IDF values of the non-zero entries, rows sorted."""
+        grams, rows = [], []
+        for row, tokens in enumerate(token_lists):
+            found = word_ngrams(tokens, self.stop_words, self.ngram_range)
+            grams.extend(found)
+            rows.extend([row] * len(found))
+        if not grams or not self.features:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+        columns, hits = self._columns(grams)
+        keys = np.array(rows, dtype=np.int64)[hits] * self.features + columns[hits]
+        keys, counts = np.unique(keys, return_counts=True)
+        rows, columns = np.divmod(keys, self.features)
+
+        values = counts.astype(np.float64)
+        if self.binary:
+            values[:] = 1.0
+        elif self.sublinear_tf:
+            values = np.log(values) + 1.0
+        if self.idf is not None:
+            values *= self.idf[columns]
+        if self.norm:
+            weights = values * values if self.norm == 2 else np.abs(values)
+            totals = np.bincount(rows, weights=weights, minlength=len(token_lists))
+            if self.norm == 2:
+                totals = np.sqrt(totals)
+            values /= totals[rows]
+        return rows, columns, values
+
+    def scores(self, token_lists):
+        """Linear class scores, one row per token list."""
+        rows, columns, values = self.tfidf(token_lists)
+        scores = np.tile(self.biases, (len(token_lists), 1))
+        np.add.at(scores, rows, values[:, None] * self.weights[columns])
+        return scores
+
+    def predict(self, token_lists):
+        """Class label of each normalized token list."""
+        if not token_lists:
+            return []
+        return [self.classes[index] for index in self.scores(token_lists).argmax(axis=1)]
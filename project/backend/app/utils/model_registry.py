@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+import traceback
+from datetime import datetime
+from app.models import interview
+from app.utils.model_artifact import ClassifierArtifact
+
+# Answers a new model classifies before it is swapped in, so a broken
+# artifact is rejected and the first real answer does not fault in its pages
+WARMUP_ANSWERS = [
+    "I am a software engineer with five years of experience",
+    "I led a team of developers and mentored junior engineers",
+    "I handle stress by planning my work and taking breaks",
+    "",
+]
+
+class ModelRegistry:
+    """Chooses the text classifier the app serves from a folder of artifacts.
+
+    Artifacts are .npz files written by ml_model/export_model.py or
+    train_classifier.py. The
+    newest one in the folder is served, or the bundled
+    ml_model/interview_classifier.npz when the folder has none, so rolling
+    back means removing the newer file. A candidate is loaded, validated
+    and warmed up off the request path, then swapped in by rebinding
+    interview.classifier: requests already classifying finish with the
+    model they started with, later ones get the new one. Artifacts that
+    fail to load are skipped until their file changes.
+    """
+
+    def __init__(self, directory, fallback=interview.CLASSIFIER_ARTIFACT_PATH):
+        self.directory = directory
+        self.fallback = fallback
+        self._lock = threading.Lock()
+        self._loaded = None      # (path, mtime, size) of the served artifact
+        self._rejected = {}      # (path, mtime, size) -> error
+        self.loaded_at = None
+        self.swaps = 0
+        current = interview.classifier
+        if current is not None:
+            self._loaded = self._identity(current.path)
+            self.loaded_at = datetime.utcnow()
+
+    @staticmethod
+    def _identity(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (path, stat.st_mtime_ns, stat.st_size)
+
+    def candidates(self):
+        """Artifact identities to serve, preferred first."""
+        found = []
+        if self.directory and os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith('.npz'):
+                    identity = self._identity(os.path.join(self.directory, name))
+                    if identity:
+                        found.append(identity)
+        found.sort(key=lambda identity: (identity[1], identity[0]), reverse=True)
+        fallback = self._identity(self.fallback) if self.fallback else None
+        if fallback:
+            found.append(fallback)
+        return found
+
+    def load(self, path):
+        """Load and warm up the artifact at path; raises if it is unusable."""
+        artifact = ClassifierArtifact(path)
+        # Read every array once so its pages are resident before requests use them
+        for array in (artifact.weights, artifact.biases, artifact.idf):
+            if array is not None:
+                float(array.sum())
+        labels = artifact.predict([answer.lower().split() for answer in WARMUP_ANSWERS])
+        unknown = set(labels) - set(artifact.classes)
+        if unknown:
+            raise ValueError(f"{path} predicted unknown classes {sorted(unknown)}")
+        return artifact
+
+    def refresh(self):
+        """Serve the preferred usable artifact if it is not served already; returns the new version or None."""
+        with self._lock:
+            for identity in self.candidates():
+                if identity == self._loaded:
+                    return None
+                if identity in self._rejected:
+                    continue
+                try:
+                    artifact = self.load(identity[0])
+                except Exception as e:
+                    self._rejected[identity] = str(e)
+                    print(f"Rejected classifier artifact {identity[0]}: {str(e)}")
+                    continue
+                previous = interview.classifier
+                interview.classifier = artifact
+                self._loaded = identity
+                self.loaded_at = datetime.utcnow()
+                self.swaps += 1
+                print(f"Serving classifier {artifact.version} from {identity[0]}"
+                      + (f" (was {previous.version})" if previous is not None else ""))
+                return artifact.version
+            return None
+
+    def stats(self):
+        with self._lock:
+            current = interview.classifier
+            return {
+                "directory": self.directory,
+                "version": current.version if current is not None else None,
+                "path": current.path if current is not None else None,
+                "classes": current.classes if current is not None else [],
+                "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None,
+                "swaps": self.swaps,
+                "rejected": [{"path": path, "error": error} for (path, _, _), error in self._rejected.items()]
+            }
+
+# Registry shared by every request in this process, created on first use
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_model_registry(config):
+    """Return the process-wide ModelRegistry for MODEL_ARTIFACTS_DIR."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry(config.get('MODEL_ARTIFACTS_DIR'))
+        return _registry
+
+def start_model_registry(app):
+    """Serve the newest artifact now, then look for new ones every MODEL_REGISTRY_INTERVAL seconds."""
+    registry = get_model_registry(app.config)
+    try:
+        registry.refresh()
+    except Exception as e:
+        print(f"Error loading classifier artifacts: {str(e)}")
+    interval = app.config.get('MODEL_REGISTRY_INTERVAL', 30)
+    if interval <= 0:
+        return None
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                registry.refresh()
+            except Exception as e:
+                print(f"Error watching classifier artifacts: {str(e)}")
+                print(traceback.format_exc())
+
+    thread = threading.Thread(target=run, name='model-registry', daemon=True)
+    thread.start()
+    return thread
+
+def ensure_model_version_column(conn):
+    """Add response.model_version to databases created before the registry."""
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(response)")
+    if 'model_version' not in [column[1] for column in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE response ADD COLUMN model_version VARCHAR(50)")
+        conn.commit()
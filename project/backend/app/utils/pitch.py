@@ -0,0 +1,109 @@
+import numpy as np
+
+# Frame layout matches the STFT in audio_analysis so both engines return one
+# value per spectrogram frame.
+FRAME_LENGTH = 2048
+HOP_LENGTH = 512
+
+# Speech-range search band for the autocorrelation engine
+SPEECH_FMIN = 65.0
+SPEECH_FMAX = 500.0
+
+# Frames whose autocorrelation peak is below this fraction of the frame
+# energy are treated as unvoiced
+VOICING_THRESHOLD = 0.3
+
+# Speech f0 sits far below this rate, so the autocorrelation engine
+# decimates to roughly it before framing
+DECIMATED_RATE = 5000
+
+# Frames per FFT batch, which keeps the autocorrelation buffers small on
+# long recordings
+FRAME_BATCH = 512
+
+def librosa_pitch(y, sr, S=None, center=True):
+    """Pitch tracks from librosa's piptrack and yin.
+
+    Returns (pitches, f0): the piptrack pitch matrix and the yin f0 track.
+    Pass center=False (with a matching S) when y is an already framed block.
+    """
+    import librosa
+
+    pitches, _ = librosa.piptrack(y=y, S=S, sr=sr, hop_length=HOP_LENGTH)
+    f0 = librosa.yin(y, fmin=librosa.note_to_hz('C2'), fmax=librosa.note_to_hz('C7'), sr=sr,
+                     frame_length=FRAME_LENGTH, hop_length=HOP_LENGTH, center=center)
+    return pitches, f0
+
+def autocorrelation_pitch(y, sr, S=None, center=True, fmin=SPEECH_FMIN, fmax=SPEECH_FMAX):
+    """Vectorized FFT autocorrelation pitch tracker.
+
+    Decimates the signal to about DECIMATED_RATE, frames it on the same
+    centered FRAME_LENGTH/HOP_LENGTH grid as librosa, takes the
+    autocorrelation of every frame with one batched FFT and picks the
+    strongest lag inside the speech band. Returns (pitches, f0) in the same
+    shape convention as librosa_pitch: pitches is a 1 x n_frames matrix that
+    is zero on unvoiced frames, f0 has an estimate for every frame.
+    """
+    y = np.asarray(y, dtype=np.float32)
+    if center:
+        y = np.pad(y, FRAME_LENGTH // 2)
+    if len(y) < FRAME_LENGTH:
+        y = np.pad(y, (0, FRAME_LENGTH - len(y)))
+
+    # Box-filter decimation by an integer factor that divides the hop
+    factor = max(1, int(sr // DECIMATED_RATE))
+    while HOP_LENGTH % factor:
+        factor -= 1
+    if factor > 1:
+        y = y[:len(y) // factor * factor].reshape(-1, factor).mean(axis=1)
+        sr = sr / factor
+    frame_length = FRAME_LENGTH // factor
+    hop_length = HOP_LENGTH // factor
+
+    frames = np.lib.stride_tricks.sliding_window_view(y, frame_length)[::hop_length]
+    n_frames = frames.shape[0]
+
+    min_lag = max(1, int(sr / fmax))
+    max_lag = min(int(np.ceil(sr / fmin)), frame_length - 2)
+
+    # Zero padding to at least frame_length + max_lag avoids circular wrap
+    n_fft = 1 << int(np.ceil(np.log2(frame_length + max_lag)))
+
+    f0 = np.empty(n_frames, dtype=np.float32)
+    voiced = np.empty(n_frames, dtype=bool)
+
+    for start in range(0, n_frames, FRAME_BATCH):
+        batch = frames[start:start + FRAME_BATCH]
+        batch = batch - batch.mean(axis=1, keepdims=True)
+
+        spectrum = np.fft.rfft(batch, n=n_fft, axis=1)
+        acf = np.fft.irfft(spectrum.real ** 2 + spectrum.imag ** 2, n=n_fft, axis=1)
+
+        band = acf[:, min_lag:max_lag + 1]
+        best = np.argmax(band, axis=1)
+        rows = np.arange(len(batch))
+        peak = band[rows, best]
+
+        # Parabolic interpolation around the peak for sub-sample lag accuracy
+        left = band[rows, np.maximum(best - 1, 0)]
+        right = band[rows, np.minimum(best + 1, band.shape[1] - 1)]
+        denom = left - 2 * peak + right
+        offset = np.where(np.abs(denom) > 1e-12, 0.5 * (left - right) / np.where(denom == 0, 1, denom), 0.0)
+        lag = min_lag + best + np.clip(offset, -0.5, 0.5)
+
+        f0[start:start + len(batch)] = sr / lag
+        voiced[start:start + len(batch)] = (acf[:, 0] > 1e-8) & (peak > VOICING_THRESHOLD * acf[:, 0])
+
+    pitches = np.where(voiced, f0, 0.0)[np.newaxis, :]
+    return pitches, f0
+
+PITCH_ENGINES = {
+    'librosa': librosa_pitch,
+    'numpy': autocorrelation_pitch
+}
+
+def estimate_pitch(y, sr, S=None, engine='librosa', center=True):
+    """Run the configured pitch engine and return (pitches, f0)."""
+    if engine not in PITCH_ENGINES:
+        raise ValueError(f"Unknown pitch engine: {engine}")
+    return PITCH_ENGINES[engine](y, sr, S=S, center=center)
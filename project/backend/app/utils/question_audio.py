@@ -0,0 +1,159 @@
+import csv
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+import numpy as np
+from app.utils.audio_transcode import TRANSCODE_FORMATS, transcode_file
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+
+# Questions asked that are not in the question bank
+EXTRA_QUESTIONS = (
+    "Tell me about yourself",
+    "Thank you for your responses. Do you have any questions for me?",
+)
+
+class QuestionSynthesizer(ABC):
+    """Turns question text into speech. name goes into the cache key, so
+    changing the engine or its voice settings re-renders every question."""
+
+    name = None
+
+    @abstractmethod
+    def synthesize(self, text, path):
+        """Write text spoken aloud to path as an audio file soundfile can read."""
+
+class Pyttsx3Synthesizer(QuestionSynthesizer):
+    """Offline speech through pyttsx3 (SAPI5, NSSpeechSynthesizer or eSpeak)."""
+
+    def __init__(self, rate=170, voice=None):
+        self.rate = rate
+        self.voice = voice
+        self.name = f"pyttsx3:{rate}:{voice or 'default'}"
+
+    def synthesize(self, text, path):
+        import pyttsx3
+
+        engine = pyttsx3.init()
+        engine.setProperty('rate', self.rate)
+        if self.voice:
+            engine.setProperty('voice', self.voice)
+        engine.save_to_file(text, path)
+        engine.runAndWait()
+        engine.stop()
+
+class StubSynthesizer(QuestionSynthesizer):
+    """Deterministic tones, one syllable-length beep per word, for tests and
+    machines without a speech engine."""
+
+    name = 'stub'
+
+    def __init__(self, sr=16000):
+        self.sr = sr
+
+    def synthesize(self, text, path):
+        import soundfile as sf
+
+        beep = int(0.18 * self.sr)
+        t = np.arange(beep) / self.sr
+        envelope = np.sin(np.pi * t / t[-1])
+        words = text.split() or ['']
+        clip = np.concatenate([
+            np.concatenate([0.3 * envelope * np.sin(2 * np.pi * (180 + 10 * (len(word) % 8)) * t),
+                            np.zeros(beep // 3)])
+            for word in words
+        ])
+        sf.write(path, clip.astype(np.float32), self.sr, subtype='PCM_16')
+
+SYNTHESIZERS = {
+    'pyttsx3': Pyttsx3Synthesizer,
+    'stub': StubSynthesizer,
+}
+
+def get_synthesizer(name):
+    """Build the synthesizer registered under name."""
+    if name not in SYNTHESIZERS:
+        raise ValueError(f"Unknown question synthesizer: {name}")
+    return SYNTHESIZERS[name]()
+
+def question_texts(csv_path):
+    """Distinct question texts of the question bank plus EXTRA_QUESTIONS, in order."""
+    texts = []
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            texts.append((row.get('question') or '').strip())
+    texts.extend(EXTRA_QUESTIONS)
+    return list(dict.fromkeys(text for text in texts if text))
+
+def question_audio_key(text, synthesizer_name):
+    """Cache key of one question's audio: a hash of the text and the synthesizer."""
+    return hashlib.sha256(f"{synthesizer_name}\0{text.strip()}".encode('utf-8')).hexdigest()[:32]
+
+def build_question_audio(csv_path, out_dir, synthesizer, fmt='opus'):
+    """Render every question to out_dir and write its manifest.
+
+    Files are named by question_audio_key, so only questions that are new
+    or whose text changed are synthesized; files no question uses any more
+    are removed. Returns counts of generated, kept and removed files.
+    """
+    ext = TRANSCODE_FORMATS[fmt][2]
+    os.makedirs(out_dir, exist_ok=True)
+    stats = {'generated': 0, 'kept': 0, 'removed': 0}
+
+    files = {}
+    for text in question_texts(csv_path):
+        filename = f"{question_audio_key(text, synthesizer.name)}.{ext}"
+        files[text] = filename
+        path = os.path.join(out_dir, filename)
+        if os.path.exists(path):
+            stats['kept'] += 1
+            continue
+
+        fd, tmp = tempfile.mkstemp(suffix='.wav')
+        os.close(fd)
+        try:
+            synthesizer.synthesize(text, tmp)
+            transcode_file(tmp, path, fmt)
+        finally:
+            os.remove(tmp)
+        stats['generated'] += 1
+
+    used = set(files.values())
+    for name in os.listdir(out_dir):
+        if name != MANIFEST_NAME and name not in used:
+            os.remove(os.path.join(out_dir, name))
+            stats['removed'] += 1
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'synthesizer': synthesizer.name,
+        'format': fmt,
+        'questions': files,
+    }
+    partial_path = os.path.join(out_dir, MANIFEST_NAME + '.part')
+    with open(partial_path, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(partial_path, os.path.join(out_dir, MANIFEST_NAME))
+    return stats
+
+# Manifest as last read, reloaded when the file changes
+_manifest = {'path': None, 'mtime': None, 'data': None}
+_manifest_lock = threading.Lock()
+
+def load_question_audio_manifest(out_dir):
+    """Return the manifest written by build_question_audio, or None if it was never built."""
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    try:
+        mtime = os.path.getmtime(path)
+    except FileNotFoundError:
+        return None
+    with _manifest_lock:
+        if (_manifest['path'], _manifest['mtime']) != (path, mtime):
+            with open(path) as f:
+                _manifest['data'] = json.load(f)
+            _manifest.update(path=path, mtime=mtime)
+        return _manifest['data']
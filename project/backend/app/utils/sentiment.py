@@ -0,0 +1,313 @@
+import re
+import threading
+from itertools import repeat
+import numpy as np
+
+# Words that flip the polarity of the next known word, as in TextBlob's English analyzer
+NEGATIONS = ('no', 'not', "n't", 'never')
+
+# Token codes after the lexicon's word ids: unknown tokens by length, then
+# the tokens the rules look at, then one code per emoticon
+UNKNOWN_SHORT, UNKNOWN_PAIR, UNKNOWN_LONG, EXCLAMATION, IRONY = range(5)
+SPECIAL_CODES = 5
+
+class LexiconSentiment:
+    """TextBlob's English sentiment scoring, compiled for speed.
+
+    TextBlob (pattern) builds a blob, splits it into sentences and walks
+    the tokens one at a time, averaging the polarity of the lexicon words
+    found, where an adverb like "very" scales the next word, a negation
+    ("not") flips it to -0.5 times its polarity, and "!" boosts the
+    previous one. Here the lexicon is compiled once into arrays indexed by
+    a token code, each text is split into the same tokens without the
+    sentence bookkeeping and turned into codes with one dict lookup per
+    token. polarity_of walks one text's codes with the same rules as
+    TextBlob; polarities runs them as vectorized passes over all tokens of
+    a batch of texts at once.
+
+    Polarities match TextBlob's on ordinary answers
+    (benchmarks/sentiment_benchmark.py checks a corpus); in batches, exotic
+    inputs such as an emoticon wedged between an adverb and its word may
+    score slightly differently.
+    """
+
+    def __init__(self):
+        from textblob.en.sentiments import pattern_sentiment
+        from textblob._text import EMOTICONS
+
+        # Loading the lexicon is lazy in pattern; any lookup triggers it
+        'good' in pattern_sentiment
+        words = [word for word in pattern_sentiment if re.fullmatch(r"\w+(?:[-.]\w+)*", word)]
+        self.codes = {word: code for code, word in enumerate(words)}
+        vocabulary = len(words)
+
+        emoticons = {}
+        for (_, polarity), forms in EMOTICONS.items():
+            for form in forms:
+                form = form.lower()
+                # pattern only tries emoticons on tokens that are not alphabetic
+                if not form.isalpha() and len(form) <= 5 and form not in emoticons:
+                    emoticons[form] = polarity
+        self.emoticons = emoticons
+        size = vocabulary + SPECIAL_CODES + len(emoticons)
+        self.base = vocabulary
+
+        self.polarity = np.zeros(size)
+        self.intensity = np.ones(size)
+        self.known = np.zeros(size, dtype=bool)
+        self.modifier = np.zeros(size, dtype=bool)
+        self.ly = np.zeros(size, dtype=bool)
+        self.negation = np.zeros(size, dtype=bool)
+        self.length = np.ones(size, dtype=np.int64)
+        for word, code in self.codes.items():
+            polarity, _, intensity = pattern_sentiment[word][None]
+            self.polarity[code] = polarity
+            self.intensity[code] = intensity
+            self.known[code] = True
+            # Adverbs modify the word after them
+            self.modifier[code] = 'RB' in pattern_sentiment[word]
+            self.ly[code] = word.endswith('ly')
+            self.length[code] = len(word)
+
+        self.length[self.base + UNKNOWN_PAIR] = 2
+        self.length[self.base + UNKNOWN_LONG] = 3
+        self.entry = np.zeros(size, dtype=bool)
+        self.entry[self.base + IRONY] = True
+        self.length[self.base + IRONY] = 3
+        for offset, (form, polarity) in enumerate(emoticons.items()):
+            code = self.base + SPECIAL_CODES + offset
+            self.codes[form] = code
+            self.polarity[code] = polarity
+            self.entry[code] = True
+            self.length[code] = len(form)
+        self.codes['!'] = self.base + EXCLAMATION
+        self.codes['(!)'] = self.base + IRONY
+        for word in NEGATIONS:
+            code = self.codes.get(word)
+            if code is None:
+                code = self.codes[word] = len(self.polarity)
+                self._grow(length=len(word))
+            self.negation[code] = True
+
+        # The same tables as one tuple per code, for scoring a single text
+        self.rules = list(zip(
+            self.known.tolist(), self.polarity.tolist(), self.intensity.tolist(), self.modifier.tolist(),
+            self.ly.tolist(), self.negation.tolist(), self.length.tolist(), self.entry.tolist()
+        ))
+
+    def _grow(self, length):
+        for name in ('polarity', 'intensity', 'known', 'modifier', 'ly', 'negation', 'length', 'entry'):
+            array = getattr(self, name)
+            fill = {'intensity': 1, 'length': length}.get(name, 0)
+            setattr(self, name, np.append(array, np.array([fill], dtype=array.dtype)))
+
+    def tokenize(self, text):
+        """Lowercased tokens of text, split the way TextBlob's sentiment analyzer splits them."""
+        return _find_tokens(text).lower().split()
+
+    def encode(self, tokens):
+        """Token codes: lexicon word ids, the special tokens, and unknown tokens by length."""
+        codes = np.fromiter(map(self.codes.get, tokens, repeat(-1)), dtype=np.int64, count=len(tokens))
+        unknown = codes < 0
+        if unknown.any():
+            lengths = np.fromiter(map(len, tokens), dtype=np.int64, count=len(tokens))
+            # UNKNOWN_SHORT, UNKNOWN_PAIR and UNKNOWN_LONG for 1, 2 and 3+ characters
+            codes[unknown] = self.base + np.minimum(lengths[unknown], 3) - 1
+        return codes
+
+    def polarities(self, texts):
+        """Polarity in [-1, 1] of each text, scored together in one vectorized pass."""
+        tokens = []
+        lengths = []
+        for text in texts:
+            words = self.tokenize(text)
+            tokens.extend(words)
+            lengths.append(len(words))
+        return self._score(self.encode(tokens), np.array(lengths, dtype=np.int64))
+
+    def polarity_of(self, text):
+        """Polarity of one text, walking its tokens in Python.
+
+        For a single short text the fixed cost of the vectorized pass
+        outweighs the walk; both apply the same rules.
+        """
+        get = self.codes.get
+        entries = []     # [polarity, intensity, negated] per assessment
+        modifier = None  # rules of a pending adverb
+        negated = False
+        for token in self.tokenize(text):
+            code = get(token)
+            if code is None:
+                code = self.base + min(len(token), 3) - 1
+            known, polarity, intensity, is_modifier, ly, negation, length, entry = rule = self.rules[code]
+            if known:
+                if modifier is None:
+                    entries.append([polarity, intensity, False])
+                else:
+                    last = entries[-1]
+                    last[0] = max(-1.0, min(polarity * last[1], 1.0))
+                    last[1] = intensity
+                if negated:
+                    entries[-1][1] = 1.0 / entries[-1][1]
+                    entries[-1][2] = True
+                modifier = rule if is_modifier else None
+                negated = negation
+                continue
+            if negation:
+                negated = True
+            elif negated and length > 1:
+                negated = False
+            if negated and modifier is not None and modifier[4]:
+                entries[-1][2] = True
+                negated = False
+            elif modifier is not None and length > 2:
+                modifier = None
+            if code == self.base + EXCLAMATION and entries:
+                entries[-1][0] = max(-1.0, min(entries[-1][0] * 1.25, 1.0))
+            if entry:
+                entries.append([polarity, 1.0, False])
+        if not entries:
+            return 0.0
+        return sum(-0.5 * polarity if flipped else polarity for polarity, _, flipped in entries) / len(entries)
+
+    def _score(self, codes, lengths):
+        docs = len(lengths)
+        if not len(codes):
+            return np.zeros(docs)
+        positions = np.arange(len(codes))
+        doc = np.repeat(np.arange(docs), lengths)
+        doc_start = np.concatenate([[0], np.cumsum(lengths)[:-1]])[doc]
+
+        def last_before(mask):
+            # Index of the last masked token before each token in its text, or -1
+            marks = np.where(mask, positions, -1)
+            previous = np.concatenate([[-1], np.maximum.accumulate(marks)[:-1]])
+            return np.where(previous >= doc_start, previous, -1)
+
+        def code_at(index):
+            # Code of the token at index, for indexes from last_before (-1 is masked out by the caller)
+            return codes[np.maximum(index, 0)]
+
+        known = self.known[codes]
+        negation = self.negation[codes]
+        length = self.length[codes]
+        unknown = ~known
+
+        # A modifier stays pending over short words ("really is a good");
+        # unknown words of three or more characters drop it. A negation
+        # after an -ly adverb attaches to that adverb ("really not good")
+        # and keeps it pending.
+        resets = known | (unknown & (length > 2) & ~negation)
+        last = last_before(resets)
+        pending = (last >= 0) & self.modifier[code_at(last)]
+        attached = unknown & negation & pending & self.ly[code_at(last)]
+        last_modifier = last_before(known | (unknown & (length > 2) & ~attached))
+        merged = known & (last_modifier >= 0) & self.modifier[code_at(last_modifier)]
+
+        # A negation stays pending until the next known word, over
+        # one-character tokens only
+        negation_events = known | negation | (unknown & (length > 1))
+        last_negation = last_before(negation_events)
+        negated = known & (last_negation >= 0) & (negation & ~attached)[np.maximum(last_negation, 0)]
+
+        # Assessments: a known word starts one unless it is merged into the
+        # modifier before it; emoticons and "(!)" start their own
+        starts = (known & ~merged) | self.entry[codes]
+        entry = np.cumsum(starts) - 1
+        entries = int(starts.sum())
+        if not entries:
+            return np.zeros(docs)
+
+        intensity = np.where(negated, 1.0 / self.intensity[codes], self.intensity[codes])
+        polarity = np.where(
+            merged,
+            np.clip(self.polarity[codes] * intensity[np.maximum(last_modifier, 0)], -1.0, 1.0),
+            self.polarity[codes]
+        )
+        members = np.flatnonzero(known | self.entry[codes])
+        member_entry = entry[members]
+        final = members[np.concatenate([member_entry[1:] != member_entry[:-1], [True]])]
+        entry_polarity = polarity[final]
+        entry_doc = doc[np.flatnonzero(starts)]
+
+        flipped = np.zeros(entries, dtype=bool)
+        flipped[entry[negated]] = True
+        flipped[entry[attached]] = True
+
+        # "!" boosts the assessment before it, unless a merge rewrites it later
+        bangs = np.flatnonzero((codes == self.base + EXCLAMATION) & (entry >= 0))
+        bangs = bangs[(entry_doc[entry[bangs]] == doc[bangs]) & (final[entry[bangs]] < bangs)]
+        boosts = np.bincount(entry[bangs], minlength=entries)
+        entry_polarity = np.clip(entry_polarity * 1.25 ** boosts, -1.0, 1.0)
+        entry_polarity = np.where(flipped, -0.5 * entry_polarity, entry_polarity)
+
+        totals = np.bincount(entry_doc, weights=entry_polarity, minlength=docs)
+        counts = np.bincount(entry_doc, minlength=docs)
+        return np.where(counts > 0, totals / np.maximum(counts, 1), 0.0)
+
+def _find_tokens(text):
+    """pattern's find_tokens joined into one string, without splitting sentences.
+
+    Contractions and quotes are spaced out, leading and trailing
+    punctuation is split from each word (keeping abbreviations such as
+    "e.g." whole), and emoticons and "(!)" are glued back together.
+    """
+    from textblob._text import (
+        ABBREVIATIONS, PUNCTUATION, RE_ABBR1, RE_ABBR2, RE_ABBR3, RE_EMOTICONS, RE_SARCASM, replacements
+    )
+
+    for contraction, spaced in replacements.items():
+        text = text.replace(contraction, spaced)
+    for quote in ('“', '”', '‘', '’', "'", '"'):
+        text = text.replace(quote, f" {quote} ")
+
+    punctuation = tuple(PUNCTUATION.replace('.', ''))
+    trailing = punctuation + ('.',)
+    leading_chars, trailing_chars = frozenset(punctuation), frozenset(trailing)
+    tokens = []
+    for token in text.split():
+        # Most words have no punctuation to split off
+        if token[0] not in leading_chars and token[-1] not in trailing_chars or token in replacements:
+            tokens.append(token)
+            continue
+        tail = []
+        while token.startswith(punctuation):
+            tokens.append(token[0])
+            token = token[1:]
+        while token.endswith(trailing):
+            if token.endswith(punctuation):
+                tail.append(token[-1])
+                token = token[:-1]
+            if token.endswith('...'):
+                tail.append('...')
+                token = token[:-3].rstrip('.')
+            if token.endswith('.'):
+                if token in ABBREVIATIONS or RE_ABBR1.match(token) or RE_ABBR2.match(token) or RE_ABBR3.match(token):
+                    break
+                tail.append('.')
+                token = token[:-1]
+        if token:
+            tokens.append(token)
+        tokens.extend(reversed(tail))
+
+    joined = RE_SARCASM.sub('(!)', ' '.join(tokens))
+    return RE_EMOTICONS.sub(lambda m: m.group(1).replace(' ', '') + m.group(2), joined)
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_sentiment_engine():
+    """Return the process-wide LexiconSentiment, compiling the lexicon on first use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = LexiconSentiment()
+        return _engine
+
+def polarity(text):
+    """Polarity of text in [-1, 1]."""
+    return get_sentiment_engine().polarity_of(text)
+
+def polarities(texts):
+    """Polarities of many texts in one vectorized pass."""
+    return get_sentiment_engine().polarities(texts)
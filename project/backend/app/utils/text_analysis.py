@@ -0,0 +1,243 @@
+import re
+import threading
+import time
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+import numpy as np
+from app.models import interview
+from app.models.interview import response_score, sentiment_label
+from app.utils.micro_batch import MicroBatcher
+from app.utils.model_artifact import DEFAULT_TOKEN_PATTERN, word_ngrams
+from app.utils.sentiment import polarity
+
+# Characters preprocess_text strips from a lowercased answer
+NON_WORD = re.compile(r'[^\w\s]')
+
+# Callables run as hook(stage, seconds) after every stage of every answer
+_timing_hooks = []
+_timing_hooks_lock = threading.Lock()
+
+def add_timing_hook(hook):
+    """Call hook(stage, seconds) after each analysis stage ('tokenize', 'sentiment', 'classify', 'score')."""
+    with _timing_hooks_lock:
+        _timing_hooks.append(hook)
+
+def remove_timing_hook(hook):
+    with _timing_hooks_lock:
+        if hook in _timing_hooks:
+            _timing_hooks.remove(hook)
+
+class AnalyzedText:
+    """A text answer tokenized once for every consumer.
+
+    The sentiment, category and score that analyze_sentiment,
+    classify_response and calculate_response_score would return, computed
+    from one tokenization of the answer: the word count comes from a
+    whitespace split, the normalized tokens (preprocess_text's output,
+    split) from one cleanup pass over the whole answer, and the TF-IDF
+    vector is built straight from those tokens instead of re-parsing the
+    text. Each value is computed on first use, and the seconds spent per
+    stage are kept in timings. A batcher from get_classification_batcher
+    classifies the answer together with those of concurrent requests.
+    model_version names the classifier artifact that set the category
+    (None for the pickled model).
+    """
+
+    def __init__(self, text, batcher=None):
+        self.text = text
+        self.batcher = batcher
+        self.timings = {}
+        self.model_version = None
+        self._sentiment = None
+        self._category = None
+        with self._stage('tokenize'):
+            self.words = text.split()
+            self.tokens = NON_WORD.sub('', text.lower()).split()
+
+    @contextmanager
+    def _stage(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.timings[stage] = self.timings.get(stage, 0.0) + elapsed
+            for hook in list(_timing_hooks):
+                hook(stage, elapsed)
+
+    @property
+    def word_count(self):
+        return len(self.words)
+
+    @property
+    def normalized(self):
+        """The answer as preprocess_text returns it."""
+        return ' '.join(self.tokens)
+
+    @property
+    def sentiment(self):
+        """'positive', 'neutral' or 'negative', as analyze_sentiment labels the answer."""
+        if self._sentiment is None:
+            with self._stage('sentiment'):
+                self._sentiment = sentiment_label(self.polarity())
+        return self._sentiment
+
+    def polarity(self):
+        """The answer's polarity in [-1, 1], from the compiled sentiment lexicon."""
+        return polarity(self.text)
+
+    @property
+    def category(self):
+        """The answer's category, as classify_response predicts it."""
+        if self._category is None:
+            with self._stage('classify'):
+                self._category = self._classify()
+        return self._category
+
+    def _classify(self):
+        if self.batcher is None:
+            return classify_texts([self])[0]
+        try:
+            return self.batcher.submit(self)
+        except Exception:
+            return "general"
+
+    def tfidf_vector(self, vectorizer):
+        """The answer's row in vectorizer's TF-IDF space, as vectorizer.transform([normalized]) builds it."""
+        return tfidf_matrix(vectorizer, [self])
+
+    @property
+    def score(self):
+        """The answer's score, as calculate_response_score rates it."""
+        sentiment = self.sentiment
+        with self._stage('score'):
+            return response_score(self.word_count, sentiment)
+
+class _TfidfLayout:
+    """What a fitted word TfidfVectorizer needs to vectorize pre-tokenized text."""
+
+    def __init__(self, vectorizer):
+        self.vocabulary = vectorizer.vocabulary_
+        self.stop_words = vectorizer.get_stop_words() or frozenset()
+        self.ngram_range = vectorizer.ngram_range
+        self.binary = vectorizer.binary
+        self.sublinear_tf = vectorizer.sublinear_tf
+        self.norm = vectorizer.norm
+        self.idf = vectorizer.idf_ if vectorizer.use_idf else None
+        self.dtype = vectorizer.dtype
+
+    def row(self, tokens):
+        """Column indices and TF-IDF values of one answer's row."""
+        grams = word_ngrams(tokens, self.stop_words, self.ngram_range)
+        counts = Counter(self.vocabulary[gram] for gram in grams if gram in self.vocabulary)
+        indices = np.array(sorted(counts), dtype=np.int32)
+        values = np.array([counts[index] for index in indices], dtype=np.float64)
+        if self.binary:
+            values[:] = 1.0
+        elif self.sublinear_tf:
+            values = np.log(values) + 1.0
+        if self.idf is not None and len(indices):
+            values *= self.idf[indices]
+        if self.norm == 'l2':
+            total = np.sqrt(np.dot(values, values))
+        elif self.norm == 'l1':
+            total = np.abs(values).sum()
+        else:
+            total = 0.0
+        if total > 0:
+            values /= total
+        return indices, values
+
+    def transform(self, token_lists):
+        """One CSR row per token list."""
+        from scipy.sparse import csr_matrix
+
+        rows = [self.row(tokens) for tokens in token_lists]
+        indptr = np.zeros(len(rows) + 1, dtype=np.int32)
+        indptr[1:] = np.cumsum([len(indices) for indices, _ in rows])
+        if rows:
+            indices = np.concatenate([indices for indices, _ in rows])
+            values = np.concatenate([values for _, values in rows])
+        else:
+            indices, values = np.zeros(0, dtype=np.int32), np.zeros(0)
+        return csr_matrix(
+            (values.astype(self.dtype), indices, indptr),
+            shape=(len(rows), len(self.vocabulary))
+        )
+
+_layouts = weakref.WeakKeyDictionary()
+_layouts_lock = threading.Lock()
+
+def _vectorizer_layout(vectorizer):
+    """The fast path for a vectorizer, or None when its settings need sklearn's own analyzer."""
+    with _layouts_lock:
+        if vectorizer not in _layouts:
+            fits = (
+                getattr(vectorizer, 'analyzer', None) == 'word'
+                and vectorizer.tokenizer is None
+                and vectorizer.preprocessor is None
+                and vectorizer.strip_accents is None
+                and vectorizer.token_pattern == DEFAULT_TOKEN_PATTERN
+                and hasattr(vectorizer, 'vocabulary_')
+                and hasattr(vectorizer, 'idf_')
+            )
+            _layouts[vectorizer] = _TfidfLayout(vectorizer) if fits else None
+        return _layouts[vectorizer]
+
+def tfidf_matrix(vectorizer, texts):
+    """TF-IDF rows of AnalyzedTexts, as vectorizer.transform of their normalized texts builds them."""
+    layout = _vectorizer_layout(vectorizer)
+    if layout is None:
+        return vectorizer.transform([text.normalized for text in texts])
+    return layout.transform([text.tokens for text in texts])
+
+def classify_texts(texts):
+    """Categories of AnalyzedTexts from one sparse transform and one predict.
+
+    Each text's model_version is set to the classifier artifact used; the
+    whole batch sees the same one even if the registry swaps it meanwhile.
+    """
+    classifier = interview.classifier
+    if classifier is not None:
+        try:
+            categories = classifier.predict([text.tokens for text in texts])
+        except Exception as e:
+            print(f"Error in classify_response: {str(e)}")
+            return ["general"] * len(texts)
+        for text in texts:
+            text.model_version = classifier.version
+        return categories
+    model, vectorizer = interview.model, interview.vectorizer
+    if model is None or vectorizer is None:
+        return ["general"] * len(texts)
+    try:
+        return list(model.predict(tfidf_matrix(vectorizer, texts)))
+    except Exception as e:
+        print(f"Error in classify_response: {str(e)}")
+        return ["general"] * len(texts)
+
+# Batcher shared by every request in this process, created on first use
+_batcher = None
+_batcher_lock = threading.Lock()
+
+def get_classification_batcher(config):
+    """Return the process-wide MicroBatcher for text classification, or None when batching is off.
+
+    Answers of concurrent requests are classified together, up to
+    TEXT_CLASSIFY_BATCH at a time after waiting at most
+    TEXT_CLASSIFY_BATCH_WAIT seconds for company; a batch size of 1
+    classifies every answer in its own request.
+    """
+    global _batcher
+    if config.get('TEXT_CLASSIFY_BATCH', 32) <= 1:
+        return None
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = MicroBatcher(
+                classify_texts,
+                config.get('TEXT_CLASSIFY_BATCH', 32),
+                config.get('TEXT_CLASSIFY_BATCH_WAIT', 0.003),
+                name='text-classifier'
+            )
+        return _batcher
@@ -0,0 +1,163 @@
+import numpy as np
+
+# webrtcvad only accepts 16-bit mono PCM at a few rates, in 10, 20 or 30 ms frames
+VAD_RATE = 16000
+FRAME_MS = 20
+
+# Non-speech kept on each side of speech so word edges are not clipped
+PAD_MS = 200
+
+# Silences shorter than this are bridged and kept; longer ones count as pauses
+MIN_PAUSE_MS = 500
+
+# Keys of SpeechGate.metrics
+SPEECH_METRICS = ('speaking_time', 'speech_ratio', 'pause_count', 'mean_pause', 'longest_pause')
+
+class SpeechGate:
+    """Drop non-speech from a signal fed to it piece by piece.
+
+    Samples are cut into FRAME_MS frames and each frame is classified by
+    webrtcvad at VAD_RATE. add() returns the samples that survive: every
+    speech frame, PAD_MS of silence around speech and any silence shorter
+    than MIN_PAUSE_MS between speech. Leading, trailing and long silences are
+    dropped and counted as pauses instead. Only the current silence is
+    buffered, so memory does not grow with the recording.
+
+    mode is the webrtcvad aggressiveness, 0 (least) to 3 (most). sr should be
+    a multiple of 50 so frames line up with the VAD frames exactly.
+    """
+
+    def __init__(self, sr, mode=2):
+        import soxr
+        import webrtcvad
+
+        self.sr = sr
+        self.frame_length = sr * FRAME_MS // 1000
+        self._vad = webrtcvad.Vad(mode)
+        self._vad_frame_length = VAD_RATE * FRAME_MS // 1000
+        self._resampler = None
+        if sr != VAD_RATE:
+            self._resampler = soxr.ResampleStream(sr, VAD_RATE, 1, dtype='float32')
+
+        self._pad_frames = PAD_MS // FRAME_MS
+        self._pause_frames = max(MIN_PAUSE_MS // FRAME_MS, 2 * self._pad_frames)
+
+        self._samples = np.zeros(0, dtype=np.float32)
+        self._vad_samples = np.zeros(0, dtype=np.float32)
+        self._decisions = []
+        self._seen_speech = False
+        self._silent_run = 0
+        self._held = []
+
+        self.n_samples = 0
+        self.speech_frames = 0
+        self.pauses = 0
+        self.pause_frames = 0
+        self.longest_pause_frames = 0
+
+    def add(self, y):
+        """Feed the next mono float samples and return the ones kept so far."""
+        y = np.asarray(y, dtype=np.float32).ravel()
+        self.n_samples += len(y)
+        self._samples = np.concatenate([self._samples, y])
+
+        vad_y = self._resampler.resample_chunk(y) if self._resampler is not None else y
+        self._vad_samples = np.concatenate([self._vad_samples, vad_y])
+        self._classify()
+
+        return self._gate(final=False)
+
+    def flush(self):
+        """Return the samples kept from the end of the signal."""
+        if self._resampler is not None:
+            self._vad_samples = np.concatenate([
+                self._vad_samples,
+                self._resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+            ])
+        self._classify()
+        return self._gate(final=True)
+
+    @property
+    def speaking_time(self):
+        return self.speech_frames * FRAME_MS / 1000.0
+
+    def metrics(self):
+        """Speaking time and pause statistics of everything fed so far, in seconds."""
+        duration = self.n_samples / float(self.sr)
+        return {
+            'speaking_time': self.speaking_time,
+            'speech_ratio': self.speaking_time / duration if duration > 0 else 0.0,
+            'pause_count': self.pauses,
+            'mean_pause': self.pause_frames * FRAME_MS / 1000.0 / self.pauses if self.pauses else 0.0,
+            'longest_pause': self.longest_pause_frames * FRAME_MS / 1000.0
+        }
+
+    def _classify(self):
+        """Run the VAD over every whole frame of resampled audio."""
+        n_frames = len(self._vad_samples) // self._vad_frame_length
+        if not n_frames:
+            return
+        frames = self._vad_samples[:n_frames * self._vad_frame_length]
+        self._vad_samples = self._vad_samples[n_frames * self._vad_frame_length:]
+
+        pcm = (np.clip(frames, -1.0, 1.0) * 32767).astype('<i2').tobytes()
+        step = 2 * self._vad_frame_length
+        for start in range(0, len(pcm), step):
+            self._decisions.append(self._vad.is_speech(pcm[start:start + step], VAD_RATE))
+
+    def _gate(self, final):
+        """Pass classified frames through and return the samples kept."""
+        kept = []
+        n_frames = min(len(self._decisions), len(self._samples) // self.frame_length)
+        for i in range(n_frames):
+            frame = self._samples[i * self.frame_length:(i + 1) * self.frame_length]
+            self._frame(frame, self._decisions[i], kept)
+        self._samples = self._samples[n_frames * self.frame_length:]
+        del self._decisions[:n_frames]
+
+        if final:
+            # Whatever the VAD could not classify is treated as silence
+            if len(self._samples):
+                self._frame(self._samples, False, kept)
+            self._samples = np.zeros(0, dtype=np.float32)
+            self._decisions = []
+            if not self._seen_speech:
+                # No speech at all: keep the last stretch rather than nothing
+                kept.extend(self._held)
+            self._held = []
+
+        if not kept:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(kept)
+
+    def _frame(self, frame, is_speech, kept):
+        if is_speech:
+            if self._seen_speech and self._silent_run >= self._pause_frames:
+                self.pauses += 1
+                self.pause_frames += self._silent_run
+                self.longest_pause_frames = max(self.longest_pause_frames, self._silent_run)
+            # Short silences are kept whole; long ones only keep their last PAD_MS
+            kept.extend(self._held)
+            kept.append(frame)
+            self._held = []
+            self._silent_run = 0
+            self._seen_speech = True
+            self.speech_frames += 1
+            return
+
+        self._silent_run += 1
+        if self._seen_speech and self._silent_run <= self._pad_frames:
+            kept.append(frame)
+            return
+        self._held.append(frame)
+        if not self._seen_speech or self._silent_run >= self._pause_frames:
+            del self._held[:-self._pad_frames]
+
+def trim_silence(y, sr, mode=2):
+    """Drop non-speech from a whole signal.
+
+    Returns (voiced samples, speech metrics); see SpeechGate.
+    """
+    gate = SpeechGate(sr, mode)
+    voiced = np.concatenate([gate.add(y), gate.flush()])
+    return voiced, gate.metrics()
@@ -0,0 +1,113 @@
+import os
+import threading
+import time
+import traceback
+import numpy as np
+from app.utils.audio_analysis import SAMPLE_RATE, compute_audio_features, score_audio_features
+from app.utils.audio_stream import AudioFeatureAccumulator
+
+# Length of the synthetic clip; long enough for every stage, including the
+# silence trimming and the tempogram, to reach its compiled kernels
+WARMUP_SECONDS = 3.0
+
+# Progress of the warm-up in this process, reported by the readiness endpoint
+_state = {"ready": False, "started_at": None, "finished_at": None, "seconds": None, "error": None}
+_state_lock = threading.Lock()
+
+def configure_numba_cache(cache_dir):
+    """Point numba's on-disk compile cache at cache_dir.
+
+    Must run before librosa (and so numba) is first imported. librosa's
+    kernels are cached next to its sources by default, which is often
+    read-only in deployments and then recompiled on every start. An
+    explicitly set NUMBA_CACHE_DIR is left alone.
+    """
+    if not cache_dir or os.environ.get('NUMBA_CACHE_DIR'):
+        return
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        os.environ['NUMBA_CACHE_DIR'] = cache_dir
+    except OSError as e:
+        print(f"Could not use numba cache directory {cache_dir}: {str(e)}")
+
+def synthetic_clip(seconds=WARMUP_SECONDS, sr=SAMPLE_RATE):
+    """A deterministic voiced clip with a pause, so every analysis stage has work to do."""
+    t = np.arange(int(sr * seconds)) / sr
+    f0 = 140 + 30 * np.sin(2 * np.pi * 0.5 * t)
+    y = 0.3 * np.sin(2 * np.pi * np.cumsum(f0) / sr) * (0.5 + 0.5 * np.sin(2 * np.pi * 3 * t) ** 2)
+    y[int(sr * seconds * 0.4):int(sr * seconds * 0.6)] = 0.0
+    y += 0.01 * np.random.default_rng(0).standard_normal(len(t))
+    return y.astype(np.float32)
+
+def warm_up_pipeline(pitch_engine='librosa', vad_mode=None):
+    """Run the whole-file and block audio pipelines once; returns the seconds taken.
+
+    This pays for importing librosa and scipy and for numba compiling (or
+    loading from its cache) the kernels the scorers use, so the first real
+    answer does not.
+    """
+    started = time.perf_counter()
+    y = synthetic_clip()
+    score_audio_features(compute_audio_features(y, SAMPLE_RATE, pitch_engine, vad_mode), 'Warm-up')
+
+    accumulator = AudioFeatureAccumulator(SAMPLE_RATE, pitch_engine, vad_mode)
+    accumulator.add(y)
+    accumulator.finalize()
+    return time.perf_counter() - started
+
+def readiness():
+    """Return a copy of this process's warm-up state."""
+    with _state_lock:
+        return dict(_state)
+
+def _update_state(**values):
+    with _state_lock:
+        _state.update(values)
+
+def start_warmup(app):
+    """Warm up the audio pipeline in a daemon thread and return it.
+
+    The pipeline runs once in this process, for streamed answers and inline
+    analysis, and the analysis pool is started so each worker warms up in
+    its initializer. readiness() reports ready once both are done, or right
+    away when AUDIO_WARMUP is 0.
+
+    The pool's processes are forked here, in the calling thread, before the
+    warm-up thread starts loading librosa; forking while another thread
+    holds the import or numba locks could leave a worker deadlocked.
+    """
+    from app.utils.audio_jobs import get_executor, warm_worker
+
+    if not app.config.get('AUDIO_WARMUP', 1):
+        _update_state(ready=True)
+        return None
+
+    pitch_engine = app.config.get('PITCH_ENGINE', 'librosa')
+    vad_mode = app.config.get('AUDIO_VAD_MODE', 2)
+    workers = app.config.get('AUDIO_ANALYSIS_WORKERS', 2)
+    started = time.perf_counter()
+    _update_state(started_at=time.time())
+
+    # Submitted together, so the pool starts every worker at once
+    futures = []
+    if workers > 0:
+        executor = get_executor(app.config)
+        futures = [executor.submit(warm_worker) for _ in range(workers)]
+
+    def run():
+        try:
+            warm_up_pipeline(pitch_engine, vad_mode)
+            for future in futures:
+                future.result()
+            seconds = time.perf_counter() - started
+            _update_state(ready=True, finished_at=time.time(), seconds=seconds)
+            print(f"Audio pipeline warmed up in {seconds:.1f}s")
+        except Exception as e:
+            # A failed warm-up only costs latency; do not keep the app out of rotation
+            print(f"Error warming up the audio pipeline: {str(e)}")
+            print(traceback.format_exc())
+            _update_state(ready=True, finished_at=time.time(), error=str(e))
+
+    thread = threading.Thread(target=run, name='audio-warmup', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,51 @@
+import numpy as np
+
+# Min/max pairs kept per recording, about one per pixel of a wide waveform
+PEAK_BUCKETS = 1024
+
+def peaks_from_blocks(blocks, n_samples, buckets=PEAK_BUCKETS):
+    """Downsample a signal given as consecutive blocks to int8 min/max peaks.
+
+    The n_samples samples are split into buckets equal spans (fewer for very
+    short signals) and each span's minimum and maximum, scaled from [-1, 1]
+    to [-127, 127], are returned interleaved: min0, max0, min1, max1, ...
+    Only one block is held at a time.
+    """
+    buckets = max(1, min(buckets, n_samples))
+    edges = np.linspace(0, n_samples, buckets + 1).astype(np.int64)
+    mins = np.full(buckets, np.inf, dtype=np.float32)
+    maxs = np.full(buckets, -np.inf, dtype=np.float32)
+
+    offset = 0
+    for block in blocks:
+        block = np.asarray(block, dtype=np.float32).ravel()[:max(0, n_samples - offset)]
+        if not len(block):
+            continue
+        # Split the block where a bucket starts, then reduce each piece into its bucket
+        inner = edges[(edges > offset) & (edges < offset + len(block))] - offset
+        starts = np.concatenate([[0], inner])
+        ids = np.searchsorted(edges, offset + starts, side='right') - 1
+        np.minimum.at(mins, ids, np.minimum.reduceat(block, starts))
+        np.maximum.at(maxs, ids, np.maximum.reduceat(block, starts))
+        offset += len(block)
+
+    mins[~np.isfinite(mins)] = 0.0
+    maxs[~np.isfinite(maxs)] = 0.0
+    peaks = np.empty(2 * buckets, dtype=np.float32)
+    peaks[0::2] = mins
+    peaks[1::2] = maxs
+    return np.round(np.clip(peaks, -1.0, 1.0) * 127).astype(np.int8)
+
+def waveform_peaks(samples, buckets=PEAK_BUCKETS):
+    """int8 min/max peaks of a decoded recording; see peaks_from_blocks."""
+    return peaks_from_blocks([samples], len(samples), buckets)
+
+def file_peaks(path, buckets=PEAK_BUCKETS, block_frames=65536):
+    """int8 min/max peaks and duration in seconds of a stored recording, read in blocks."""
+    import soundfile as sf
+
+    with sf.SoundFile(path) as f:
+        n_frames, sr = f.frames, f.samplerate
+        blocks = (block.mean(axis=1) for block in f.blocks(blocksize=block_frames, dtype='float32', always_2d=True))
+        peaks = peaks_from_blocks(blocks, n_frames, buckets)
+    return peaks, n_frames / float(sr)
@@ -0,0 +1,73 @@
+import sys
+import os
+import threading
+import time
+
+# Add the backend directory to Python path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from text_benchmark import synthetic_answers
+from app.utils.micro_batch import MicroBatcher
+from app.utils.text_analysis import AnalyzedText, classify_texts
+
+CONCURRENCY = [1, 4, 16, 64]  # threads classifying at once, like concurrent requests
+ANSWERS = 2000                # answers classified per run
+MAX_BATCH = 32
+MAX_WAIT = 0.003
+
+def run_load(answers, threads, batcher):
+    """Classify answers from threads callers; returns CPU and wall seconds per answer."""
+    texts = [AnalyzedText(answer) for answer in answers]
+    share = [texts[i::threads] for i in range(threads)]
+    results = [None] * threads
+
+    def worker(index):
+        if batcher is None:
+            results[index] = [classify_texts([text])[0] for text in share[index]]
+        else:
+            results[index] = [batcher.submit(text) for text in share[index]]
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    cpu = (time.process_time() - cpu_start) / len(texts)
+    wall = (time.perf_counter() - wall_start) / len(texts)
+    labels = {}
+    for index in range(threads):
+        for text, label in zip(share[index], results[index]):
+            labels[id(text)] = label
+    return cpu, wall, [labels[id(text)] for text in texts]
+
+def run_benchmark():
+    answers = synthetic_answers(60, ANSWERS, seed=1)
+    classify_texts([AnalyzedText(answers[0])])  # load the classifier before timing
+
+    print(f"Text classification under load ({ANSWERS} answers, batches of up to {MAX_BATCH}, "
+          f"{MAX_WAIT * 1e3:.0f} ms window)")
+    print("-" * 80)
+    print(f"{'threads':>7} {'unbatched CPU (ms)':>19} {'batched CPU (ms)':>17} {'speedup':>8} "
+          f"{'mean batch':>11} {'mean wait (ms)':>15}")
+
+    ok = True
+    for threads in CONCURRENCY:
+        batcher = MicroBatcher(classify_texts, MAX_BATCH, MAX_WAIT, name='benchmark-classifier')
+        plain_cpu, _, plain_labels = run_load(answers, threads, None)
+        batched_cpu, _, batched_labels = run_load(answers, threads, batcher)
+        stats = batcher.stats()
+        print(f"{threads:>7} {plain_cpu * 1e3:>19.3f} {batched_cpu * 1e3:>17.3f} "
+              f"{plain_cpu / batched_cpu:>7.1f}x {stats['mean_batch_size']:>11.1f} "
+              f"{stats['mean_wait'] * 1e3:>15.2f}")
+        ok = ok and plain_labels == batched_labels
+
+    if ok:
+        print("\nBatched and unbatched categories match.")
+        return 0
+    print("\nBatched and unbatched categories DIFFER.")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(run_benchmark())
@@ -0,0 +1,96 @@
+import sys
+import os
+import random
+import resource
+import sqlite3
+import subprocess
+import tempfile
+
+# Add the backend directory to Python path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from text_benchmark import SENTENCES
+from ml_model.create_model import X_train, y_train
+from app.utils.incremental_training import question_categories
+
+CORPUS_SIZES = [5000, 20000, 80000]  # stored answers trained on
+BATCH = 500
+HASH_FEATURES = 2 ** 16
+MAX_GROWTH_SPREAD_MB = 5.0           # allowed difference in peak growth between corpus sizes
+
+def write_corpus(path, count, seed=0):
+    """A response table of count text answers: a sample answer plus filler sentences, to a question of its class."""
+    rng = random.Random(seed)
+    questions = {}
+    for question, category in question_categories().items():
+        questions.setdefault(category, []).append(question)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE response (id INTEGER PRIMARY KEY, question VARCHAR(500), response TEXT, "
+                 "input_type VARCHAR(20))")
+    rows = []
+    for _ in range(count):
+        index = rng.randrange(len(X_train))
+        text = ' '.join([X_train[index]] + rng.sample(SENTENCES, 3))
+        rows.append((rng.choice(questions[y_train[index]]), text, 'text'))
+        if len(rows) == 10000:
+            conn.executemany("INSERT INTO response (question, response, input_type) VALUES (?, ?, ?)", rows)
+            rows = []
+    conn.executemany("INSERT INTO response (question, response, input_type) VALUES (?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20
+
+def run_child(db_path, state_dir):
+    """Train on the whole corpus in this (fresh) process and print peak RSS before and after."""
+    from app.utils.incremental_training import IncrementalTrainer
+
+    trainer = IncrementalTrainer(state_dir, HASH_FEATURES, BATCH)
+    trainer.load_state()  # imports and the seed model
+    baseline = peak_rss_mb()
+    conn = sqlite3.connect(db_path)
+    stats = trainer.train(conn, publish_dir=os.path.join(state_dir, 'models'))
+    conn.close()
+    print(f"{baseline:.1f} {peak_rss_mb():.1f} {stats['rows']} {stats['seconds']:.2f}")
+
+def measure(db_path, state_dir):
+    """Train in a subprocess so every measurement starts from a clean peak."""
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', db_path, state_dir],
+        capture_output=True, text=True, check=True
+    ).stdout.split()
+    baseline, peak, rows, elapsed = output[-4:]
+    return float(baseline), float(peak), int(rows), float(elapsed)
+
+def run_benchmark():
+    print(f"Peak RSS of one incremental training run ({BATCH} answers per batch, {HASH_FEATURES} hashed features)")
+    print("-" * 80)
+    print(f"{'answers':>8} {'baseline (MB)':>14} {'peak (MB)':>10} {'growth (MB)':>12} {'answers/s':>10}")
+
+    growth = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in CORPUS_SIZES:
+            db_path = os.path.join(tmp, f'corpus_{count}.db')
+            write_corpus(db_path, count)
+            baseline, peak, rows, elapsed = measure(db_path, os.path.join(tmp, f'state_{count}'))
+            growth.append(peak - baseline)
+            print(f"{rows:>8} {baseline:>14.1f} {peak:>10.1f} {peak - baseline:>12.1f} {rows / elapsed:>10.0f}")
+            os.remove(db_path)
+
+    spread = max(growth) - min(growth)
+    print(f"\nPeak growth varies by {spread:.1f} MB across {CORPUS_SIZES[0]}-{CORPUS_SIZES[-1]} answers.")
+    if spread <= MAX_GROWTH_SPREAD_MB:
+        print("Training memory stays flat as the corpus grows.")
+        return 0
+    print("Training memory GROWS with the corpus.")
+    return 1
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == '--child':
+        run_child(sys.argv[2], sys.argv[3])
+        sys.exit(0)
+    sys.exit(run_benchmark())
@@ -0,0 +1,94 @@
+import sys
+import os
+import resource
+import subprocess
+import tempfile
+import time
+
+# Add the backend directory to Python path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from pitch_benchmark import synthetic_voice
+
+DURATIONS = [30, 120, 300, 600]
+SOURCE_RATE = 44100  # what browsers usually record at, so both modes resample
+SEGMENT = 60         # seconds of test signal generated at a time
+MODES = ['memory', 'blocks']
+
+def write_test_file(path, duration):
+    """Write a speech-like WAV of the given length without building it whole."""
+    import soundfile as sf
+
+    with sf.SoundFile(path, 'w', samplerate=SOURCE_RATE, channels=1, subtype='PCM_16', format='WAV') as f:
+        for i, start in enumerate(range(0, duration, SEGMENT)):
+            y, _ = synthetic_voice(min(SEGMENT, duration - start), sr=SOURCE_RATE, seed=i)
+            f.write(y)
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20
+
+def analyze(mode, path):
+    from app.utils.audio_analysis import extract_audio_features
+    from app.utils.audio_stream import extract_audio_features_blocked
+
+    if mode == 'memory':
+        return extract_audio_features(path)
+    return extract_audio_features_blocked(path)
+
+def run_child(mode, path, warmup_path):
+    """Measure one mode in this (fresh) process and print peak RSS before and after."""
+    analyze(mode, warmup_path)  # imports, JIT compilation and caches
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    analyze(mode, path)
+    elapsed = time.perf_counter() - start
+    print(f"{baseline:.1f} {peak_rss_mb():.1f} {elapsed:.2f}")
+
+def measure(mode, path, warmup_path):
+    """Run one mode in a subprocess so every measurement starts from a clean peak."""
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', mode, path, warmup_path],
+        capture_output=True, text=True, check=True
+    ).stdout.split()
+    baseline, peak, elapsed = (float(value) for value in output[-3:])
+    return baseline, peak, elapsed
+
+def run_benchmark():
+    print("Peak RSS of one audio analysis, whole-file decode vs block processing")
+    print("-" * 80)
+    print(f"{'duration (s)':>12} {'mode':>8} {'baseline (MB)':>14} {'peak (MB)':>10} "
+          f"{'growth (MB)':>12} {'time (s)':>9}")
+
+    growth = {mode: [] for mode in MODES}
+    with tempfile.TemporaryDirectory() as tmp:
+        warmup_path = os.path.join(tmp, 'warmup.wav')
+        write_test_file(warmup_path, 2)
+
+        for duration in DURATIONS:
+            path = os.path.join(tmp, f'voice_{duration}.wav')
+            write_test_file(path, duration)
+            for mode in MODES:
+                baseline, peak, elapsed = measure(mode, path, warmup_path)
+                growth[mode].append(peak - baseline)
+                print(f"{duration:>12} {mode:>8} {baseline:>14.1f} {peak:>10.1f} "
+                      f"{peak - baseline:>12.1f} {elapsed:>9.2f}")
+            os.remove(path)
+
+    # Block processing should not grow with the recording the way a whole decode does
+    spread = max(growth['blocks']) - min(growth['blocks'])
+    print(f"\nBlock mode growth varies by {spread:.1f} MB across "
+          f"{DURATIONS[0]}-{DURATIONS[-1]} s; whole-file growth reaches {max(growth['memory']):.1f} MB.")
+    if max(growth['blocks']) < max(growth['memory']):
+        print("Block processing keeps peak memory bounded.")
+        return 0
+    print("Block processing did NOT reduce peak memory.")
+    return 1
+
+if __name__ == "__main__":
+    if len(sys.argv) == 5 and sys.argv[1] == '--child':
+        run_child(sys.argv[2], sys.argv[3], sys.argv[4])
+        sys.exit(0)
+    sys.exit(run_benchmark())
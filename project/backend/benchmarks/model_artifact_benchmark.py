@@ -0,0 +1,130 @@
+import sys
+import os
+import pickle
+import random
+import subprocess
+import time
+
+# Add the backend directory to Python path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from text_benchmark import synthetic_answers
+from app.models.interview import MODEL_PATH, VECTORIZER_PATH, CLASSIFIER_ARTIFACT_PATH, preprocess_text
+from app.utils.model_artifact import ClassifierArtifact
+
+BATCHES = [1, 32]      # answers per predict call
+CALLS = 2000           # answers timed per batch size
+PARITY_TEXTS = 5000    # random mixes of vocabulary terms in the parity corpus
+WORKERS = 4            # processes loading the model at once for the memory table
+MODES = ['pickle', 'npz']
+
+def load_pickles():
+    with open(MODEL_PATH, 'rb') as f:
+        model = pickle.load(f)
+    with open(VECTORIZER_PATH, 'rb') as f:
+        vectorizer = pickle.load(f)
+    return model, vectorizer
+
+def sklearn_predict(model, vectorizer, texts):
+    return [str(label) for label in model.predict(vectorizer.transform([preprocess_text(text) for text in texts]))]
+
+def artifact_predict(artifact, texts):
+    return artifact.predict([preprocess_text(text).split() for text in texts])
+
+def parity_corpus(artifact, seed=0):
+    """Interview-like answers plus random mixes of the vocabulary's words, so every class gets predicted."""
+    rng = random.Random(seed)
+    words = sorted({word for term in artifact.terms.tolist() for word in term.split()})
+    corpus = synthetic_answers(40, 1000, seed=seed)
+    for _ in range(PARITY_TEXTS):
+        corpus.append(' '.join(rng.choice(words) for _ in range(rng.randint(1, 30))))
+    return corpus
+
+def latency(fn, texts, batch):
+    """Median seconds per predict call of batch answers."""
+    times = []
+    for i in range(0, len(texts) - batch + 1, batch):
+        start = time.perf_counter()
+        fn(texts[i:i + batch])
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2]
+
+def memory_kb(pid='self'):
+    """Rss, Pss and private kilobytes of a process, from /proc."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1])
+    return values['Rss'], values['Pss'], values['Private_Clean'] + values['Private_Dirty']
+
+def run_child(mode):
+    """Load the classifier one way, classify some answers, report memory and wait to be measured."""
+    texts = synthetic_answers(40, 100, seed=2)
+    baseline = memory_kb()
+    if mode == 'pickle':
+        model, vectorizer = load_pickles()
+        sklearn_predict(model, vectorizer, texts)
+    else:
+        artifact = ClassifierArtifact(CLASSIFIER_ARTIFACT_PATH)
+        artifact_predict(artifact, texts)
+    print(*baseline, flush=True)
+    sys.stdin.read()  # stay alive until the parent has measured every worker
+
+def measure(mode):
+    """Start WORKERS processes loading the classifier together; mean memory growth per worker."""
+    children = [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), '--child', mode],
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        for _ in range(WORKERS)
+    ]
+    growth = []
+    try:
+        baselines = [[int(value) for value in child.stdout.readline().split()] for child in children]
+        for child, baseline in zip(children, baselines):
+            growth.append([after - before for after, before in zip(memory_kb(child.pid), baseline)])
+    finally:
+        for child in children:
+            child.communicate('')
+    return [sum(values) / len(values) / 1024 for values in zip(*growth)]
+
+def run_benchmark():
+    model, vectorizer = load_pickles()
+    artifact = ClassifierArtifact(CLASSIFIER_ARTIFACT_PATH)
+    texts = synthetic_answers(60, CALLS, seed=1)
+
+    print(f"Text classification latency, median per predict call (artifact version {artifact.version})")
+    print("-" * 80)
+    print(f"{'batch':>6} {'scikit-learn (ms)':>18} {'npz kernel (ms)':>16} {'speedup':>8}")
+    for batch in BATCHES:
+        sklearn_time = latency(lambda texts: sklearn_predict(model, vectorizer, texts), texts, batch)
+        artifact_time = latency(lambda texts: artifact_predict(artifact, texts), texts, batch)
+        print(f"{batch:>6} {sklearn_time * 1e3:>18.3f} {artifact_time * 1e3:>16.3f} "
+              f"{sklearn_time / artifact_time:>7.1f}x")
+
+    if os.path.exists('/proc/self/smaps_rollup'):
+        print(f"\nMemory growth per worker from loading the classifier ({WORKERS} workers at once)")
+        print("-" * 80)
+        print(f"{'mode':>8} {'RSS (MB)':>10} {'PSS (MB)':>10} {'private (MB)':>13}")
+        for mode in MODES:
+            rss, pss, private = measure(mode)
+            print(f"{mode:>8} {rss:>10.1f} {pss:>10.1f} {private:>13.1f}")
+    else:
+        print("\nNo /proc/self/smaps_rollup here; skipping the memory table.")
+
+    corpus = parity_corpus(artifact)
+    expected = sklearn_predict(model, vectorizer, corpus)
+    ours = artifact_predict(artifact, corpus)
+    agree = sum(a == b for a, b in zip(expected, ours)) / len(corpus)
+    print(f"\nLabels agree with scikit-learn on {agree:.2%} of {len(corpus)} texts "
+          f"({len(set(expected))} classes predicted).")
+    return 0 if agree == 1.0 else 1
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == '--child':
+        run_child(sys.argv[2])
+        sys.exit(0)
+    sys.exit(run_benchmark())
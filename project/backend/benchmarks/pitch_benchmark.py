@@ -0,0 +1,104 @@
+import sys
+import os
+import time
+import numpy as np
+
+# Add the backend directory to Python path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from app.utils.audio_analysis import (
+    SAMPLE_RATE, compute_audio_features, calculate_audio_response_score, analyze_audio_sentiment
+)
+from app.utils.pitch import estimate_pitch
+
+DURATIONS = [5, 30, 120]
+REPEATS = 3
+# Largest score difference allowed between the engines: librosa's pitch_std
+# is the spread of every piptrack candidate, harmonics included, the numpy
+# engine's that of its f0 contour, so their scores differ by up to half a point
+SCORE_TOLERANCE = 0.5
+
+def synthetic_voice(duration, f0=140.0, sr=SAMPLE_RATE, seed=0):
+    """A voiced, speech-like test signal with a known f0 contour.
+
+    Harmonic source with a slow pitch glide, syllable-rate amplitude
+    modulation, short pauses and a little background noise.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(sr * duration)) / sr
+    contour = f0 * (1 + 0.15 * np.sin(2 * np.pi * 0.4 * t))
+    phase = 2 * np.pi * np.cumsum(contour) / sr
+    y = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t) ** 2
+    envelope[(t % 4) > 3.5] = 0.0  # half-second pause every four seconds
+    y = 0.2 * y * envelope + 0.005 * rng.standard_normal(len(t))
+    return y.astype(np.float32), contour
+
+def time_engine(y, engine):
+    """Best-of-REPEATS wall time of one pitch engine on a signal."""
+    import librosa
+
+    S = np.abs(librosa.stft(y, n_fft=2048, hop_length=512))
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        estimate_pitch(y, SAMPLE_RATE, S=S, engine=engine)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def check_parity():
+    """Compare the numpy engine with librosa on synthetic voiced signals."""
+    ok = True
+    print("\nParity on synthetic voiced signals")
+    print("-" * 80)
+    print(f"{'f0 (Hz)':>8} {'median err':>11} {'score librosa':>14} {'score numpy':>12} "
+          f"{'sentiment librosa':>18} {'sentiment numpy':>16}")
+
+    for f0 in [90.0, 140.0, 220.0]:
+        y, contour = synthetic_voice(20, f0=f0)
+
+        _, f0_track = estimate_pitch(y, SAMPLE_RATE, engine='numpy')
+        frame_times = np.arange(len(f0_track)) * 512
+        expected = contour[np.minimum(frame_times, len(contour) - 1)]
+        voiced = np.abs(y[np.minimum(frame_times, len(y) - 1)]) > 0.01
+        error = np.median(np.abs(f0_track[voiced] - expected[voiced]) / expected[voiced])
+
+        results = {}
+        for engine in ['librosa', 'numpy']:
+            features = compute_audio_features(y, SAMPLE_RATE, engine)
+            results[engine] = (
+                calculate_audio_response_score(features, 'question'),
+                analyze_audio_sentiment(features)
+            )
+
+        print(f"{f0:>8.0f} {error:>10.2%} {results['librosa'][0]:>14.2f} {results['numpy'][0]:>12.2f} "
+              f"{results['librosa'][1]:>18} {results['numpy'][1]:>16}")
+
+        # Tracking within 5% of the true f0, identical sentiment label and a
+        # score within SCORE_TOLERANCE is enough for the thresholded scorers
+        if error > 0.05 or results['librosa'][1] != results['numpy'][1] or \
+                abs(results['librosa'][0] - results['numpy'][0]) > SCORE_TOLERANCE:
+            ok = False
+
+    return ok
+
+def run_benchmark():
+    print("Pitch engine benchmark (best of %d runs)" % REPEATS)
+    print("-" * 80)
+    print(f"{'duration (s)':>12} {'librosa (s)':>12} {'numpy (s)':>10} {'speedup':>8}")
+
+    for duration in DURATIONS:
+        y, _ = synthetic_voice(duration)
+        librosa_time = time_engine(y, 'librosa')
+        numpy_time = time_engine(y, 'numpy')
+        print(f"{duration:>12} {librosa_time:>12.3f} {numpy_time:>10.3f} {librosa_time / numpy_time:>7.1f}x")
+
+    if check_parity():
+        print("\nParity check passed.")
+        return 0
+    print("\nParity check FAILED.")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(run_benchmark())
@@ -0,0 +1,97 @@
+import sys
+import os
+import random
+import time
+
+# Add the backend directory to Python path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from text_benchmark import synthetic_answers
+from app.models.interview import sentiment_label
+from app.utils.sentiment import get_sentiment_engine
+
+LENGTHS = [20, 80, 250]   # words per answer
+ANSWERS = 500             # answers per length
+BATCH = 256               # texts per polarities() call in the batch column
+REPEATS = 3
+PARITY_TEXTS = 5000       # random texts in the parity corpus
+MIN_LABEL_AGREEMENT = 0.999
+
+# Decorations that exercise the tokenizer and the rules: punctuation,
+# contractions, abbreviations, emoticons and sarcasm marks
+DECORATIONS = ['.', ',', '!', '?', '!!', "'s", "n't", '"', '(', ')', '...', ' :-)', ' ;)', ' :(', '-', '/',
+               ' e.g.', ' U.S.', ' 3.5', ' $100', ' 50%', ' http://example.com/a?b=1', ' #tag', ' (!)', ' <3']
+FILLERS = ['not', 'no', 'never', 'very', 'really', 'extremely', 'the', 'a', 'is', 'I', 'do', 'was', 'it']
+
+def textblob_polarity(text):
+    from textblob import TextBlob
+
+    return TextBlob(text).sentiment.polarity
+
+def parity_corpus(engine, seed=0):
+    """Interview-like answers plus random mixes of lexicon words, negations, modifiers and punctuation."""
+    rng = random.Random(seed)
+    lexicon = sorted(word for word, code in engine.codes.items() if engine.known[code])
+    corpus = synthetic_answers(40, 500, seed=seed)
+    for _ in range(PARITY_TEXTS):
+        words = []
+        for _ in range(rng.randint(1, 40)):
+            word = rng.choice(lexicon) if rng.random() < 0.6 else rng.choice(FILLERS)
+            if rng.random() < 0.3:
+                word = word.capitalize()
+            if rng.random() < 0.3:
+                word += rng.choice(DECORATIONS)
+            words.append(word)
+        corpus.append(' '.join(words))
+    return corpus
+
+def check_parity(engine):
+    """Compare the engine's polarities and labels with TextBlob's on the parity corpus."""
+    corpus = parity_corpus(engine)
+    expected = [textblob_polarity(text) for text in corpus]
+    ok = True
+    print(f"\nParity with TextBlob on {len(corpus)} texts")
+    for name, ours in [('single', [engine.polarity_of(text) for text in corpus]),
+                       ('batched', engine.polarities(corpus))]:
+        exact = sum(abs(a - b) < 1e-9 for a, b in zip(expected, ours))
+        labels = sum(sentiment_label(a) == sentiment_label(b) for a, b in zip(expected, ours))
+        print(f"{name:>8}: {labels / len(corpus):.2%} labels agree, {exact / len(corpus):.2%} polarities identical")
+        ok = ok and labels / len(corpus) >= MIN_LABEL_AGREEMENT
+    return ok
+
+def throughput(fn, texts):
+    """Best-of-REPEATS texts per CPU second."""
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.process_time()
+        fn(texts)
+        best = min(best, time.process_time() - start)
+    return len(texts) / best
+
+def run_benchmark():
+    engine = get_sentiment_engine()
+    textblob_polarity("warm up the lexicon")
+
+    print("Sentiment throughput, texts per CPU second (best of %d runs)" % REPEATS)
+    print("-" * 80)
+    print(f"{'words':>6} {'TextBlob':>10} {'engine':>10} {'batched':>10} {'speedup':>8} {'batched speedup':>16}")
+
+    for words in LENGTHS:
+        texts = synthetic_answers(words, ANSWERS, seed=words)
+        blob = throughput(lambda texts: [textblob_polarity(text) for text in texts], texts)
+        single = throughput(lambda texts: [engine.polarity_of(text) for text in texts], texts)
+        batched = throughput(
+            lambda texts: [engine.polarities(texts[i:i + BATCH]) for i in range(0, len(texts), BATCH)], texts
+        )
+        print(f"{words:>6} {blob:>10.0f} {single:>10.0f} {batched:>10.0f} {single / blob:>7.1f}x "
+              f"{batched / blob:>15.1f}x")
+
+    if check_parity(engine):
+        print("Parity check passed.")
+        return 0
+    print("Parity check FAILED.")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(run_benchmark())
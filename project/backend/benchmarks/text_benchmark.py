@@ -0,0 +1,110 @@
+import sys
+import os
+import random
+import time
+
+# Add the backend directory to Python path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from app.models.interview import analyze_sentiment, classify_response, calculate_response_score
+from app.utils.text_analysis import AnalyzedText, add_timing_hook, remove_timing_hook
+
+LENGTHS = [20, 80, 250]   # words per answer
+ANSWERS = 200             # answers per length
+REPEATS = 3
+
+SENTENCES = [
+    "I led a team of five engineers to deliver the new billing system on time.",
+    "Honestly, the deadline was stressful and I was not happy with how we planned it!",
+    "My greatest strength is staying calm under pressure and communicating clearly.",
+    "In five years I want to grow into a technical leadership role.",
+    "We had a terrible outage, but I learned a lot about monitoring and on-call work.",
+    "I enjoy mentoring junior developers and reviewing their code.",
+    "The project wasn't easy; requirements kept changing every week.",
+    "I'm really excited about this position because of your focus on great products.",
+]
+
+def synthetic_answers(words, count, seed=0):
+    """Interview-like answers of about the given word count, built from canned sentences."""
+    rng = random.Random(seed)
+    answers = []
+    for _ in range(count):
+        parts = []
+        while sum(len(part.split()) for part in parts) < words:
+            parts.append(rng.choice(SENTENCES))
+        answers.append(' '.join(parts))
+    return answers
+
+def legacy_analysis(text):
+    """What handle_interview did per answer before AnalyzedText."""
+    sentiment = analyze_sentiment(text)
+    category = classify_response(text)
+    min(10, max(1, len(text) / 20))  # the unused length score
+    return sentiment, category, calculate_response_score(text, sentiment)
+
+def pipeline_analysis(text):
+    analyzed = AnalyzedText(text)
+    return analyzed.sentiment, analyzed.category, analyzed.score
+
+def cpu_per_answer(analysis, answers):
+    """Best-of-REPEATS CPU seconds per answer."""
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.process_time()
+        for text in answers:
+            analysis(text)
+        best = min(best, (time.process_time() - start) / len(answers))
+    return best
+
+def stage_breakdown(answers):
+    """Mean seconds per answer of each AnalyzedText stage, collected through a timing hook."""
+    totals = {}
+
+    def hook(stage, seconds):
+        totals[stage] = totals.get(stage, 0.0) + seconds
+
+    add_timing_hook(hook)
+    try:
+        for text in answers:
+            pipeline_analysis(text)
+    finally:
+        remove_timing_hook(hook)
+    return {stage: seconds / len(answers) for stage, seconds in totals.items()}
+
+def check_parity(answers):
+    """Whether the pipeline labels and scores every answer exactly like the old functions."""
+    mismatches = [text for text in answers if legacy_analysis(text) != pipeline_analysis(text)]
+    for text in mismatches[:3]:
+        print(f"  mismatch: {legacy_analysis(text)} != {pipeline_analysis(text)} for {text[:60]!r}")
+    return not mismatches
+
+def run_benchmark():
+    # Load the lexicon and the classifier before timing
+    pipeline_analysis(SENTENCES[0])
+    legacy_analysis(SENTENCES[0])
+
+    print("Text answer analysis, CPU time per answer (best of %d runs)" % REPEATS)
+    print("-" * 80)
+    print(f"{'words':>6} {'before (ms)':>12} {'after (ms)':>11} {'speedup':>8}   "
+          f"{'tokenize':>8} {'sentiment':>9} {'classify':>8} {'score':>6} (ms)")
+
+    ok = True
+    for words in LENGTHS:
+        answers = synthetic_answers(words, ANSWERS, seed=words)
+        before = cpu_per_answer(legacy_analysis, answers)
+        after = cpu_per_answer(pipeline_analysis, answers)
+        stages = stage_breakdown(answers)
+        print(f"{words:>6} {before * 1e3:>12.3f} {after * 1e3:>11.3f} {before / after:>7.1f}x   "
+              f"{stages.get('tokenize', 0) * 1e3:>8.3f} {stages.get('sentiment', 0) * 1e3:>9.3f} "
+              f"{stages.get('classify', 0) * 1e3:>8.3f} {stages.get('score', 0) * 1e3:>6.3f}")
+        ok = check_parity(answers) and ok
+
+    if ok:
+        print("\nParity check passed.")
+        return 0
+    print("\nParity check FAILED.")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(run_benchmark())
@@ -0,0 +1,42 @@
+"""Pre-render the interview questions to audio for audio-mode interviews.
+
+Synthesizes every question of data/questions.csv offline and stores it in
+QUESTION_AUDIO_DIR, named by a hash of the question text, with a manifest
+the interview page reads to play questions instead of using the browser's
+speech synthesis. Run it again after editing the question bank; only new
+or changed questions are synthesized:
+
+    python build_question_audio.py
+    python build_question_audio.py --synthesizer stub     # no speech engine needed
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add the backend directory to Python path
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BACKEND_DIR)
+
+from config import Config
+from app.models.interview import QUESTIONS_PATH
+from app.utils.audio_transcode import TRANSCODE_FORMATS, resolve_transcode_format
+from app.utils.question_audio import SYNTHESIZERS, build_question_audio, get_synthesizer
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render the interview questions to audio.")
+    parser.add_argument('--csv', default=QUESTIONS_PATH, help="question bank (default: %(default)s)")
+    parser.add_argument('--out', default=Config.QUESTION_AUDIO_DIR, help="output folder (default: %(default)s)")
+    parser.add_argument('--synthesizer', default=Config.QUESTION_AUDIO_SYNTHESIZER, choices=sorted(SYNTHESIZERS))
+    parser.add_argument('--format', default=Config.QUESTION_AUDIO_FORMAT, choices=sorted(TRANSCODE_FORMATS))
+    args = parser.parse_args()
+
+    fmt = resolve_transcode_format(args.format)
+    start = time.perf_counter()
+    stats = build_question_audio(args.csv, args.out, get_synthesizer(args.synthesizer), fmt)
+    print(f"Question audio in {args.out}: {stats['generated']} generated, {stats['kept']} unchanged, "
+          f"{stats['removed']} removed in {time.perf_counter() - start:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
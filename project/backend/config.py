@@ -28,6 +28,132 @@ class Config:
     SESSION_TYPE = 'filesystem'
     PERMANENT_SESSION_LIFETIME = 86400  # 24 hours in seconds
     
+    # Stored audio answers
+    UPLOAD_FOLDER = os.path.join(BACKEND_DIR, os.environ.get('UPLOAD_FOLDER', 'uploads'))
+
+    # Where stored answers live: 'local' keeps them in UPLOAD_FOLDER; 's3'
+    # publishes them to an S3-compatible bucket shared by every backend node,
+    # with UPLOAD_FOLDER as this node's spool. Credentials come from the usual
+    # AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY variables.
+    AUDIO_STORAGE = os.environ.get('AUDIO_STORAGE', 'local')
+    AUDIO_S3_BUCKET = os.environ.get('AUDIO_S3_BUCKET', '')
+    AUDIO_S3_PREFIX = os.environ.get('AUDIO_S3_PREFIX', '')
+    AUDIO_S3_ENDPOINT_URL = os.environ.get('AUDIO_S3_ENDPOINT_URL', '')  # e.g. a MinIO server
+    AUDIO_S3_REGION = os.environ.get('AUDIO_S3_REGION', '')
+    # Lifetime in seconds of the presigned URLs recordings are played from
+    AUDIO_S3_URL_EXPIRY = int(os.environ.get('AUDIO_S3_URL_EXPIRY', 300))
+
+    # Let a front proxy (Apache mod_xsendfile, lighttpd) send recordings for
+    # the playback endpoint via the X-Sendfile header
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', '0') == '1'
+
+    # Background reconciliation of UPLOAD_FOLDER with the audio_asset table:
+    # seconds between passes (0 disables), files per batch, and the minimum
+    # age before an untracked file or a row without a file is cleaned up
+    AUDIO_SWEEP_INTERVAL = int(os.environ.get('AUDIO_SWEEP_INTERVAL', 3600))
+    AUDIO_SWEEP_BATCH = int(os.environ.get('AUDIO_SWEEP_BATCH', 500))
+    AUDIO_SWEEP_GRACE = int(os.environ.get('AUDIO_SWEEP_GRACE', 3600))
+
+    # Background transcoding of stored WAV answers into content-addressed
+    # objects: seconds between passes (0 disables), target format ('flac',
+    # lossless, or 'opus', smaller but lossy), answers per batch, and the
+    # minimum age in seconds before an answer is transcoded
+    AUDIO_TRANSCODE_INTERVAL = int(os.environ.get('AUDIO_TRANSCODE_INTERVAL', 900))
+    AUDIO_TRANSCODE_FORMAT = os.environ.get('AUDIO_TRANSCODE_FORMAT', 'flac')
+    AUDIO_TRANSCODE_BATCH = int(os.environ.get('AUDIO_TRANSCODE_BATCH', 100))
+    AUDIO_TRANSCODE_DELAY = int(os.environ.get('AUDIO_TRANSCODE_DELAY', 600))
+
+    # Audio analysis worker pool (0 runs the analysis inside the request)
+    AUDIO_ANALYSIS_WORKERS = int(os.environ.get('AUDIO_ANALYSIS_WORKERS', 2))
+
+    # Seconds after which a still-queued audio job counts as lost by a restart
+    # and is analyzed again, then failed if it is still queued (0 disables)
+    AUDIO_JOB_TIMEOUT = int(os.environ.get('AUDIO_JOB_TIMEOUT', 900))
+
+    # Audio answers allowed to wait for a free analysis worker, streamed
+    # answers still being recorded included; beyond that submit-audio and
+    # audio-stream/start answer 429 with Retry-After
+    AUDIO_ANALYSIS_QUEUE = int(os.environ.get('AUDIO_ANALYSIS_QUEUE', 16))
+
+    # Niceness added to the analysis processes so request handling keeps
+    # priority on the CPU during audio bursts (0 to leave it unchanged)
+    AUDIO_ANALYSIS_NICE = int(os.environ.get('AUDIO_ANALYSIS_NICE', 10))
+
+    # Run the audio pipeline on a synthetic clip at startup so the first answer
+    # does not pay for imports and JIT compilation; /ready answers 503 until
+    # it is done (0 skips the warm-up)
+    AUDIO_WARMUP = int(os.environ.get('AUDIO_WARMUP', 1))
+
+    # Persistent numba compile cache for librosa's kernels
+    NUMBA_CACHE_DIR = os.environ.get('NUMBA_CACHE_DIR', os.path.join(DB_DIR, 'numba_cache'))
+    
+    # Pitch tracker used by the audio scorers: 'librosa' (piptrack + yin) or
+    # 'numpy' (vectorized autocorrelation, several times faster)
+    PITCH_ENGINE = os.environ.get('PITCH_ENGINE', 'librosa')
+
+    # webrtcvad aggressiveness (0-3) used to trim silence before the audio
+    # features are computed; -1 analyzes every sample
+    AUDIO_VAD_MODE = int(os.environ.get('AUDIO_VAD_MODE', 2))
+
+    # Recordings longer than this (seconds) are converted and analyzed block by
+    # block instead of being decoded into memory whole, capping peak memory
+    AUDIO_BLOCK_ANALYSIS_SECONDS = int(os.environ.get('AUDIO_BLOCK_ANALYSIS_SECONDS', 120))
+
+    # Seconds one answer's analysis may take (0 for no limit): duration, SNR,
+    # energy and ZCR are always measured, the spectral, onset and pitch
+    # features only while they are expected to fit
+    AUDIO_ANALYSIS_BUDGET = float(os.environ.get('AUDIO_ANALYSIS_BUDGET', 10))
+
+    # Audio features cached by content hash: entries kept in memory, and a
+    # directory for the on-disk tier (empty to keep the cache in memory only)
+    AUDIO_FEATURE_CACHE_SIZE = int(os.environ.get('AUDIO_FEATURE_CACHE_SIZE', 256))
+    AUDIO_FEATURE_CACHE_DIR = os.environ.get('AUDIO_FEATURE_CACHE_DIR', os.path.join(DB_DIR, 'feature_cache'))
+    # Bytes the on-disk tier may use; the audio sweeper deletes the least
+    # recently used entries beyond that. 0 for no limit
+    AUDIO_FEATURE_CACHE_MAX_BYTES = int(os.environ.get('AUDIO_FEATURE_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+    # Text answers of concurrent requests are classified together: at most
+    # this many per batch (1 classifies each answer on its own), waiting at
+    # most TEXT_CLASSIFY_BATCH_WAIT seconds for more answers to join
+    TEXT_CLASSIFY_BATCH = int(os.environ.get('TEXT_CLASSIFY_BATCH', 32))
+    TEXT_CLASSIFY_BATCH_WAIT = float(os.environ.get('TEXT_CLASSIFY_BATCH_WAIT', 0.003))
+
+    # Text classifier artifacts (ml_model/export_model.py --out) served by the
+    # model registry: the newest in this folder wins, checked every
+    # MODEL_REGISTRY_INTERVAL seconds (0 only checks at startup)
+    MODEL_ARTIFACTS_DIR = os.environ.get('MODEL_ARTIFACTS_DIR', os.path.join(DB_DIR, 'models'))
+    MODEL_REGISTRY_INTERVAL = int(os.environ.get('MODEL_REGISTRY_INTERVAL', 30))
+
+    # Incremental training of the text classifier on stored answers
+    # (train_classifier.py, or in the app every TRAINING_INTERVAL seconds; 0
+    # leaves it to the script): rows per partial_fit batch, batches per run,
+    # hashed feature columns, answers seen before the first model is
+    # published to MODEL_ARTIFACTS_DIR, share of create_model.py's sample
+    # answers a model must label correctly to be published, and published
+    # models kept
+    TRAINING_INTERVAL = int(os.environ.get('TRAINING_INTERVAL', 0))
+    TRAINING_BATCH = int(os.environ.get('TRAINING_BATCH', 500))
+    TRAINING_MAX_BATCHES = int(os.environ.get('TRAINING_MAX_BATCHES', 20))
+    TRAINING_HASH_FEATURES = int(os.environ.get('TRAINING_HASH_FEATURES', 2 ** 16))
+    TRAINING_MIN_ROWS = int(os.environ.get('TRAINING_MIN_ROWS', 200))
+    TRAINING_MIN_ACCURACY = float(os.environ.get('TRAINING_MIN_ACCURACY', 0.5))
+    TRAINING_KEEP_VERSIONS = int(os.environ.get('TRAINING_KEEP_VERSIONS', 3))
+    TRAINING_STATE_DIR = os.environ.get('TRAINING_STATE_DIR', os.path.join(DB_DIR, 'training'))
+
+    # Pre-rendered question audio written by build_question_audio.py and
+    # played by audio-mode interviews: folder, speech engine ('pyttsx3' or
+    # 'stub') and format ('opus' or 'flac')
+    QUESTION_AUDIO_DIR = os.environ.get('QUESTION_AUDIO_DIR', os.path.join(DB_DIR, 'question_audio'))
+    QUESTION_AUDIO_SYNTHESIZER = os.environ.get('QUESTION_AUDIO_SYNTHESIZER', 'pyttsx3')
+    QUESTION_AUDIO_FORMAT = os.environ.get('QUESTION_AUDIO_FORMAT', 'opus')
+
+    # Chunked audio uploads idle for longer than this are discarded (seconds)
+    AUDIO_STREAM_TIMEOUT = int(os.environ.get('AUDIO_STREAM_TIMEOUT', 600))
+
+    # Longest chunked audio upload accepted (seconds); its analysis stages are
+    # planned against AUDIO_ANALYSIS_BUDGET for an upload this long
+    AUDIO_STREAM_MAX_SECONDS = int(os.environ.get('AUDIO_STREAM_MAX_SECONDS', 600))
+
     # CORS Configuration
     CORS_ORIGINS = [
         "http://localhost:8000",
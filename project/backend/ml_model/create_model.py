@@ -2,6 +2,7 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.naive_bayes import MultinomialNB
 import pickle
 import os
+import sys
 
 # Get the absolute path to the backend directory
 BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -60,27 +61,39 @@ y_train = (
     ["leadership"] * 5
 )
 
-# Create and train the vectorizer
-vectorizer = TfidfVectorizer(
-    max_features=1000,
-    stop_words='english',
-    ngram_range=(1, 2)
-)
-X_train_tfidf = vectorizer.fit_transform(X_train)
+def main():
+    """Train the classifier on the sample answers and save it with its vectorizer."""
+    # Create and train the vectorizer
+    vectorizer = TfidfVectorizer(
+        max_features=1000,
+        stop_words='english',
+        ngram_range=(1, 2)
+    )
+    X_train_tfidf = vectorizer.fit_transform(X_train)
+
+    # Train the model
+    model = MultinomialNB(alpha=1.0)
+    model.fit(X_train_tfidf, y_train)
+
+    # Save the model and vectorizer
+    model_path = os.path.join(BACKEND_DIR, 'ml_model', 'interview_classifier.pkl')
+    vectorizer_path = os.path.join(BACKEND_DIR, 'ml_model', 'tfidf_vectorizer.pkl')
 
-# Train the model
-model = MultinomialNB(alpha=1.0)
-model.fit(X_train_tfidf, y_train)
+    with open(model_path, 'wb') as f:
+        pickle.dump(model, f)
+    with open(vectorizer_path, 'wb') as f:
+        pickle.dump(vectorizer, f)
 
-# Save the model and vectorizer
-model_path = os.path.join(BACKEND_DIR, 'ml_model', 'interview_classifier.pkl')
-vectorizer_path = os.path.join(BACKEND_DIR, 'ml_model', 'tfidf_vectorizer.pkl')
+    # Export the NumPy artifact the app loads in place of the pickles
+    sys.path.append(BACKEND_DIR)
+    from app.utils.model_artifact import export_classifier
+    artifact_path = os.path.join(BACKEND_DIR, 'ml_model', 'interview_classifier.npz')
+    export_classifier(model, vectorizer, artifact_path)
 
-with open(model_path, 'wb') as f:
-    pickle.dump(model, f)
-with open(vectorizer_path, 'wb') as f:
-    pickle.dump(vectorizer, f)
+    print("Model and vectorizer have been created and saved successfully!")
+    print(f"Model saved to: {model_path}")
+    print(f"Vectorizer saved to: {vectorizer_path}")
+    print(f"Artifact saved to: {artifact_path}") 
 
-print("Model and vectorizer have been created and saved successfully!")
-print(f"Model saved to: {model_path}")
-print(f"Vectorizer saved to: {vectorizer_path}") 
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Export the pickled text classifier to the NumPy artifact the app loads.
+
+Writes the TF-IDF vocabulary and IDF weights and the classifier's class
+weights to a versioned, uncompressed .npz that app/utils/model_artifact.py
+memory-maps and runs without scikit-learn. Run it after retraining:
+
+    python ml_model/export_model.py
+"""
+import argparse
+import os
+import pickle
+import sys
+
+# Add the backend directory to Python path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from app.utils.model_artifact import ClassifierArtifact, export_classifier
+
+MODEL_PATH = os.path.join(BACKEND_DIR, 'ml_model', 'interview_classifier.pkl')
+VECTORIZER_PATH = os.path.join(BACKEND_DIR, 'ml_model', 'tfidf_vectorizer.pkl')
+ARTIFACT_PATH = os.path.join(BACKEND_DIR, 'ml_model', 'interview_classifier.npz')
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the pickled text classifier to a NumPy artifact.")
+    parser.add_argument('--model', default=MODEL_PATH, help="pickled classifier (default: %(default)s)")
+    parser.add_argument('--vectorizer', default=VECTORIZER_PATH, help="pickled vectorizer (default: %(default)s)")
+    parser.add_argument('--out', default=ARTIFACT_PATH, help="artifact to write (default: %(default)s)")
+    args = parser.parse_args()
+
+    with open(args.model, 'rb') as f:
+        model = pickle.load(f)
+    with open(args.vectorizer, 'rb') as f:
+        vectorizer = pickle.load(f)
+    version = export_classifier(model, vectorizer, args.out)
+
+    artifact = ClassifierArtifact(args.out)
+    print(f"Exported {len(artifact.terms)} terms and {len(artifact.classes)} classes to {args.out} "
+          f"(version {version})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+"""Recompute the scores of stored audio answers with the current scorers.
+
+Walks audio responses in id order, re-analyzes their files in a process
+pool and writes the new score, sentiment, category and stored feature
+vector back in batched transactions, fixing each touched session's
+total_score in the same transaction. Progress is checkpointed after every
+batch, so an interrupted run picks up where it stopped; a run that
+finishes removes the checkpoint, so the next one re-scores every answer
+again:
+
+    python rescore_audio.py --workers 8
+    python rescore_audio.py --restart       # ignore the checkpoint
+
+Answers whose background audio job is still queued are skipped, since the
+job will score them itself.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sqlite3
+import sys
+import time
+
+# Add the backend directory to Python path
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BACKEND_DIR)
+
+from config import Config
+from app.utils.warmup import configure_numba_cache
+from app.utils.audio_analysis import extract_audio_features, score_audio_features
+from app.utils.audio_decode import probe_audio_duration
+from app.utils.audio_storage import file_checksum
+from app.utils.audio_stream import extract_audio_features_blocked
+from app.utils.blob_storage import create_blob_store
+from app.utils.feature_cache import FeatureCache, feature_cache_key
+from app.utils.feature_store import FEATURE_LAYOUT_VERSION, feature_vector
+
+DEFAULT_DB = Config.SQLALCHEMY_DATABASE_URI.replace('sqlite:///', '', 1)
+DEFAULT_CHECKPOINT = os.path.join(Config.DB_DIR, 'rescore_checkpoint.json')
+
+# Placeholder text stored for audio answers, which carries the question number
+AUDIO_RESPONSE_TEXT = re.compile(r'^\[Audio Response for Question (\d+)\]$')
+
+# Per-process state of the pool workers, set by _init_worker
+_worker = {}
+
+def storage_settings(uploads_dir):
+    """Blob store settings from Config, with the upload folder given on the command line."""
+    settings = {name: getattr(Config, name) for name in dir(Config)
+                if name == 'AUDIO_STORAGE' or name.startswith('AUDIO_S3_')}
+    settings['UPLOAD_FOLDER'] = uploads_dir
+    return settings
+
+def _init_worker(pitch_engine, vad_mode, block_seconds, cache_dir, budget=None, storage=None):
+    _worker['store'] = create_blob_store(storage)
+    _worker['pitch_engine'] = pitch_engine
+    _worker['vad_mode'] = vad_mode
+    _worker['block_seconds'] = block_seconds
+    _worker['budget'] = budget
+    _worker['cache'] = FeatureCache(64, cache_dir)
+
+def rescore_answer(task):
+    """Score one stored answer in a pool worker.
+
+    Returns (response_id, session_id, score, sentiment, category, cached, error, vector),
+    where vector is the packed feature vector as bytes.
+    """
+    response_id, session_id, audio_key, checksum, question = task
+    try:
+        # Recordings in a remote store are downloaded to a temporary file first
+        with _worker['store'].local_copy(audio_key) as audio_path:
+            if not checksum:
+                _, checksum = file_checksum(audio_path)
+            key = feature_cache_key(checksum, _worker['pitch_engine'], _worker['vad_mode'])
+            features = _worker['cache'].get(key)
+            cached = features is not None
+            if not cached:
+                # Answers are often WebM saved as .wav, so the format is sniffed
+                with open(audio_path, 'rb') as f:
+                    duration = probe_audio_duration(f)
+                if duration is not None and duration > _worker['block_seconds']:
+                    features = extract_audio_features_blocked(audio_path, _worker['pitch_engine'],
+                                                              _worker['vad_mode'], _worker['budget'])
+                else:
+                    features = extract_audio_features(audio_path, _worker['pitch_engine'],
+                                                      _worker['vad_mode'], _worker['budget'])
+                if features.complete:
+                    _worker['cache'].put(key, features)
+        score, sentiment, category = score_audio_features(features, question)
+        return response_id, session_id, score, sentiment, category, cached, None, feature_vector(features).tobytes()
+    except Exception as e:
+        return response_id, session_id, None, None, None, False, str(e), None
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return {"last_response_id": 0, "updated": 0, "skipped": 0, "failed": 0}
+    with open(path) as f:
+        return json.load(f)
+
+def save_checkpoint(path, checkpoint):
+    """Write the checkpoint atomically so a crash never leaves it half written."""
+    partial_path = path + '.part'
+    with open(partial_path, 'w') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(partial_path, path)
+
+class AnswerQuery:
+    """Pages through audio responses, adapting to the columns and tables present."""
+
+    def __init__(self, conn, store):
+        self.store = store
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA table_info(response)")
+        columns = [column[1] for column in cursor.fetchall()]
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        tables = {row[0] for row in cursor.fetchall()}
+
+        if 'input_type' in columns:
+            where = "r.input_type = 'audio'"
+        else:
+            where = "r.response LIKE '[Audio Response for Question %'"
+        if 'audio_job' in tables:
+            where += (" AND r.id NOT IN (SELECT response_id FROM audio_job "
+                      "WHERE status = 'queued' AND response_id IS NOT NULL)")
+
+        # Databases created before the feature store only get new scores
+        self.has_vectors = 'audio_feature_vector' in tables
+
+        # Transcoded answers are read from their object; the cache stays keyed
+        # by the checksum of the recording as uploaded
+        self.asset_sql = None
+        path, join = "NULL, NULL", ""
+        if 'audio_asset' in tables:
+            cursor.execute("PRAGMA table_info(audio_asset)")
+            if 'object_path' in [column[1] for column in cursor.fetchall()]:
+                path = "COALESCE(a.object_path, a.path), a.checksum"
+                self.asset_sql = "SELECT COALESCE(object_path, path), checksum FROM audio_asset WHERE path = ?"
+            else:
+                path = "a.path, a.checksum"
+                self.asset_sql = "SELECT path, checksum FROM audio_asset WHERE path = ?"
+            join = "LEFT JOIN audio_asset a ON a.response_id = r.id"
+
+        self.page_sql = (
+            f"SELECT r.id, r.session_id, r.question, r.response, {path} FROM response r {join} "
+            f"WHERE {where} AND r.id > ? ORDER BY r.id LIMIT ?"
+        )
+        self.count_sql = f"SELECT COUNT(*) FROM response r WHERE {where} AND r.id > ?"
+
+    def remaining(self, conn, after_id):
+        cursor = conn.cursor()
+        cursor.execute(self.count_sql, (after_id,))
+        return cursor.fetchone()[0]
+
+    def page(self, conn, after_id, limit):
+        """Return (rows, tasks): every row of the page, and a task for each one with a file."""
+        cursor = conn.cursor()
+        cursor.execute(self.page_sql, (after_id, limit))
+        rows = cursor.fetchall()
+        tasks = []
+        for response_id, session_id, question, response_text, path, checksum in rows:
+            audio_key, checksum = self._audio_key(cursor, session_id, response_text, path, checksum)
+            if audio_key:
+                tasks.append((response_id, session_id, audio_key, checksum, question or ''))
+        return rows, tasks
+
+    def _audio_key(self, cursor, session_id, response_text, path, checksum):
+        if not path:
+            # Answers stored before audio_asset existed follow the naming scheme,
+            # and may since have been adopted by the sweeper and transcoded
+            match = AUDIO_RESPONSE_TEXT.match(response_text or '')
+            if not match:
+                return None, None
+            path = f'audio_{session_id}_{match.group(1)}.wav'
+            if self.asset_sql:
+                cursor.execute(self.asset_sql, (path,))
+                path, checksum = cursor.fetchone() or (path, None)
+        return (path, checksum) if self.store.stat(path) else (None, None)
+
+def write_batch(conn, results, store_vectors=True):
+    """Store one batch of new scores and fix the totals of the sessions touched."""
+    updates = [(score, sentiment, category, response_id)
+               for response_id, _, score, sentiment, category, _, error, _ in results if error is None]
+    vectors = [(session_id, response_id, FEATURE_LAYOUT_VERSION, vector)
+               for response_id, session_id, _, _, _, _, error, vector in results if error is None]
+    session_ids = sorted({session_id for _, session_id, *_ in results})
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN")
+        cursor.executemany(
+            "UPDATE response SET score = ?, sentiment = ?, category = ? WHERE id = ?",
+            updates
+        )
+        if store_vectors:
+            cursor.executemany(
+                "DELETE FROM audio_feature_vector WHERE response_id = ?",
+                [(response_id,) for _, response_id, _, _ in vectors]
+            )
+            cursor.executemany(
+                "INSERT INTO audio_feature_vector (session_id, response_id, layout_version, vector, created_at) "
+                "VALUES (?, ?, ?, ?, datetime('now'))",
+                vectors
+            )
+        cursor.executemany(
+            "UPDATE interview_session SET total_score = "
+            "(SELECT COALESCE(SUM(score), 0) FROM response WHERE session_id = interview_session.id) "
+            "WHERE id = ?",
+            [(session_id,) for session_id in session_ids]
+        )
+        cursor.execute("COMMIT")
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+    return len(updates)
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score stored audio answers with the current scorers.")
+    parser.add_argument('--db', default=DEFAULT_DB, help="SQLite database (default: %(default)s)")
+    parser.add_argument('--uploads', default=Config.UPLOAD_FOLDER,
+                        help="audio folder, or spool folder with AUDIO_STORAGE=s3 (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="analysis processes")
+    parser.add_argument('--batch-size', type=int, default=200, help="answers per transaction")
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT, help="progress file (default: %(default)s)")
+    parser.add_argument('--restart', action='store_true', help="start from the first answer")
+    parser.add_argument('--pitch-engine', default=Config.PITCH_ENGINE)
+    parser.add_argument('--vad-mode', type=int, default=Config.AUDIO_VAD_MODE)
+    parser.add_argument('--cache-dir', default=Config.AUDIO_FEATURE_CACHE_DIR,
+                        help="feature cache shared with the app, empty to disable (default: %(default)s)")
+    parser.add_argument('--budget', type=float, default=0,
+                        help="analysis seconds per answer, 0 for no limit (default: %(default)s)")
+    args = parser.parse_args()
+    configure_numba_cache(Config.NUMBA_CACHE_DIR)
+
+    checkpoint = load_checkpoint(args.checkpoint)
+    if args.restart:
+        checkpoint = {"last_response_id": 0, "updated": 0, "skipped": 0, "failed": 0}
+
+    # isolation_level=None lets write_batch manage its own transactions
+    conn = sqlite3.connect(args.db, isolation_level=None, timeout=30)
+    storage = storage_settings(args.uploads)
+    query = AnswerQuery(conn, create_blob_store(storage))
+    total = query.remaining(conn, checkpoint["last_response_id"])
+    print(f"Database: {args.db}")
+    print(f"Re-scoring {total} audio answers after response {checkpoint['last_response_id']} "
+          f"with {args.workers} workers")
+
+    pool = multiprocessing.Pool(
+        args.workers, _init_worker,
+        (args.pitch_engine, args.vad_mode, Config.AUDIO_BLOCK_ANALYSIS_SECONDS, args.cache_dir,
+         args.budget or None, storage)
+    )
+    done = 0
+    cached = 0
+    start = time.perf_counter()
+    try:
+        while True:
+            rows, tasks = query.page(conn, checkpoint["last_response_id"], args.batch_size)
+            if not rows:
+                break
+
+            results = pool.map(rescore_answer, tasks)
+            for response_id, _, _, _, _, _, error, _ in results:
+                if error:
+                    print(f"Could not re-score response {response_id}: {error}")
+
+            updated = write_batch(conn, results, query.has_vectors)
+            done += len(rows)
+            cached += sum(1 for result in results if result[5])
+            checkpoint["last_response_id"] = rows[-1][0]
+            checkpoint["updated"] += updated
+            checkpoint["failed"] += len(results) - updated
+            checkpoint["skipped"] += len(rows) - len(tasks)
+            save_checkpoint(args.checkpoint, checkpoint)
+
+            elapsed = time.perf_counter() - start
+            rate = done / elapsed if elapsed > 0 else 0.0
+            eta = (total - done) / rate if rate > 0 else 0.0
+            print(f"{done}/{total} answers, {rate:.1f}/s, {cached} from cache, "
+                  f"{checkpoint['failed']} failed, {checkpoint['skipped']} without audio, ETA {eta:.0f}s")
+    except KeyboardInterrupt:
+        print(f"\nInterrupted; resume from response {checkpoint['last_response_id']} by running again.")
+        pool.terminate()
+        return 1
+    finally:
+        pool.close()
+        pool.join()
+        conn.close()
+
+    print(f"Done: {checkpoint['updated']} updated, {checkpoint['failed']} failed, "
+          f"{checkpoint['skipped']} without audio.")
+    if os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    if args.cache_dir:
+        # A full re-score can fill the cache well past its size
+        removed = FeatureCache(0, args.cache_dir, Config.AUDIO_FEATURE_CACHE_MAX_BYTES).prune()
+        if removed:
+            print(f"Removed {removed} least recently used cached features")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
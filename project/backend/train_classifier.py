@@ -0,0 +1,79 @@
+"""Train the text classifier incrementally on the answers stored in the database.
+
+Streams text answers stored since the previous run into MultinomialNB's
+partial_fit, batch by batch, through a fixed-size HashingVectorizer, so
+memory stays flat however many answers there are. Each answer is labeled
+with the category of the question it answers in data/questions.csv.
+Progress and the model are saved after every batch. A model that labels at
+least --min-accuracy of create_model.py's sample answers correctly is
+published to MODEL_ARTIFACTS_DIR, where the model registry of every
+running worker picks it up. Run it from cron, or set TRAINING_INTERVAL to
+let the app do it:
+
+    python train_classifier.py
+    python train_classifier.py --restart      # start again from the sample answers
+"""
+import argparse
+import sqlite3
+import sys
+import os
+
+# Add the backend directory to Python path
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BACKEND_DIR)
+
+from config import Config
+from app.utils.incremental_training import IncrementalTrainer
+
+DEFAULT_DB = Config.SQLALCHEMY_DATABASE_URI.replace('sqlite:///', '', 1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the text classifier on stored answers.")
+    parser.add_argument('--db', default=DEFAULT_DB, help="SQLite database (default: %(default)s)")
+    parser.add_argument('--state-dir', default=Config.TRAINING_STATE_DIR,
+                        help="model and progress between runs (default: %(default)s)")
+    parser.add_argument('--out', default=Config.MODEL_ARTIFACTS_DIR,
+                        help="folder to publish the model to, empty to not publish (default: %(default)s)")
+    parser.add_argument('--batch-size', type=int, default=Config.TRAINING_BATCH, help="answers per partial_fit")
+    parser.add_argument('--max-batches', type=int, default=0, help="stop after this many batches, 0 for all")
+    parser.add_argument('--hash-features', type=int, default=Config.TRAINING_HASH_FEATURES,
+                        help="hashed feature columns of a new model (default: %(default)s)")
+    parser.add_argument('--min-rows', type=int, default=Config.TRAINING_MIN_ROWS,
+                        help="answers trained on before a model is published (default: %(default)s)")
+    parser.add_argument('--min-accuracy', type=float, default=Config.TRAINING_MIN_ACCURACY,
+                        help="share of the sample answers a model must label correctly to be published "
+                             "(default: %(default)s)")
+    parser.add_argument('--keep', type=int, default=Config.TRAINING_KEEP_VERSIONS,
+                        help="published models kept (default: %(default)s)")
+    parser.add_argument('--restart', action='store_true', help="forget the saved model and progress")
+    args = parser.parse_args()
+
+    trainer = IncrementalTrainer(args.state_dir, args.hash_features, args.batch_size)
+    if args.restart:
+        trainer.restart()
+
+    conn = sqlite3.connect(args.db, timeout=30)
+    try:
+        stats = trainer.run_exclusive(
+            conn, max_batches=args.max_batches or None, publish_dir=args.out or None,
+            min_rows=args.min_rows, keep=args.keep, min_accuracy=args.min_accuracy
+        )
+    finally:
+        conn.close()
+    if stats is None:
+        print(f"Another process is already training on {args.state_dir}")
+        return 1
+
+    print(f"Trained on {stats['rows']} answers in {stats['batches']} batches ({stats['total_rows']} in total) "
+          f"in {stats['seconds']:.1f}s; skipped {stats['skipped']} answers to questions without a category")
+    if stats['version']:
+        print(f"Published classifier {stats['version']} to {args.out}")
+    elif stats['accuracy'] is not None:
+        print(f"Not published: labels {stats['accuracy']:.0%} of the sample answers correctly, "
+              f"below --min-accuracy {args.min_accuracy:.0%}")
+    elif stats['rows']:
+        print(f"Not published: fewer than {args.min_rows} answers trained on, or no folder to publish to")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())